@@ -1,10 +1,18 @@
-from qdrant_client import QdrantClient  # import klienta Qdrant - baza wektorowa do przechowywania embeddingów
 import os  # dostęp do zmiennych środowiskowych i operacji na ścieżkach
-from openai import OpenAI  # klient OpenAI do generowania embeddingów
-from dotenv import load_dotenv  # wczytanie zmiennych z pliku .env
+import math  # zaokrąglenie limitu czasu wyszukiwania w górę (Qdrant przyjmuje pełne sekundy)
+import threading  # blokada przy tworzeniu klienta Qdrant (Streamlit jest wielowątkowy)
+import uuid  # deterministyczne ID punktów (te same w każdym procesie)
+from functools import lru_cache  # zapamiętanie klientów OpenAI per klucz i embeddingów zapytań
+from types import MappingProxyType  # słownik tylko do odczytu (pola wyników wyszukiwania)
+from typing import Mapping, NamedTuple  # niezmienne wyniki wyszukiwania
+import config  # przy imporcie wczytuje .env (raz na proces)
+import embedding  # dostawcy embeddingów (OpenAI albo lokalny offline)
+import magazyn_metadanych  # lokalny magazyn metadanych (SQLite) - katalog i duplikaty
+import roznorodnosc  # zróżnicowanie wyników wyszukiwania (MMR)
+from hasze_percepcyjne import DrzewoBK  # wyszukiwanie podobnych haszy percepcyjnych
 
-# Załaduj zmienne środowiskowe z pliku .env (jeśli istnieje)
-load_dotenv()
+# Klienty qdrant_client i openai są importowane dopiero przy pierwszym użyciu -
+# sam import tego modułu (start Streamlit, polecenia CLI) nie płaci za ładowanie SDK
 
 # ===== KONFIGURACJA QDRANT =====
 # Pobierz adres URL Qdrant ze zmiennych środowiskowych (dla usługi Qdrant Cloud)
@@ -13,31 +21,136 @@ QDRANT_URL = os.getenv("QDRANT_URL", None)  # np. https://xxx.qdrant.cloud
 # Pobierz klucz API Qdrant ze zmiennych środowiskowych (dla usługi Qdrant Cloud)
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)  # opcjonalny klucz API
 
+# Transport gRPC (opcjonalnie, QDRANT_PREFER_GRPC=1) - binarne protobuf zamiast JSON,
+# znacznie szybszy przy zapisie dużej liczby wektorów (ładowanie zbiorcze, import kopii)
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))  # port gRPC serwera Qdrant
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "0")) or None  # limit czasu zapytania [s] (None = domyślny)
+
 # Nazwa kolekcji (tabela w bazie Qdrant gdzie przechowujemy embeddingi)
+# To jest alias wskazujący na aktualną wersję kolekcji (np. "opisy_zdjec_v1"),
+# dzięki czemu migracja (migracja.py) może podmienić kolekcję bez przerwy w działaniu
 NAZWA_KOLEKCJI = "opisy_zdjec"
 
+# Dostawca i model embeddingów oraz konfiguracja wektorów dla nowo tworzonych kolekcji
+# (rozmiar wektora wynika z modelu - ROZMIAR_WEKTORA w .env tylko go nadpisuje)
+DOSTAWCA_EMBEDDINGOW = os.getenv("DOSTAWCA_EMBEDDINGOW", "openai")  # "openai" albo "lokalny" (offline)
+MODEL_EMBEDDINGU = os.getenv("MODEL_EMBEDDINGU") or embedding.DOMYSLNE_MODELE.get(DOSTAWCA_EMBEDDINGOW)
+ROZMIAR_WEKTORA = int(os.getenv("ROZMIAR_WEKTORA") or embedding.rozmiar_modelu(DOSTAWCA_EMBEDDINGOW, MODEL_EMBEDDINGU) or 0)
+# Wektory są normalizowane przy generowaniu (embedding.py), więc iloczyn skalarny (Dot)
+# daje to samo co Cosine, ale serwer nie musi normalizować każdego wektora
+MIARA_ODLEGLOSCI = "Dot"  # miara podobieństwa wektorów
+
+# Indeksy payloadu (pole -> typ indeksu) - pozwalają Qdrant filtrować już w trakcie
+# wyszukiwania wektorowego zamiast filtrować wyniki w Pythonie
+INDEKSY_PAYLOADU = {
+    "nazwa_zdjecia": "keyword",  # dokładna nazwa pliku
+    "hash": "keyword",  # sha256 zawartości pliku
+    "dhash": "keyword",  # hash percepcyjny (podobne zdjęcia)
+    "data_wykonania": "datetime",  # data wykonania zdjęcia z EXIF (ISO 8601)
+    "rok": "integer",  # rok wykonania zdjęcia
+    "aparat": "text",  # producent + model aparatu (wyszukiwanie po słowach, np. "iphone")
+    "orientacja": "integer",  # orientacja EXIF
+    "szerokosc": "integer",  # szerokość zdjęcia w pikselach
+    "wysokosc": "integer",  # wysokość zdjęcia w pikselach
+    "lokalizacja": "geo",  # współrzędne GPS {"lat": ..., "lon": ...}
+    "grupa": "keyword",  # ID reprezentanta grupy prawie identycznych zdjęć (UUID)
+    "reprezentant": "bool",  # czy punkt reprezentuje swoją grupę w wynikach
+    "obiekty": "keyword",  # tagi z Vision API: obiekty na zdjęciu (lista, np. ["pies", "rower"])
+    "scena": "keyword",  # rodzaj sceny (np. "plaża", "wnętrze")
+    "kolory": "keyword",  # dominujące kolory (lista)
+    "liczba_osob": "integer"  # liczba osób na zdjęciu
+}
+
+# Czy indeksy payloadu zostały już sprawdzone w tym procesie
+_indeksy_gotowe = False
+
+# Maksymalna odległość Hamminga między dHash, przy której zdjęcia uznajemy za duplikaty
+MAKS_ODLEGLOSC_HAMMINGA = int(os.getenv("MAKS_ODLEGLOSC_HAMMINGA", "6"))
+
+# Tłumienie prawie identycznych zdjęć przy zapisie (np. zdjęcia seryjne):
+# zdjęcia z opisem podobnym powyżej progu trafiają do grupy istniejącego zdjęcia
+# i nie pojawiają się osobno w wynikach wyszukiwania
+TLUMIENIE_PODOBNYCH = os.getenv("TLUMIENIE_PODOBNYCH", "0") == "1"
+PROG_PODOBIENSTWA = float(os.getenv("PROG_PODOBIENSTWA", "0.95"))
+
+# Zróżnicowanie wyników wyszukiwania (MMR, patrz roznorodnosc.py): 0 = wyłączone,
+# wartości 0.3-0.7 rozrzucają wyniki między różne sceny zamiast serii jednej sceny
+ROZNORODNOSC_WYNIKOW = float(os.getenv("ROZNORODNOSC_WYNIKOW", "0"))
+# Ilu kandydatów (z wektorami) pobrać z Qdrant przed wyborem zróżnicowanych wyników
+LICZBA_KANDYDATOW_MMR = int(os.getenv("LICZBA_KANDYDATOW_MMR", "100"))
+
+# Wyszukiwanie: liczba wyników na stronę i minimalne podobieństwo (0 = bez odcięcia)
+LICZBA_WYNIKOW = int(os.getenv("LICZBA_WYNIKOW", "5"))
+PROG_WYNIKU = float(os.getenv("PROG_WYNIKU", "0"))
+# Pola payloadu pobierane przy wyszukiwaniu - reszta (EXIF, hasze, grupy) nie jest przesyłana
+POLA_WYNIKU = ["nazwa_zdjecia", "sciezka", "opis"]
+
+# Drzewo BK haszy percepcyjnych zbudowane z magazynu (sygnatura magazynu, drzewo)
+_drzewo_haszy = (None, None)
+
 # ===== FUNKCJE POMOCNICZE =====
 
-def utworz_klienta_qdrant():
+def utworz_klienta_qdrant(prefer_grpc=None):
     """
     Utwórz połączenie z bazą Qdrant
     - Jeśli QDRANT_URL jest ustawiony: użyj Qdrant Cloud
     - Jeśli nie: użyj lokalnego Qdrant (localhost:6333)
+    
+    Parametr:
+    - prefer_grpc: użyj transportu gRPC (domyślnie QDRANT_PREFER_GRPC z .env)
     """
+    from qdrant_client import QdrantClient  # import klienta Qdrant - baza wektorowa do przechowywania embeddingów
+    
+    # Ustawienia połączenia wspólne dla wszystkich wariantów
+    ustawienia = {
+        "prefer_grpc": QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "timeout": QDRANT_TIMEOUT
+    }
+    
     # Jeśli nie ma URL Qdrant - połącz się z lokalnym Qdrant
     if not QDRANT_URL:
         # localhost = Twoja maszyna, 6333 = domyślny port Qdrant
-        return QdrantClient(host="localhost", port=6333)
+        return QdrantClient(host="localhost", port=6333, **ustawienia)
     
     # Jeśli URL istnieje i jest klucz API - przekaż go
     if QDRANT_API_KEY:
-        return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+        return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, **ustawienia)
     else:
         # Połącz bez klucza
-        return QdrantClient(url=QDRANT_URL)
+        return QdrantClient(url=QDRANT_URL, **ustawienia)
+
+# Klient Qdrant (global - używany przez wszystkie funkcje), tworzony przy pierwszym użyciu
+_klient_qdrant = None
+_blokada_klienta = threading.Lock()
+
+def pobierz_klienta_qdrant():
+    """
+    Zwróć klienta Qdrant - tworzony przy pierwszym wywołaniu i zapamiętywany
+    """
+    global _klient_qdrant
+    if _klient_qdrant is None:
+        with _blokada_klienta:
+            if _klient_qdrant is None:
+                _klient_qdrant = utworz_klienta_qdrant()
+    return _klient_qdrant
+
+def __getattr__(nazwa):
+    """
+    Zgodność wsteczna: baza_danych.klient_qdrant tworzy klienta dopiero przy pierwszym odwołaniu
+    """
+    if nazwa == "klient_qdrant":
+        return pobierz_klienta_qdrant()
+    raise AttributeError(f"module {__name__!r} has no attribute {nazwa!r}")
 
-# Inicjalizuj klienta Qdrant (global - używany przez wszystkie funkcje)
-klient_qdrant = utworz_klienta_qdrant()
+@lru_cache(maxsize=8)
+def _klient_openai(klucz_api):
+    """
+    Klient OpenAI dla danego klucza (zapamiętany - bez tworzenia puli połączeń przy każdym zapytaniu)
+    """
+    from openai import OpenAI  # klient OpenAI do generowania embeddingów
+    return OpenAI(api_key=klucz_api)
 
 def pobierz_klienta_openai(klucz_api=None):
     """
@@ -52,18 +165,118 @@ def pobierz_klienta_openai(klucz_api=None):
     if not klucz_api:
         raise ValueError("Brak klucza OpenAI w zmiennych środowiskowych (OPENAI_API_KEY).")
     
-    # Utwórz i zwróć klienta OpenAI z kluczem
-    return OpenAI(api_key=klucz_api)
+    # Zwróć klienta OpenAI z kluczem (tworzony raz dla danego klucza)
+    return _klient_openai(klucz_api)
+
+def nazwa_wersji_kolekcji(wersja):
+    """
+    Zwróć nazwę wersjonowanej kolekcji, np. 1 -> "opisy_zdjec_v1"
+    """
+    return f"{NAZWA_KOLEKCJI}_v{wersja}"
+
+def nastepna_wersja_kolekcji():
+    """
+    Zwróć pierwszy wolny numer wersji kolekcji (opisy_zdjec_v1, v2, ...)
+    """
+    istniejace = {k.name for k in pobierz_klienta_qdrant().get_collections().collections}
+    wersja = 1
+    while nazwa_wersji_kolekcji(wersja) in istniejace:
+        wersja += 1
+    return wersja
+
+def rozwiaz_alias(alias=NAZWA_KOLEKCJI):
+    """
+    Zwróć nazwę kolekcji, na którą wskazuje alias
+    Jeśli alias nie istnieje - zwróć podaną nazwę (stara kolekcja bez aliasu)
+    """
+    for opis_aliasu in pobierz_klienta_qdrant().get_aliases().aliases:
+        if opis_aliasu.alias_name == alias:
+            return opis_aliasu.collection_name
+    return alias
+
+def utworz_kolekcje(nazwa, rozmiar_wektora=None, miara=None):
+    """
+    Utwórz kolekcję o podanej nazwie razem z indeksami payloadu
+    
+    Parametry:
+    - nazwa: nazwa kolekcji (np. "opisy_zdjec_v2")
+    - rozmiar_wektora: długość wektora (domyślnie ROZMIAR_WEKTORA)
+    - miara: miara odległości (domyślnie MIARA_ODLEGLOSCI)
+    """
+    pobierz_klienta_qdrant().create_collection(
+        collection_name=nazwa,  # nazwa kolekcji
+        vectors_config={
+            "size": rozmiar_wektora or ROZMIAR_WEKTORA,  # rozmiar wektora (zależy od modelu embeddingów)
+            "distance": miara or MIARA_ODLEGLOSCI  # miara podobieństwa
+        }
+    )
+    print(f"[baza_danych] Utworzono kolekcję '{nazwa}'")
+    
+    # Indeksy payloadu zakładamy od razu - na pustej kolekcji to nic nie kosztuje
+    utworz_indeksy_payloadu(nazwa)
+
+def przelacz_alias(nowa_kolekcja, alias=NAZWA_KOLEKCJI):
+    """
+    Przełącz alias na nową kolekcję
+    Usunięcie starego aliasu i utworzenie nowego to jedna operacja - Qdrant
+    wykonuje ją atomowo, więc wyszukiwania nie widzą momentu bez kolekcji
+    """
+    from qdrant_client.models import (
+        DeleteAliasOperation, DeleteAlias, CreateAliasOperation, CreateAlias
+    )
+    
+    operacje = []
+    
+    # Usuń stary alias tylko jeśli istnieje
+    if any(a.alias_name == alias for a in pobierz_klienta_qdrant().get_aliases().aliases):
+        operacje.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    
+    operacje.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=nowa_kolekcja, alias_name=alias)))
+    pobierz_klienta_qdrant().update_collection_aliases(change_aliases_operations=operacje)
+    print(f"[baza_danych] Alias '{alias}' wskazuje teraz na '{nowa_kolekcja}'")
+
+def utworz_indeksy_payloadu(nazwa_kolekcji=NAZWA_KOLEKCJI):
+    """
+    Utwórz indeksy payloadu (INDEKSY_PAYLOADU) w kolekcji
+    Utworzenie istniejącego już indeksu nic nie zmienia, więc można to wywołać wielokrotnie
+    """
+    global _indeksy_gotowe
+    
+    # Import tylko tutaj - modele Qdrant potrzebne są wyłącznie przy tworzeniu indeksów
+    from qdrant_client.models import TextIndexParams, TokenizerType
+    
+    for pole, typ in INDEKSY_PAYLOADU.items():
+        # Dla pola tekstowego: tokenizacja po słowach i małe litery ("iPhone" == "iphone")
+        schemat = TextIndexParams(type="text", tokenizer=TokenizerType.WORD, lowercase=True) if typ == "text" else typ
+        try:
+            pobierz_klienta_qdrant().create_payload_index(
+                collection_name=nazwa_kolekcji,  # w której kolekcji
+                field_name=pole,  # które pole payloadu
+                field_schema=schemat  # typ indeksu
+            )
+        except Exception as e:
+            # Brak indeksu spowalnia filtrowanie, ale nie psuje działania aplikacji
+            print(f"[baza_danych] Nie udało się utworzyć indeksu dla '{pole}': {e}")
+    
+    _indeksy_gotowe = True
 
 def inicjalizuj_kolekcje():
     """
     Inicjalizuj kolekcję w bazie Qdrant
-    - Jeśli kolekcja już istnieje: nic nie rób
-    - Jeśli nie istnieje: utwórz ją
+    - Jeśli kolekcja już istnieje: nic nie rób (poza jednorazowym sprawdzeniem indeksów)
+    - Jeśli nie istnieje: utwórz ją razem z indeksami payloadu
     """
     try:
         # Spróbuj pobrać info o kolekcji (aby sprawdzić czy istnieje)
-        klient_qdrant.get_collection(NAZWA_KOLEKCJI)
+        info = pobierz_klienta_qdrant().get_collection(NAZWA_KOLEKCJI)
+        
+        # Kolekcje utworzone przed dodaniem indeksów - uzupełnij je raz na proces
+        if not _indeksy_gotowe:
+            rozmiar_kolekcji = info.config.params.vectors.size
+            if rozmiar_kolekcji != ROZMIAR_WEKTORA:
+                print(f"[baza_danych] ⚠️ Kolekcja ma wektory o rozmiarze {rozmiar_kolekcji}, a model "
+                      f"'{MODEL_EMBEDDINGU}' daje {ROZMIAR_WEKTORA} - uruchom migracja.py albo zmień MODEL_EMBEDDINGU")
+            utworz_indeksy_payloadu()
     except Exception as e:
         # Wyłapano wyjątek - sprawdź rodzaj błędu
         msg = str(e)  # zamień wyjątek na string aby sprawdzić kod błędu
@@ -74,13 +287,11 @@ def inicjalizuj_kolekcje():
         
         # Jeśli błąd to 404 Not Found lub "doesn't exist" - kolekcja nie istnieje, trzeba ją utworzyć
         if "404" in msg or "not found" in msg.lower() or "doesn't exist" in msg.lower():
-            # Spróbuj utworzyć nową kolekcję
+            # Spróbuj utworzyć pierwszą wersję kolekcji i wskazać ją aliasem
             try:
-                klient_qdrant.create_collection(
-                    collection_name=NAZWA_KOLEKCJI,  # nazwa kolekcji
-                    vectors_config={"size": 1536, "distance": "Cosine"}  # rozmiar wektora=1536 (text-embedding-3-small), miara=cosinus
-                )
-                print(f"[baza_danych] Utworzono kolekcję '{NAZWA_KOLEKCJI}'")
+                nowa_kolekcja = nazwa_wersji_kolekcji(nastepna_wersja_kolekcji())
+                utworz_kolekcje(nowa_kolekcja)
+                przelacz_alias(nowa_kolekcja)
             except Exception as e2:
                 # Jeśli nie udało się utworzyć - wyrzuć błąd
                 raise RuntimeError(f"Nie udało się utworzyć kolekcji: {e2}")
@@ -90,6 +301,28 @@ def inicjalizuj_kolekcje():
 
 # ===== FUNKCJE DO OBSŁUGI EMBEDDINGÓW =====
 
+def pobierz_dostawce_embeddingow(klucz_api=None, model=None, dostawca=None, rozmiar=None):
+    """
+    Zwróć dostawcę embeddingów skonfigurowanego w .env (albo podanego jawnie - np. przy migracji)
+    
+    Parametry:
+    - klucz_api: klucz API OpenAI (opcjonalny, tylko dla dostawcy "openai")
+    - model: model embeddingów (domyślnie MODEL_EMBEDDINGU)
+    - dostawca: "openai" albo "lokalny" (domyślnie DOSTAWCA_EMBEDDINGOW)
+    - rozmiar: długość wektora (domyślnie rozmiar modelu albo ROZMIAR_WEKTORA z .env)
+    """
+    dostawca = dostawca or DOSTAWCA_EMBEDDINGOW
+    
+    # ROZMIAR_WEKTORA z .env dotyczy tylko modelu z .env - inny model ma swój domyślny rozmiar
+    domyslna_konfiguracja = dostawca == DOSTAWCA_EMBEDDINGOW and (model or MODEL_EMBEDDINGU) == MODEL_EMBEDDINGU
+    
+    return embedding.pobierz_dostawce(
+        dostawca,
+        model or (MODEL_EMBEDDINGU if dostawca == DOSTAWCA_EMBEDDINGOW else None),
+        rozmiar or (ROZMIAR_WEKTORA if domyslna_konfiguracja else None),
+        (klucz_api or os.getenv("OPENAI_API_KEY")) if dostawca == "openai" else None
+    )
+
 def generuj_embedding(tekst, klucz_api=None):
     """
     Wygeneruj embedding dla tekstu (zamień tekst na wektor)
@@ -98,31 +331,35 @@ def generuj_embedding(tekst, klucz_api=None):
     Parametry:
     - tekst: tekst do wygenerowania embeddingu
     - klucz_api: klucz API OpenAI (opcjonalny, jeśli nie podany będzie pobrany z os.getenv)
+    
+    Zwraca: wektor numpy float32 znormalizowany do długości 1 (Qdrant przyjmuje go bez zamiany na listę)
     """
     try:
-        # Pobierz klienta OpenAI
-        print(f"[baza_danych] Pobieram klienta OpenAI...")
-        klient_openai = pobierz_klienta_openai(klucz_api)
-        print(f"[baza_danych] Klient OpenAI gotowy")
-        
-        # Wyślij tekst do OpenAI i otrzymaj embedding
-        print(f"[baza_danych] Wysyłam zapytanie do OpenAI API (model: text-embedding-3-small)...")
-        odpowiedz = klient_openai.embeddings.create(
-            model="text-embedding-3-small",  # model do generowania embeddingów
-            input=tekst  # tekst do przetworzenia
-        )
-        print(f"[baza_danych] Otrzymano odpowiedź z OpenAI")
-        
-        # Wyciągnij wektor z odpowiedzi (zwróć jako listę liczb)
-        embedding = odpowiedz.data[0].embedding
-        print(f"[baza_danych] Embedding wygenerowany pomyślnie (długość: {len(embedding)})")
-        return embedding
+        dostawca = pobierz_dostawce_embeddingow(klucz_api)
+        print(f"[baza_danych] Generuję embedding (dostawca: {dostawca.nazwa}, model: {dostawca.model})...")
+        wektor = dostawca.osadz([tekst])[0]
+        print(f"[baza_danych] Embedding wygenerowany pomyślnie (długość: {len(wektor)})")
+        return wektor
     except Exception as e:
         print(f"[baza_danych] BŁĄD w generuj_embedding: {e}")
         import traceback
         print(f"[baza_danych] Traceback: {traceback.format_exc()}")
         raise
 
+def generuj_embeddingi(teksty, klucz_api=None, model=None, dostawca=None):
+    """
+    Wygeneruj embeddingi dla wielu tekstów (partiami - jedno zapytanie na partię)
+    
+    Parametry:
+    - teksty: lista tekstów
+    - klucz_api: klucz API OpenAI (opcjonalny)
+    - model: model embeddingów (domyślnie MODEL_EMBEDDINGU)
+    - dostawca: dostawca embeddingów (domyślnie DOSTAWCA_EMBEDDINGOW)
+    
+    Zwraca: macierz numpy float32 (liczba_tekstow x rozmiar), wiersze w kolejności tekstów
+    """
+    return pobierz_dostawce_embeddingow(klucz_api, model, dostawca).osadz(teksty)
+
 def pobierz_nazwe_zdjecia(sciezka):
     """
     Ekstraktuj nazwę pliku ze ścieżki
@@ -136,37 +373,123 @@ def pobierz_nazwe_zdjecia(sciezka):
     # Jeśli ścieżka jest None - zwróć None
     return None
 
+def zsynchronizuj_magazyn(wymus=False):
+    """
+    Wypełnij lokalny magazyn metadanych danymi z Qdrant
+    
+    Wykonywane raz (np. po aktualizacji aplikacji z istniejącą kolekcją albo po
+    imporcie kopii indeksu) - później magazyn jest aktualizowany przy każdym zapisie.
+    
+    Parametr:
+    - wymus: synchronizuj nawet jeśli magazyn był już zsynchronizowany
+    """
+    if not wymus and magazyn_metadanych.pobierz_ustawienie("zsynchronizowano_z_qdrant"):
+        return
+    
+    try:
+        inicjalizuj_kolekcje()
+        
+        with magazyn_metadanych.transakcja() as polaczenie:
+            magazyn_metadanych.usun_wszystkie(polaczenie)
+            
+            # Przewijaj kolekcję stronami (bez wektorów - potrzebny tylko payload)
+            offset = None
+            while True:
+                punkty, offset = pobierz_klienta_qdrant().scroll(
+                    collection_name=NAZWA_KOLEKCJI, limit=1000, offset=offset,
+                    with_payload=True, with_vectors=False
+                )
+                for punkt in punkty:
+                    payload = punkt.payload or {}
+                    if not payload.get("nazwa_zdjecia"):
+                        continue
+                    magazyn_metadanych.zapisz_zdjecie(
+                        punkt.id, payload["nazwa_zdjecia"], payload.get("sciezka"), payload.get("hash"),
+                        payload.get("opis"), None,
+                        {k: v for k, v in payload.items() if k not in ("opis", "sciezka", "nazwa_zdjecia")},
+                        polaczenie=polaczenie, dhash=payload.get("dhash")
+                    )
+                if offset is None:
+                    break
+            
+            magazyn_metadanych.zapisz_ustawienie("zsynchronizowano_z_qdrant", "1", polaczenie)
+        
+        print(f"[baza_danych] Magazyn metadanych zsynchronizowany ({magazyn_metadanych.liczba_zdjec()} zdjęć)")
+    except Exception as e:
+        # Qdrant niedostępny - korzystamy z tego co jest w magazynie, spróbujemy następnym razem
+        print(f"[baza_danych] Nie udało się zsynchronizować magazynu metadanych: {e}")
+
 def sprawdz_czy_zdjecie_istnieje(nazwa_zdjecia):
     """
     Sprawdź czy zdjęcie o danej nazwie już istnieje w bazie
+    Odpowiedź pochodzi z lokalnego magazynu metadanych (indeks na nazwie)
     Zwraca: True jeśli istnieje, False jeśli nie
     """
-    # Inicjalizuj kolekcję (upewnij się że istnieje)
-    inicjalizuj_kolekcje()
+    zsynchronizuj_magazyn()
     
     try:
-        # Pobierz wszystkie punkty (embeddingi) z kolekcji
-        # scroll() zwraca tupla (lista_punktów, następny_offset)
-        wszystkie_punkty, _ = klient_qdrant.scroll(
-            collection_name=NAZWA_KOLEKCJI,  # z której kolekcji
-            limit=10000  # maksymalnie 10000 wyników
-        )
-        
-        # Pętla po każdym punkcie (embedding)
-        for punkt in wszystkie_punkty:
-            # Sprawdź czy nazwa_zdjecia w metadata pasuje do szukanej nazwy
-            if punkt.payload.get("nazwa_zdjecia") == nazwa_zdjecia:
-                # Znaleźliśmy! Zwróć True
-                return True
-        
-        # Przeglądnęliśmy wszystkie i nie znaleźliśmy - zwróć False
-        return False
+        return magazyn_metadanych.czy_nazwa_istnieje(nazwa_zdjecia)
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd i zwróć False
         print(f"[baza_danych] Błąd przy sprawdzaniu duplikatu: {e}")
         return False
 
-def zapisz_embedding(opis, sciezka_zdjecia=None, klucz_api=None):
+def _pobierz_drzewo_haszy():
+    """
+    Zwróć drzewo BK ze wszystkimi haszami percepcyjnymi z magazynu
+    Drzewo jest budowane ponownie tylko gdy zawartość magazynu się zmieniła
+    """
+    global _drzewo_haszy
+    
+    sygnatura = magazyn_metadanych.sygnatura_zmian()
+    if _drzewo_haszy[0] != sygnatura:
+        drzewo = DrzewoBK()
+        for hash_percepcyjny, nazwa in magazyn_metadanych.pobierz_hasze_percepcyjne():
+            drzewo.dodaj(hash_percepcyjny, nazwa)
+        _drzewo_haszy = (sygnatura, drzewo)
+    
+    return _drzewo_haszy[1]
+
+def znajdz_podobne_zdjecia(hasze_percepcyjne, nazwy=None, maks_odleglosc=None):
+    """
+    Znajdź zapisane zdjęcia wizualnie podobne do zdjęć z przesyłanej partii
+    
+    Porównuje także zdjęcia w obrębie partii (to samo zdjęcie przesłane dwa razy).
+    
+    Parametry:
+    - hasze_percepcyjne: lista dHash (tekst szesnastkowy) zdjęć z partii
+    - nazwy: nazwy plików z partii (do opisu podobieństw w obrębie partii)
+    - maks_odleglosc: maksymalna odległość Hamminga (domyślnie MAKS_ODLEGLOSC_HAMMINGA)
+    
+    Zwraca: słownik indeks_w_partii -> lista tupli (odleglosc, nazwa_podobnego_zdjecia)
+    (tylko dla zdjęć, które mają podobne)
+    """
+    zsynchronizuj_magazyn()
+    
+    if maks_odleglosc is None:
+        maks_odleglosc = MAKS_ODLEGLOSC_HAMMINGA
+    
+    drzewo_zapisanych = _pobierz_drzewo_haszy()
+    drzewo_partii = DrzewoBK()  # zdjęcia z tej samej partii (wcześniejsze indeksy)
+    podobne = {}
+    
+    for idx, hash_percepcyjny in enumerate(hasze_percepcyjne):
+        if not hash_percepcyjny:
+            continue
+        
+        trafienia = drzewo_zapisanych.znajdz(hash_percepcyjny, maks_odleglosc)
+        trafienia += [
+            (odleglosc, f"{nazwa} (w tej partii)")
+            for odleglosc, nazwa in drzewo_partii.znajdz(hash_percepcyjny, maks_odleglosc)
+        ]
+        if trafienia:
+            podobne[idx] = sorted(trafienia, key=lambda t: t[0])
+        
+        drzewo_partii.dodaj(hash_percepcyjny, nazwy[idx] if nazwy else f"#{idx + 1}")
+    
+    return podobne
+
+def zapisz_embedding(opis, sciezka_zdjecia=None, klucz_api=None, metadane=None, nazwa_zdjecia=None):
     """
     Zapisz embedding (reprezentacja wektorowa tekstu) w bazie
     
@@ -174,6 +497,8 @@ def zapisz_embedding(opis, sciezka_zdjecia=None, klucz_api=None):
     - opis: tekst opisu zdjęcia (będzie zamieniony na wektor)
     - sciezka_zdjecia: ścieżka do pliku zdjęcia (opcjonalna)
     - klucz_api: klucz API OpenAI (opcjonalny)
+    - metadane: dodatkowe pola payloadu (hash, wymiary, EXIF - patrz INDEKSY_PAYLOADU)
+    - nazwa_zdjecia: oryginalna nazwa zdjęcia (domyślnie nazwa pliku ze ścieżki)
     """
     # Inicjalizuj kolekcję
     inicjalizuj_kolekcje()
@@ -181,8 +506,10 @@ def zapisz_embedding(opis, sciezka_zdjecia=None, klucz_api=None):
     # Wygeneruj embedding dla opisu (zamień tekst na wektor liczb)
     embedding = generuj_embedding(opis, klucz_api)
     
-    # Pobierz nazwę zdjęcia ze ścieżki (np. "foto.jpg" z "C:/Users/.../foto.jpg")
-    nazwa_zdjecia = pobierz_nazwe_zdjecia(sciezka_zdjecia)
+    # Pliki są zapisywane pod nazwą z hasha - oryginalna nazwa przychodzi jako metadana,
+    # a dla starszych wywołań jest brana ze ścieżki (np. "foto.jpg" z "C:/Users/.../foto.jpg")
+    if not nazwa_zdjecia:
+        nazwa_zdjecia = pobierz_nazwe_zdjecia(sciezka_zdjecia)
     
     # Utwórz słownik metadanych (dodatkowe info powiązane z embeddingiem)
     metadata = {
@@ -191,105 +518,434 @@ def zapisz_embedding(opis, sciezka_zdjecia=None, klucz_api=None):
         "nazwa_zdjecia": nazwa_zdjecia  # nazwa pliku (bez ścieżki)
     }
     
-    # Wygeneruj unikalny ID dla tego embeddingu
-    # hash() = funkcja zamieniająca tekst na liczbę, % (10**10) = mod 10 bilionów (aby ID nie był gigantyczny)
-    id_punktu = hash(opis) % (10 ** 10)
+    # Dołącz typowane metadane (data wykonania, aparat, GPS, wymiary...)
+    if metadane:
+        metadata.update(metadane)
+    
+    # Wygeneruj unikalny ID dla tego embeddingu (ten sam w każdym procesie)
+    id_punktu = identyfikator_punktu(nazwa_zdjecia, metadata.get("hash"), opis)
     
     try:
-        # Wstaw (lub zaktualizuj jeśli istnieje) punkt do Qdrant
-        klient_qdrant.upsert(
-            collection_name=NAZWA_KOLEKCJI,  # w którą kolekcję
-            points=[  # lista punktów do wstawienia
-                {
-                    "id": id_punktu,  # unikalny identyfikator
-                    "vector": embedding,  # wektor (embedding) tekstu
-                    "payload": metadata  # metadane (info dodatkowe)
-                }
-            ]
-        )
+        from qdrant_client.models import PointStruct
+        
+        # Zapis do magazynu metadanych i upsert do Qdrant w jednej transakcji:
+        # jeśli upsert się nie uda - rekord w SQLite zostanie wycofany
+        with magazyn_metadanych.transakcja() as polaczenie:
+            magazyn_metadanych.zapisz_zdjecie(
+                id_punktu, nazwa_zdjecia, sciezka_zdjecia,
+                (metadane or {}).get("hash"), opis, MODEL_EMBEDDINGU, metadane,
+                polaczenie=polaczenie, dhash=(metadane or {}).get("dhash")
+            )
+            
+            # Wstaw (lub zaktualizuj jeśli istnieje) punkt do Qdrant
+            pobierz_klienta_qdrant().upsert(
+                collection_name=NAZWA_KOLEKCJI,  # w którą kolekcję
+                points=[  # lista punktów do wstawienia
+                    PointStruct(
+                        id=id_punktu,  # unikalny identyfikator
+                        vector=embedding.tolist(),  # wektor (embedding) tekstu - PointStruct wymaga listy
+                        payload=metadata  # metadane (info dodatkowe)
+                    )
+                ]
+            )
         print(f"[baza_danych] Embedding zapisany (ID: {id_punktu})")
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd
         print(f"[baza_danych] Błąd przy zapisie embeddingu: {e}")
 
-def wyszukaj_zdjecia(opis_wyszukiwania, liczba_wynikow=5, klucz_api=None):
+# Przestrzeń nazw ID punktów (uuid5) - stała, żeby ID nie zależało od procesu ani wersji
+PRZESTRZEN_ID_PUNKTOW = uuid.uuid5(uuid.NAMESPACE_URL, "znajdywacz-zdjec/punkty")
+
+def identyfikator_punktu(nazwa_zdjecia, hash_zawartosci=None, opis=None):
+    """
+    ID punktu w Qdrant: UUID wyliczony z sha256 zawartości i nazwy zdjęcia
+    
+    Wcześniej ID było hash(opis) % 10**10 - hash() tekstu jest losowany w każdym procesie
+    (pracownik, obserwacja folderu i migracja dawały temu samemu zdjęciu różne ID),
+    a przy setkach tysięcy zdjęć przestrzeń 10**10 daje kolizje, po których upsert
+    po cichu nadpisuje inne zdjęcie. Nazwa wchodzi do klucza, bo ta sama zawartość
+    pod dwiema nazwami (kopia w innym podfolderze) to dwa wpisy katalogu.
+    Bez hasha (starsze wywołania zapisz_embedding) kluczem jest opis.
+    """
+    return str(uuid.uuid5(PRZESTRZEN_ID_PUNKTOW, f"{hash_zawartosci or opis}/{nazwa_zdjecia}"))
+
+def _grupuj_podobne(wektory, prog):
+    """
+    Pogrupuj prawie identyczne wektory: zapytaj Qdrant o najbliższego reprezentanta
+    dla wszystkich wektorów naraz i porównaj wektory w obrębie partii
+    
+    Parametry:
+    - wektory: macierz float32 znormalizowanych wektorów nowych punktów
+    - prog: minimalne podobieństwo (cosinus), od którego punkty są w jednej grupie
+    
+    Zwraca: lista (dla każdego wektora) ID grupy istniejącego reprezentanta,
+    indeksu reprezentanta w partii (jako "#indeks") albo None gdy wektor sam jest reprezentantem
+    """
+    import numpy as np
+    from qdrant_client.models import QueryRequest, Filter, FieldCondition, MatchValue
+    
+    # Jedno zapytanie wsadowe: najbliższy reprezentant powyżej progu dla każdego wektora
+    tylko_reprezentanci = Filter(must_not=[FieldCondition(key="reprezentant", match=MatchValue(value=False))])
+    odpowiedzi = pobierz_klienta_qdrant().query_batch_points(
+        collection_name=NAZWA_KOLEKCJI,
+        requests=[
+            QueryRequest(query=w.tolist(), filter=tylko_reprezentanci, limit=1,
+                         score_threshold=prog, with_payload=["grupa"])
+            for w in wektory
+        ]
+    )
+    
+    # Podobieństwa w obrębie partii (wektory są już znormalizowane - cosinus to iloczyn skalarny)
+    macierz = np.asarray(wektory, dtype=np.float32)
+    podobienstwa = macierz @ macierz.T
+    
+    grupy = []
+    for idx, odpowiedz in enumerate(odpowiedzi):
+        if odpowiedz.points:
+            # Istniejący reprezentant - dołącz do jego grupy
+            najblizszy = odpowiedz.points[0]
+            grupy.append((najblizszy.payload or {}).get("grupa", najblizszy.id))
+            continue
+        
+        # Wcześniejszy reprezentant z tej samej partii powyżej progu
+        wczesniejsze = [j for j in range(idx) if grupy[j] is None and podobienstwa[idx, j] >= prog]
+        grupy.append(f"#{wczesniejsze[0]}" if wczesniejsze else None)
+    
+    return grupy
+
+def _zapisz_pojedynczo(wektory, identyfikatory, payloady):
+    """
+    Zapis punkt po punkcie po odrzuceniu całej partii przez Qdrant (np. błędny payload
+    jednego zdjęcia) - odrzucone zostają tylko błędne punkty
+    
+    Punkty grupy, której reprezentant z tej partii został odrzucony, dostają nowego
+    reprezentanta (pierwszy zapisany punkt grupy) - inaczej byłyby ukryte w wynikach.
+    
+    Zwraca: słownik {indeks punktu: komunikat błędu}
+    """
+    from qdrant_client.models import PointStruct
+    
+    bledy = {}
+    zastepcy = {}  # ID odrzuconego reprezentanta -> ID nowego reprezentanta (None = jeszcze brak)
+    for idx, (id_punktu, payload) in enumerate(zip(identyfikatory, payloady)):
+        grupa = payload.get("grupa")
+        if grupa in zastepcy:
+            if zastepcy[grupa] is None:
+                zastepcy[grupa] = id_punktu
+            payload["grupa"] = zastepcy[grupa]
+            payload["reprezentant"] = zastepcy[grupa] == id_punktu
+        try:
+            pobierz_klienta_qdrant().upsert(
+                collection_name=NAZWA_KOLEKCJI,
+                points=[PointStruct(id=id_punktu, vector=wektory[idx].tolist(), payload=payload)],
+                wait=True
+            )
+        except Exception as e:
+            bledy[idx] = str(e)
+            print(f"[baza_danych] ❌ Qdrant odrzucił punkt {payload.get('nazwa_zdjecia')}: {e}")
+            if payload.get("reprezentant"):
+                # Kolejny punkt grupy przejmie rolę reprezentanta
+                zastepcy[grupa if grupa in zastepcy else id_punktu] = None
+    return bledy
+
+def zapisz_embeddingi(elementy, klucz_api=None, tlumienie=None):
+    """
+    Zapisz wiele opisów naraz: jedno zapytanie o embeddingi, jeden zapis macierzy wektorów
+    do Qdrant i jedna transakcja w magazynie metadanych
+    
+    Gdy Qdrant odrzuci całą partię, punkty są zapisywane pojedynczo - nieudane są tylko
+    zdjęcia z błędnym payloadem, a nie całe zadanie.
+    
+    Parametry:
+    - elementy: lista słowników z kluczami "opis", "sciezka" i opcjonalnie "nazwa", "metadane"
+      (wynik przetworz_zdjecia)
+    - klucz_api: klucz API OpenAI (opcjonalny)
+    - tlumienie: czy grupować prawie identyczne zdjęcia (domyślnie TLUMIENIE_PODOBNYCH)
+    
+    Zwraca: słownik {"zapisane": liczba punktów, "zgrupowane": ile dołączyło do istniejącej grupy,
+    "bledy": {indeks elementu: komunikat} dla niezapisanych elementów,
+    "identyfikatory": ID punktu każdego elementu (None dla niezapisanych)}
+    """
+    if not elementy:
+        return {"zapisane": 0, "zgrupowane": 0, "bledy": {}, "identyfikatory": []}
+    
+    if tlumienie is None:
+        tlumienie = TLUMIENIE_PODOBNYCH
+    
+    # Inicjalizuj kolekcję
+    inicjalizuj_kolekcje()
+    
+    # Wszystkie embeddingi jednym zapytaniem (macierz float32, bez kopiowania do list Pythona)
+    wektory = generuj_embeddingi([e["opis"] for e in elementy], klucz_api)
+    
+    # Grupy prawie identycznych zdjęć (jedno zapytanie wsadowe do Qdrant)
+    grupy = _grupuj_podobne(wektory, PROG_PODOBIENSTWA) if tlumienie else [None] * len(elementy)
+    
+    identyfikatory = []
+    payloady = []
+    for element, grupa in zip(elementy, grupy):
+        opis = element["opis"]
+        metadane = dict(element.get("metadane") or {})
+        nazwa_zdjecia = element.get("nazwa") or pobierz_nazwe_zdjecia(element["sciezka"])
+        id_punktu = identyfikator_punktu(nazwa_zdjecia, metadane.get("hash"), opis)
+        
+        if tlumienie:
+            if grupa is None:
+                grupa = id_punktu  # reprezentant własnej grupy
+            elif isinstance(grupa, str) and grupa.startswith("#"):
+                grupa = identyfikatory[int(grupa[1:])]  # reprezentant z tej samej partii
+            metadane["grupa"] = grupa
+            metadane["reprezentant"] = grupa == id_punktu
+        
+        payload = {"opis": opis, "sciezka": element["sciezka"], "nazwa_zdjecia": nazwa_zdjecia}
+        payload.update(metadane)
+        identyfikatory.append(id_punktu)
+        payloady.append(payload)
+    
+    bledy = {}
+    try:
+        with magazyn_metadanych.transakcja() as polaczenie:
+            # Cała macierz naraz - klient dzieli ją na partie i zamienia na listy dopiero przy wysyłce
+            # (wait=True: rekordy w SQLite zatwierdzamy dopiero gdy Qdrant potwierdzi zapis)
+            try:
+                pobierz_klienta_qdrant().upload_collection(
+                    collection_name=NAZWA_KOLEKCJI, vectors=wektory, payload=payloady,
+                    ids=identyfikatory, wait=True
+                )
+            except Exception as e:
+                print(f"[baza_danych] Qdrant odrzucił partię ({e}) - zapisuję punkty pojedynczo")
+                bledy = _zapisz_pojedynczo(wektory, identyfikatory, payloady)
+            
+            for idx, (id_punktu, payload) in enumerate(zip(identyfikatory, payloady)):
+                if idx in bledy:
+                    continue
+                # Metadane = payload bez trzech pól podstawowych (grupa mogła się zmienić przy zapisie pojedynczo)
+                metadane = {k: v for k, v in payload.items() if k not in ("opis", "sciezka", "nazwa_zdjecia")}
+                magazyn_metadanych.zapisz_zdjecie(
+                    id_punktu, payload["nazwa_zdjecia"], payload["sciezka"], metadane.get("hash"), payload["opis"],
+                    MODEL_EMBEDDINGU, metadane, polaczenie=polaczenie, dhash=metadane.get("dhash")
+                )
+    except Exception as e:
+        print(f"[baza_danych] Błąd przy zapisie embeddingów: {e}")
+        return {
+            "zapisane": 0, "zgrupowane": 0, "bledy": {idx: str(e) for idx in range(len(elementy))},
+            "identyfikatory": [None] * len(elementy)
+        }
+    
+    zapisane = len(identyfikatory) - len(bledy)
+    zgrupowane = sum(
+        payload.get("reprezentant") is False for idx, payload in enumerate(payloady) if idx not in bledy
+    )
+    print(f"[baza_danych] Zapisano {zapisane} embeddingów (zgrupowane z podobnymi: {zgrupowane}, odrzucone: {len(bledy)})")
+    return {
+        "zapisane": zapisane, "zgrupowane": zgrupowane, "bledy": bledy,
+        "identyfikatory": [None if idx in bledy else id_punktu for idx, id_punktu in enumerate(identyfikatory)]
+    }
+
+def zbuduj_filtr(data_od=None, data_do=None, rok=None, aparat=None, w_poblizu=None, ukryj_podobne=True,
+                 tagi=None):
+    """
+    Zbuduj filtr Qdrant z argumentów wyszukiwania (wszystkie warunki muszą być spełnione)
+    
+    Parametry:
+    - data_od, data_do: zakres daty wykonania (date/datetime lub tekst ISO 8601)
+    - rok: rok wykonania zdjęcia (int)
+    - aparat: słowo z nazwy aparatu (np. "iphone")
+    - w_poblizu: tupla (szerokość_geo, długość_geo, promień_w_metrach)
+    - ukryj_podobne: pomiń punkty, które nie są reprezentantami swojej grupy
+    - tagi: słownik pole -> lista wartości (np. {"obiekty": ["pies"]}) - zdjęcie musi mieć wszystkie
+    
+    Zwraca: obiekt Filter albo None gdy nie ma żadnego warunku
+    """
+    from qdrant_client.models import (
+        Filter, FieldCondition, DatetimeRange, MatchValue, MatchText, GeoRadius, GeoPoint
+    )
+    
+    warunki = []
+    
+    # Zakres dat - filtr po indeksie datetime
+    if data_od is not None or data_do is not None:
+        warunki.append(FieldCondition(key="data_wykonania", range=DatetimeRange(gte=data_od, lte=data_do)))
+    
+    # Rok - dokładne dopasowanie po indeksie integer
+    if rok is not None:
+        warunki.append(FieldCondition(key="rok", match=MatchValue(value=int(rok))))
+    
+    # Aparat - wyszukiwanie słowa w indeksie tekstowym
+    if aparat:
+        warunki.append(FieldCondition(key="aparat", match=MatchText(text=aparat)))
+    
+    # Lokalizacja - zdjęcia w promieniu od punktu (indeks geo)
+    if w_poblizu is not None:
+        szerokosc_geo, dlugosc_geo, promien = w_poblizu
+        warunki.append(FieldCondition(
+            key="lokalizacja",
+            geo_radius=GeoRadius(center=GeoPoint(lat=szerokosc_geo, lon=dlugosc_geo), radius=promien)
+        ))
+    
+    # Tagi - dokładne dopasowanie po indeksach keyword/integer (pole-lista pasuje gdy zawiera wartość)
+    for pole, wartosci in (tagi or {}).items():
+        for wartosc in wartosci:
+            if INDEKSY_PAYLOADU.get(pole) == "integer":
+                wartosc = int(wartosc)
+            warunki.append(FieldCondition(key=pole, match=MatchValue(value=wartosc)))
+    
+    # Prawie identyczne zdjęcia - w wynikach tylko reprezentant grupy
+    # (punkty bez pola "reprezentant" przechodzą - must_not dotyczy tylko wartości False)
+    wykluczenia = []
+    if ukryj_podobne:
+        wykluczenia.append(FieldCondition(key="reprezentant", match=MatchValue(value=False)))
+    
+    # Brak warunków - brak filtra (zwykłe wyszukiwanie)
+    if not warunki and not wykluczenia:
+        return None
+    
+    return Filter(must=warunki or None, must_not=wykluczenia or None)
+
+class WynikWyszukiwania(NamedTuple):
+    """
+    Jeden wynik wyszukiwania (niezmienny, bez kopii całego payloadu)
+    
+    Pola:
+    - id: ID punktu w Qdrant
+    - podobienstwo: score z Qdrant (podobieństwo cosinusowe 0-1)
+    - nazwa_zdjecia, sciezka, opis: pola payloadu (None gdy nie zostały pobrane)
+    - dodatkowe: pozostałe pobrane pola payloadu (tylko do odczytu)
+    """
+    id: object
+    podobienstwo: float
+    nazwa_zdjecia: object = None
+    sciezka: object = None
+    opis: object = None
+    dodatkowe: Mapping = MappingProxyType({})
+    
+    def get(self, klucz, domyslnie=None):
+        """
+        Odczyt jak ze słownika (zgodność ze starszym kodem, który dostawał payload z "similarity")
+        """
+        if klucz == "similarity":
+            return self.podobienstwo
+        if klucz in self._fields:
+            wartosc = getattr(self, klucz)
+            return domyslnie if wartosc is None else wartosc
+        return self.dodatkowe.get(klucz, domyslnie)
+
+def _utworz_wynik(punkt):
+    """
+    Zamień punkt z Qdrant na WynikWyszukiwania
+    """
+    payload = punkt.payload or {}
+    return WynikWyszukiwania(
+        id=punkt.id,
+        podobienstwo=punkt.score,
+        nazwa_zdjecia=payload.get("nazwa_zdjecia"),
+        sciezka=payload.get("sciezka"),
+        opis=payload.get("opis"),
+        dodatkowe=MappingProxyType(
+            {k: v for k, v in payload.items() if k not in ("nazwa_zdjecia", "sciezka", "opis")}
+        )
+    )
+
+@lru_cache(maxsize=64)
+def embedding_zapytania(tekst, klucz_api=None):
+    """
+    Embedding zapytania zapamiętany dla kolejnych stron wyników
+    ("pokaż więcej" nie wysyła ponownie zapytania do OpenAI)
+    
+    Wyszukiwanie w tle (wyszukiwanie_w_tle.py) wywołuje go jako osobny etap
+    z własnym limitem czasu - wyszukaj_zdjecia dostaje potem gotowy wektor z pamięci.
+    """
+    wektor = generuj_embedding(tekst, klucz_api)
+    wektor.setflags(write=False)  # wspólny obiekt z pamięci podręcznej - tylko do odczytu
+    return wektor
+
+def wyszukaj_zdjecia(opis_wyszukiwania, liczba_wynikow=None, klucz_api=None,
+                     data_od=None, data_do=None, rok=None, aparat=None, w_poblizu=None,
+                     roznorodnosc_wynikow=None, offset=0, prog_podobienstwa=None, pola=POLA_WYNIKU,
+                     tagi=None, limit_czasu=None):
     """
     Wyszukaj zdjęcia pasujące do opisu
     
     Parametry:
     - opis_wyszukiwania: tekst co szukamy (np. "psy")
-    - liczba_wynikow: ile wyników zwrócić (domyślnie 5)
+    - liczba_wynikow: ile wyników zwrócić (domyślnie LICZBA_WYNIKOW)
     - klucz_api: klucz API OpenAI (opcjonalny)
+    - data_od, data_do, rok, aparat, w_poblizu: filtry metadanych (patrz zbuduj_filtr)
+      przekazywane do Qdrant - filtrowanie odbywa się w trakcie wyszukiwania wektorowego
+    - roznorodnosc_wynikow: 0-1, siła zróżnicowania wyników (domyślnie ROZNORODNOSC_WYNIKOW);
+      > 0 pobiera LICZBA_KANDYDATOW_MMR kandydatów z wektorami i wybiera z nich metodą MMR
+    - offset: ile pierwszych wyników pominąć (kolejne strony, patrz wyszukaj_strone)
+    - prog_podobienstwa: minimalne podobieństwo wyniku (domyślnie PROG_WYNIKU) - odcięcie
+      wykonuje Qdrant, więc słabe dopasowania w ogóle nie są przesyłane
+    - pola: lista pól payloadu do pobrania (domyślnie POLA_WYNIKU, True = cały payload)
+    - tagi: filtr tagów (patrz zbuduj_filtr), np. {"scena": ["plaża"]}
+    - limit_czasu: limit czasu wyszukiwania po stronie serwera Qdrant [s] - serwer przerywa
+      zbyt długie wyszukiwanie zamiast liczyć wynik, na który nikt już nie czeka
     
-    Zwraca: lista słowników z metadanymi znalezionych zdjęć (zawiera także similarity)
+    Zwraca: lista obiektów WynikWyszukiwania (od najlepszego dopasowania)
     """
     print(f"[baza_danych] Rozpoczynam wyszukiwanie dla: '{opis_wyszukiwania}'")
     
+    if liczba_wynikow is None:
+        liczba_wynikow = LICZBA_WYNIKOW
+    if prog_podobienstwa is None:
+        prog_podobienstwa = PROG_WYNIKU
+    
+    # Filtr metadanych (None = bez filtrowania)
+    filtr = zbuduj_filtr(data_od, data_do, rok, aparat, w_poblizu, tagi=tagi)
+    
+    if roznorodnosc_wynikow is None:
+        roznorodnosc_wynikow = ROZNORODNOSC_WYNIKOW
+    zroznicuj = roznorodnosc_wynikow > 0
+    
     # Inicjalizuj kolekcję
     inicjalizuj_kolekcje()
-    print(f"[baza_danych] Kolekcja '{NAZWA_KOLEKCJI}' zainicjalizowana")
     
     try:
         # Wygeneruj embedding dla zapytania (słowo/fraza co szukamy)
-        print(f"[baza_danych] Generuję embedding dla zapytania...")
-        embedding_zapytania = generuj_embedding(opis_wyszukiwania, klucz_api)
-        print(f"[baza_danych] Embedding wygenerowany (długość: {len(embedding_zapytania)})")
+        wektor_zapytania = embedding_zapytania(opis_wyszukiwania, klucz_api)
     except Exception as e:
         print(f"[baza_danych] BŁĄD przy generowaniu embeddingu: {e}")
         return []
     
     try:
-        # Wyszukaj w Qdrant embeddingi podobne do naszego zapytania
-        print(f"[baza_danych] Wyszukuję w Qdrant...")
-        
-        # Kompatybilność z różnymi wersjami qdrant-client
-        try:
-            # Nowsza wersja (>=1.7.0) - metoda search()
-            wyniki = klient_qdrant.search(
+        # query_points przyjmuje wektor numpy (float32) bez zamiany na listę
+        if zroznicuj:
+            # MMR wybiera wyniki po kolei, więc strona to wybory [offset, offset + liczba_wynikow)
+            # z tej samej puli kandydatów - kolejne strony nie powtarzają wyników
+            kandydaci = pobierz_klienta_qdrant().query_points(
                 collection_name=NAZWA_KOLEKCJI,
-                query_vector=embedding_zapytania,
-                limit=liczba_wynikow
+                query=wektor_zapytania,
+                query_filter=filtr,
+                limit=max(LICZBA_KANDYDATOW_MMR, offset + liczba_wynikow),
+                score_threshold=prog_podobienstwa or None,
+                with_payload=pola,
+                with_vectors=True,
+                timeout=math.ceil(limit_czasu) if limit_czasu else None
+            ).points
+            wybrane = roznorodnosc.mmr(
+                [k.score for k in kandydaci], [k.vector for k in kandydaci],
+                offset + liczba_wynikow, roznorodnosc_wynikow
             )
-        except AttributeError:
-            # Starsza wersja - metoda query_points() lub search_points()
-            from qdrant_client.models import SearchRequest, NamedVector
-            
-            try:
-                # Próba z query_points
-                wyniki = klient_qdrant.query_points(
-                    collection_name=NAZWA_KOLEKCJI,
-                    query=embedding_zapytania,
-                    limit=liczba_wynikow
-                ).points
-            except AttributeError:
-                # Ostatnia próba - search_points
-                from qdrant_client.models import Filter
-                wyniki = klient_qdrant.search_points(
-                    collection_name=NAZWA_KOLEKCJI,
-                    query_vector=embedding_zapytania,
-                    limit=liczba_wynikow
-                )
+            wyniki = [kandydaci[i] for i in wybrane[offset:]]
+            print(f"[baza_danych] Zróżnicowano wyniki (MMR, różnorodność {roznorodnosc_wynikow:.2f})")
+        else:
+            # Offset, próg i lista pól wykonuje Qdrant - przesyłana jest tylko żądana strona
+            wyniki = pobierz_klienta_qdrant().query_points(
+                collection_name=NAZWA_KOLEKCJI,
+                query=wektor_zapytania,
+                query_filter=filtr,
+                limit=liczba_wynikow,
+                offset=offset or None,
+                score_threshold=prog_podobienstwa or None,
+                with_payload=pola,
+                timeout=math.ceil(limit_czasu) if limit_czasu else None
+            ).points
         
         print(f"[baza_danych] Znaleziono {len(wyniki)} wyników")
         
-        # Utwórz listę na wyniki
-        lista_wynikow = []
-        
-        # Pętla po każdym znalezionym wyniku
-        for wynik in wyniki:
-            # Wyciągnij metadane (info) z wyniku
-            metadata = wynik.payload
-            
-            # Dodaj współczynnik dopasowania (similarity) do metadanych
-            # wynik.score = współczynnik Cosine Similarity (0-1)
-            metadata["similarity"] = wynik.score
-            
-            # Dodaj metadane do listy wyników
-            lista_wynikow.append(metadata)
-            print(f"[baza_danych]   - {metadata.get('nazwa_zdjecia')} (similarity: {wynik.score:.4f})")
-        
-        # Zwróć listę wyników z similarity
-        return lista_wynikow
+        # Niezmienne obiekty wyników (score = podobieństwo cosinusowe znormalizowanych wektorów)
+        return [_utworz_wynik(wynik) for wynik in wyniki]
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd i zwróć pustą listę
         print(f"[baza_danych] BŁĄD przy wyszukiwaniu w Qdrant: {e}")
@@ -297,99 +953,288 @@ def wyszukaj_zdjecia(opis_wyszukiwania, liczba_wynikow=5, klucz_api=None):
         print(f"[baza_danych] Traceback: {traceback.format_exc()}")
         return []
 
+def wyszukaj_strone(opis_wyszukiwania, token_strony=None, rozmiar_strony=None, **parametry):
+    """
+    Wyszukaj jedną stronę wyników ("pokaż więcej" bez ponownego pobierania wcześniejszych stron)
+    
+    Parametry:
+    - opis_wyszukiwania: tekst co szukamy
+    - token_strony: token z poprzedniego wywołania (None = pierwsza strona)
+    - rozmiar_strony: liczba wyników na stronie (domyślnie LICZBA_WYNIKOW)
+    - parametry: pozostałe argumenty wyszukaj_zdjecia (klucz_api, filtry, prog_podobienstwa, pola...)
+    
+    Zwraca: tupla (lista WynikWyszukiwania, token następnej strony albo None gdy to ostatnia strona)
+    """
+    return _strona(wyszukaj_zdjecia, opis_wyszukiwania, token_strony, rozmiar_strony, parametry)
+
+def wyszukaj_wiele(opisy, liczba_wynikow=None, klucz_api=None, data_od=None, data_do=None,
+                   rok=None, aparat=None, w_poblizu=None, prog_podobienstwa=None, pola=POLA_WYNIKU,
+                   tagi=None, limit_czasu=None):
+    """
+    Wyszukaj zdjęcia dla wielu opisów naraz (np. zapytania zbiorcze przez API)
+    
+    Embeddingi wszystkich opisów powstają w jednym zapytaniu do dostawcy, a wyszukiwania
+    trafiają do Qdrant jednym zapytaniem (query_batch_points) - zamiast N razy po dwa.
+    Bez zróżnicowania MMR (wyniki w kolejności dopasowania).
+    
+    Parametry:
+    - opisy: lista tekstów
+    - pozostałe: jak w wyszukaj_zdjecia (te same filtry dla wszystkich opisów)
+    
+    Zwraca: lista list WynikWyszukiwania - jedna lista na opis, w kolejności opisów
+    """
+    from qdrant_client.models import QueryRequest
+    
+    if not opisy:
+        return []
+    if liczba_wynikow is None:
+        liczba_wynikow = LICZBA_WYNIKOW
+    if prog_podobienstwa is None:
+        prog_podobienstwa = PROG_WYNIKU
+    
+    filtr = zbuduj_filtr(data_od, data_do, rok, aparat, w_poblizu, tagi=tagi)
+    inicjalizuj_kolekcje()
+    
+    # Powtórzone opisy liczymy raz
+    unikalne = list(dict.fromkeys(opisy))
+    wektory = dict(zip(unikalne, generuj_embeddingi(unikalne, klucz_api)))
+    
+    odpowiedzi = pobierz_klienta_qdrant().query_batch_points(
+        collection_name=NAZWA_KOLEKCJI,
+        requests=[
+            QueryRequest(
+                query=wektory[opis].tolist(), filter=filtr, limit=liczba_wynikow,
+                score_threshold=prog_podobienstwa or None, with_payload=pola
+            )
+            for opis in unikalne
+        ],
+        timeout=math.ceil(limit_czasu) if limit_czasu else None
+    )
+    wyniki = {opis: [_utworz_wynik(punkt) for punkt in odpowiedz.points] for opis, odpowiedz in zip(unikalne, odpowiedzi)}
+    print(f"[baza_danych] Wyszukiwanie zbiorcze: {len(opisy)} zapytań ({len(unikalne)} różnych)")
+    return [wyniki[opis] for opis in opisy]
+
+def wyszukaj_podobne(pozytywne, negatywne=None, liczba_wynikow=None, data_od=None, data_do=None,
+                     rok=None, aparat=None, w_poblizu=None, offset=0, prog_podobienstwa=None,
+                     pola=POLA_WYNIKU, tagi=None):
+    """
+    Wyszukaj zdjęcia podobne do wskazanych zdjęć ("więcej takich")
+    
+    Zapytaniem są wektory zapisane już w Qdrant (wskazane przez ID punktów), więc
+    nie ma żadnego zapytania do OpenAI - tylko jedno wyszukiwanie wektorowe.
+    Zdjęcia-przykłady nie pojawiają się w wynikach.
+    
+    Parametry:
+    - pozytywne: ID punktu albo lista ID zdjęć, do których wyniki mają być podobne
+    - negatywne: lista ID zdjęć, od których wyniki mają się różnić ("mniej takich")
+    - liczba_wynikow: ile wyników zwrócić (domyślnie LICZBA_WYNIKOW)
+    - data_od, data_do, rok, aparat, w_poblizu, tagi: filtry metadanych (patrz zbuduj_filtr)
+    - offset, prog_podobienstwa, pola: jak w wyszukaj_zdjecia
+    
+    Zwraca: lista obiektów WynikWyszukiwania (od najbardziej podobnego)
+    """
+    from qdrant_client.models import RecommendQuery, RecommendInput, RecommendStrategy
+    
+    if not isinstance(pozytywne, (list, tuple)):
+        pozytywne = [pozytywne]
+    negatywne = list(negatywne or [])
+    if liczba_wynikow is None:
+        liczba_wynikow = LICZBA_WYNIKOW
+    if prog_podobienstwa is None:
+        prog_podobienstwa = PROG_WYNIKU
+    
+    print(f"[baza_danych] Wyszukiwanie podobnych do {len(pozytywne)} zdjęć (bez {len(negatywne)})")
+    
+    # Średni wektor przykładów (przesunięty od negatywnych) - Qdrant liczy go sam z zapisanych wektorów
+    zapytanie = RecommendQuery(recommend=RecommendInput(
+        positive=list(pozytywne), negative=negatywne, strategy=RecommendStrategy.AVERAGE_VECTOR
+    ))
+    
+    try:
+        wyniki = pobierz_klienta_qdrant().query_points(
+            collection_name=NAZWA_KOLEKCJI,
+            query=zapytanie,
+            query_filter=zbuduj_filtr(data_od, data_do, rok, aparat, w_poblizu, tagi=tagi),
+            limit=liczba_wynikow,
+            offset=offset or None,
+            score_threshold=prog_podobienstwa or None,
+            with_payload=pola
+        ).points
+    except Exception as e:
+        # Np. zdjęcie usunięte w międzyczasie (nieistniejące ID przykładu)
+        print(f"[baza_danych] BŁĄD przy wyszukiwaniu podobnych: {e}")
+        return []
+    
+    print(f"[baza_danych] Znaleziono {len(wyniki)} podobnych")
+    return [_utworz_wynik(wynik) for wynik in wyniki]
+
+def wyszukaj_podobne_strone(pozytywne, token_strony=None, rozmiar_strony=None, **parametry):
+    """
+    Jedna strona wyników wyszukaj_podobne (token jak w wyszukaj_strone)
+    
+    Zwraca: tupla (lista WynikWyszukiwania, token następnej strony albo None gdy to ostatnia strona)
+    """
+    return _strona(wyszukaj_podobne, pozytywne, token_strony, rozmiar_strony, parametry)
+
+def _strona(wyszukaj, zapytanie, token_strony, rozmiar_strony, parametry):
+    """
+    Wspólne stronicowanie: token strony to offset następnej strony
+    """
+    rozmiar_strony = rozmiar_strony or LICZBA_WYNIKOW
+    offset = int(token_strony) if token_strony else 0
+    
+    wyniki = wyszukaj(zapytanie, liczba_wynikow=rozmiar_strony, offset=offset, **parametry)
+    
+    # Pełna strona - mogą być kolejne wyniki (token to po prostu offset następnej strony)
+    nastepny_token = str(offset + rozmiar_strony) if len(wyniki) == rozmiar_strony else None
+    return wyniki, nastepny_token
+
 # ===== FUNKCJE DO ZARZĄDZANIA ZDJĘCIAMI =====
 
-def pobierz_wszystkie_zdjecia():
+def pobierz_wszystkie_zdjecia(limit=None, offset=0):
     """
     Pobierz listę wszystkich zdjęć zapisanych w bazie
+    Lista pochodzi z lokalnego magazynu metadanych (bez przewijania Qdrant)
+    
+    Parametry:
+    - limit, offset: stronicowanie (domyślnie wszystkie zdjęcia)
+    
     Zwraca: lista słowników z info o zdjęciach (nazwa, opis, ścieżka, ID)
     """
-    # Inicjalizuj kolekcję
-    inicjalizuj_kolekcje()
+    zsynchronizuj_magazyn()
     
     try:
-        # Pobierz wszystkie punkty z kolekcji
-        # scroll() zwraca tupla (lista_punktów, następny_offset)
-        wszystkie_punkty, _ = klient_qdrant.scroll(
-            collection_name=NAZWA_KOLEKCJI,  # z której kolekcji
-            limit=10000  # maksymalnie 10000
-        )
-        
-        # Utwórz listę na wyniki
-        lista_zdjec = []
-        
-        # Zbiór przechowujący już widziane nazwy (aby uniknąć duplikatów)
-        widziane_nazwy = set()
-        
-        # Pętla po każdym punkcie (embedding)
-        for punkt in wszystkie_punkty:
-            # Pobierz nazwę zdjęcia z metadanych
-            nazwa_zdjecia = punkt.payload.get("nazwa_zdjecia")
-            
-            # Jeśli nazwa istnieje i nie widzieliśmy jej wcześniej
-            if nazwa_zdjecia and nazwa_zdjecia not in widziane_nazwy:
-                # Dodaj do listy słownik z info o zdjęciu
-                lista_zdjec.append({
-                    "nazwa": nazwa_zdjecia,  # nazwa pliku
-                    "opis": punkt.payload.get("opis"),  # opis AI
-                    "sciezka": punkt.payload.get("sciezka"),  # ścieżka do pliku
-                    "id": punkt.id  # ID embeddingu
-                })
-                
-                # Dodaj nazwę do zbioru już widzanych
-                widziane_nazwy.add(nazwa_zdjecia)
-        
-        # Zwróć listę zdjęć
-        return lista_zdjec
+        # Jedno zdjęcie na punkt, w kolejności dodania
+        return magazyn_metadanych.pobierz_wszystkie(limit, offset)
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd i zwróć pustą listę
         print(f"[baza_danych] Błąd przy pobieraniu zdjęć: {e}")
         return []
 
-def usun_embedding(nazwa_zdjecia):
+def pobierz_zdjecie(id_punktu):
     """
-    Usuń embedding (i wszystkie jego kopie) na podstawie nazwy zdjęcia
+    Pełny rekord jednego zdjęcia z lokalnego magazynu (opis, ścieżka, EXIF, tagi)
+    
+    Zwraca: słownik albo None gdy nie ma takiego zdjęcia
+    """
+    zsynchronizuj_magazyn()
+    return magazyn_metadanych.pobierz_zdjecie(id_punktu)
+
+def policz_tagi(wybrane=None):
+    """
+    Liczniki tagów wśród zdjęć mających wszystkie wybrane tagi
+    Odpowiedź z lokalnego indeksu tagów (bez OpenAI i bez Qdrant)
     
     Parametr:
-    - nazwa_zdjecia: nazwa pliku do usunięcia (np. "foto.jpg")
+    - wybrane: słownik pole -> lista wartości (None = wszystkie zdjęcia)
+    
+    Zwraca: słownik pole -> lista tupli (wartość, liczba zdjęć)
     """
-    # Inicjalizuj kolekcję
-    inicjalizuj_kolekcje()
+    zsynchronizuj_magazyn()
+    return magazyn_metadanych.policz_tagi(wybrane)
+
+def przegladaj_po_tagach(wybrane, limit=None, offset=0):
+    """
+    Zdjęcia mające wszystkie wybrane tagi (przeglądanie bez wyszukiwania wektorowego)
     
-    try:
-        # Pobierz wszystkie punkty z kolekcji
-        wszystkie_punkty, _ = klient_qdrant.scroll(
-            collection_name=NAZWA_KOLEKCJI,  # z której kolekcji
-            limit=10000  # maksymalnie 10000
+    Zwraca: lista słowników (nazwa, opis, sciezka, id) - jak pobierz_wszystkie_zdjecia
+    """
+    zsynchronizuj_magazyn()
+    return magazyn_metadanych.znajdz_po_tagach(wybrane, limit, offset)
+
+def _nowy_reprezentant(grupa):
+    """
+    Wybierz nowego reprezentanta grupy po usunięciu poprzedniego: pierwszy pozostały
+    punkt grupy staje się reprezentantem, a pozostałe wskazują na niego
+    (bez tego zostałyby ukryte w wynikach i pomijane przy grupowaniu nowych zdjęć)
+    """
+    from qdrant_client.models import Filter, FieldCondition, MatchValue
+    
+    klient = pobierz_klienta_qdrant()
+    czlonkowie = []
+    offset = None
+    while True:
+        punkty, offset = klient.scroll(
+            collection_name=NAZWA_KOLEKCJI, limit=1000, offset=offset,
+            scroll_filter=Filter(must=[FieldCondition(key="grupa", match=MatchValue(value=grupa))]),
+            with_payload=False, with_vectors=False
         )
+        czlonkowie.extend(punkt.id for punkt in punkty)
+        if offset is None:
+            break
+    if not czlonkowie:
+        return
+    
+    nowy = czlonkowie[0]
+    klient.set_payload(collection_name=NAZWA_KOLEKCJI, payload={"grupa": nowy, "reprezentant": True}, points=[nowy])
+    if len(czlonkowie) > 1:
+        klient.set_payload(collection_name=NAZWA_KOLEKCJI, payload={"grupa": nowy}, points=czlonkowie[1:])
+    print(f"[baza_danych] Nowy reprezentant grupy {grupa}: {nowy} ({len(czlonkowie)} zdjęć)")
+
+def usun_punkty(ids_do_usuniecia):
+    """
+    Usuń punkty o podanych ID z Qdrant i magazynu metadanych
+    
+    Usunięty reprezentant grupy prawie identycznych zdjęć jest zastępowany
+    pierwszym pozostałym punktem grupy.
+    
+    Parametr:
+    - ids_do_usuniecia: lista ID punktów
+    
+    Zwraca: liczba usuniętych punktów (0 przy błędzie)
+    """
+    ids_do_usuniecia = list(ids_do_usuniecia)
+    if not ids_do_usuniecia:
+        return 0
+    
+    try:
+        klient = pobierz_klienta_qdrant()
         
-        # Utwórz listę na ID embeddingów do usunięcia
-        ids_do_usuniecia = []
+        # Grupy, których reprezentant zostanie usunięty
+        usuwane = klient.retrieve(
+            collection_name=NAZWA_KOLEKCJI, ids=ids_do_usuniecia, with_payload=["grupa", "reprezentant"]
+        )
+        grupy = {
+            punkt.payload["grupa"] for punkt in usuwane
+            if (punkt.payload or {}).get("reprezentant") and punkt.payload.get("grupa") is not None
+        }
         
-        # Pętla po każdym punkcie
-        for punkt in wszystkie_punkty:
-            # Jeśli nazwa w metadata pasuje do szukanej nazwy
-            if punkt.payload.get("nazwa_zdjecia") == nazwa_zdjecia:
-                # Dodaj ID do listy do usunięcia
-                ids_do_usuniecia.append(punkt.id)
+        # Usuń wszystkie embeddingi jednym zapytaniem i rekordy w magazynie w jednej transakcji
+        with magazyn_metadanych.transakcja() as polaczenie:
+            magazyn_metadanych.usun_po_id(ids_do_usuniecia, polaczenie)
+            klient.delete(
+                collection_name=NAZWA_KOLEKCJI,  # z której kolekcji
+                points_selector=ids_do_usuniecia  # które ID usunąć
+            )
         
-        # Jeśli znaleźliśmy embeddingi do usunięcia
-        if ids_do_usuniecia:
-            # Usuń każdy embedding
-            for id_punktu in ids_do_usuniecia:
-                klient_qdrant.delete(
-                    collection_name=NAZWA_KOLEKCJI,  # z której kolekcji
-                    points_selector=[id_punktu]  # które ID usunąć
-                )
-            
-            # Wypisz komunikat o liczbie usuniętych
-            print(f"[baza_danych] Usunięto {len(ids_do_usuniecia)} embedding(i) dla zdjęcia: {nazwa_zdjecia}")
-        else:
-            # Jeśli nic nie znaleziono - wypisz info
-            print(f"[baza_danych] Nie znaleziono embeddingu dla zdjęcia: {nazwa_zdjecia}")
+        for grupa in grupy:
+            _nowy_reprezentant(grupa)
+        return len(ids_do_usuniecia)
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd
-        print(f"[baza_danych] Błąd przy usuwaniu embeddingu: {e}")
+        print(f"[baza_danych] Błąd przy usuwaniu embeddingów: {e}")
+        return 0
+
+def usun_embedding(nazwa_zdjecia):
+    """
+    Usuń embedding (i wszystkie jego kopie) na podstawie nazwy zdjęcia
+    
+    Parametr:
+    - nazwa_zdjecia: nazwa pliku do usunięcia (np. "foto.jpg")
+    """
+    zsynchronizuj_magazyn()
+    
+    # ID punktów do usunięcia - z indeksu nazw w magazynie metadanych
+    ids_do_usuniecia = magazyn_metadanych.znajdz_id_po_nazwie(nazwa_zdjecia)
+    
+    # Jeśli znaleźliśmy embeddingi do usunięcia
+    if ids_do_usuniecia:
+        if usun_punkty(ids_do_usuniecia):
+            # Wypisz komunikat o liczbie usuniętych
+            print(f"[baza_danych] Usunięto {len(ids_do_usuniecia)} embedding(i) dla zdjęcia: {nazwa_zdjecia}")
+    else:
+        # Jeśli nic nie znaleziono - wypisz info
+        print(f"[baza_danych] Nie znaleziono embeddingu dla zdjęcia: {nazwa_zdjecia}")
 
 def usun_wszystkie_embeddingi():
     """
@@ -397,11 +1242,14 @@ def usun_wszystkie_embeddingi():
     Uwaga: Ta operacja nie może być cofnięta!
     """
     try:
-        # Usuń całą kolekcję
-        klient_qdrant.delete_collection(NAZWA_KOLEKCJI)
+        # Usuń kolekcję, na którą wskazuje alias (alias znika razem z nią)
+        nazwa_kolekcji = rozwiaz_alias()
+        with magazyn_metadanych.transakcja() as polaczenie:
+            magazyn_metadanych.usun_wszystkie(polaczenie)
+            pobierz_klienta_qdrant().delete_collection(nazwa_kolekcji)
         
         # Wypisz komunikat
-        print(f"[baza_danych] Kolekcja '{NAZWA_KOLEKCJI}' została całkowicie usunięta")
+        print(f"[baza_danych] Kolekcja '{nazwa_kolekcji}' została całkowicie usunięta")
     except Exception as e:
         # Jeśli coś poszło nie tak - wypisz błąd
         print(f"[baza_danych] Błąd przy usuwaniu kolekcji: {e}")
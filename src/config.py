@@ -15,6 +15,12 @@ MODELE = {
     "model_zaawansowany": "gpt-4-turbo"  # internal: model_zaawansowany -> rzeczywista nazwa: gpt-4-turbo
 }
 
+# Tryb kaskady: każde zdjęcie opisuje najpierw najtańszy model, a do kolejnego
+# (droższego) trafiają tylko opisy, które nie przeszły kontroli jakości
+# (patrz przetwarzanie_zdjec.ocen_opis)
+MODEL_KASKADA = "model_kaskada"
+KASKADA_MODELI = ["model_prosty", "model_sredni"]  # od najtańszego do najdroższego
+
 # Model domyślnie wybrany przy uruchomieniu aplikacji
 MODEL_DOMYSLNY = "model_prosty"  # domyślnie wybieramy "model_prosty" (gpt-4o-mini)
 
@@ -44,8 +50,8 @@ def wczytaj_modele():
     Te identyfikatory będą zamieniane na rzeczywiste nazwy modeli
     przed wysłaniem do OpenAI
     """
-    # Lista internal identyfikatorów modeli (klucze ze słownika MODELE)
-    lista_modeli = list(MODELE.keys())
+    # Lista internal identyfikatorów modeli (klucze ze słownika MODELE) i tryb kaskady na końcu
+    lista_modeli = list(MODELE.keys()) + [MODEL_KASKADA]
     
     # Zwróć listę identyfikatorów i model domyślny
     return lista_modeli, MODEL_DOMYSLNY
@@ -59,10 +65,22 @@ def pobierz_rzeczywista_nazwe_modelu(identyfikator):
     
     Zwraca: rzeczywista nazwa modelu (np. "gpt-4o-mini")
     """
+    # Kaskada zaczyna od pierwszego (najtańszego) modelu - pełną listę zwraca pobierz_modele_kaskady
+    if identyfikator == MODEL_KASKADA:
+        return MODELE[KASKADA_MODELI[0]]
+    
     # Pobierz z słownika MODELE rzeczywistą nazwę
     # Jeśli identyfikator nie istnieje - zwróć "gpt-4o-mini" (default)
     return MODELE.get(identyfikator, "gpt-4o-mini")
 
+def pobierz_modele_kaskady():
+    """
+    Zwróć rzeczywiste nazwy modeli kaskady (od najtańszego)
+    
+    Zwraca: lista nazw, np. ["gpt-4o-mini", "gpt-4o"]
+    """
+    return [MODELE[identyfikator] for identyfikator in KASKADA_MODELI]
+
 def oszacuj_koszt(liczba_zdjec, identyfikator_modelu):
     """
     Oszacuj koszt przetwarzania zdjęć
@@ -1,39 +1,267 @@
 # embedding.py
+#
+# Dostawcy embeddingów (zamiana tekstu na wektor).
+# Każdy dostawca przyjmuje listę tekstów i zwraca macierz float32
+# (liczba_tekstow x rozmiar) z wierszami znormalizowanymi do długości 1,
+# a jego rozmiar/model/miara decydują o parametrach tworzonej kolekcji Qdrant.
+#
+# Dostawcy:
+# - "openai"  - API OpenAI (text-embedding-3-small/large), teksty wysyłane partiami
+# - "lokalny" - w pełni offline, na CPU: hashowane n-gramy znaków i słów rzutowane
+#               losową projekcją rzadką na wektor o stałym rozmiarze; bez sieci,
+#               tysiące opisów na sekundę (instalacje bez dostępu do internetu, testy)
+#
+# Wybór dostawcy: zmienna DOSTAWCA_EMBEDDINGOW w .env ("openai" lub "lokalny").
+#
+# numpy i openai są importowane dopiero przy pierwszym użyciu (szybki start aplikacji).
 
-import openai  # Importujemy bibliotekę OpenAI do generowania embeddingów
-import numpy as np  # Importujemy NumPy do operacji na tablicach
+import os  # zmienne środowiskowe (klucz API, wybór dostawcy)
+import re  # podział tekstu na słowa
+import zlib  # stabilny hash słów (crc32 - ten sam w każdym procesie, w przeciwieństwie do hash())
+from functools import lru_cache  # jeden dostawca na konfigurację
 
-def generuj_embedding(opis: str, model: str) -> np.ndarray:
+# Domyślny model dla każdego dostawcy
+DOMYSLNE_MODELE = {
+    "openai": "text-embedding-3-small",
+    "lokalny": "ngram-hash-v1"
+}
+
+# Rozmiary wektorów znanych modeli OpenAI
+ROZMIARY_MODELI_OPENAI = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+
+# Domyślny rozmiar wektora dostawcy lokalnego
+ROZMIAR_LOKALNY = 512
+
+# Ile tekstów wysyłać w jednym zapytaniu do OpenAI (limit API to 2048 wejść)
+ROZMIAR_PARTII_OPENAI = 256
+
+# Limit czasu jednego zapytania do OpenAI [s] (domyślny klienta to 10 minut -
+# zawieszone zapytanie blokowałoby wątek wyszukiwania w tle przez cały ten czas)
+LIMIT_CZASU_OPENAI = float(os.getenv("LIMIT_CZASU_OPENAI", "30"))
+
+class DostawcaEmbeddingow:
+    """
+    Wspólny interfejs dostawców embeddingów
+
+    Atrybuty:
+    - nazwa: nazwa dostawcy ("openai", "lokalny")
+    - model: nazwa modelu (zapisywana przy punktach i w kopii indeksu)
+    - rozmiar: długość wektora (rozmiar kolekcji Qdrant)
+    - miara: miara odległości dla kolekcji (wektory są znormalizowane, więc iloczyn skalarny
+      daje to samo co Cosine, bez normalizacji po stronie Qdrant)
     """
-    Funkcja generuje embedding dla podanego opisu przy użyciu wybranego modelu OpenAI.
-    
+
+    nazwa = None
+    miara = "Dot"
+
+    def __init__(self, model, rozmiar):
+        self.model = model
+        self.rozmiar = rozmiar
+
+    def _osadz_partie(self, teksty):
+        """
+        Zwróć surowe wektory dla partii tekstów (macierz liczb, dowolna skala)
+        """
+        raise NotImplementedError
+
+    def rozmiar_partii(self):
+        """
+        Ile tekstów przekazywać do _osadz_partie na raz
+        """
+        return 1024
+
+    def osadz(self, teksty):
+        """
+        Zamień listę tekstów na macierz float32 (liczba_tekstow x rozmiar), wiersze o długości 1
+        """
+        import numpy as np
+
+        teksty = list(teksty)
+        wynik = np.zeros((len(teksty), self.rozmiar), dtype=np.float32)
+        partia = self.rozmiar_partii()
+        for poczatek in range(0, len(teksty), partia):
+            wynik[poczatek:poczatek + partia] = self._osadz_partie(teksty[poczatek:poczatek + partia])
+
+        # Normalizacja - iloczyn skalarny dwóch wektorów to od razu podobieństwo cosinusowe
+        dlugosci = np.linalg.norm(wynik, axis=1, keepdims=True)
+        dlugosci[dlugosci == 0] = 1.0  # pusty tekst zostaje wektorem zerowym
+        wynik /= dlugosci
+        return wynik
+
+    def metadane(self):
+        """
+        Opis dostawcy (parametry kolekcji, manifest kopii indeksu)
+        """
+        return {"dostawca": self.nazwa, "model": self.model, "rozmiar": self.rozmiar, "miara": self.miara}
+
+class DostawcaOpenAI(DostawcaEmbeddingow):
+    """
+    Embeddingi z API OpenAI - wiele tekstów w jednym zapytaniu
+    """
+
+    nazwa = "openai"
+
+    def __init__(self, model=None, rozmiar=None, klucz_api=None):
+        model = model or DOMYSLNE_MODELE["openai"]
+        domyslny_rozmiar = ROZMIARY_MODELI_OPENAI.get(model)
+        if not rozmiar and not domyslny_rozmiar:
+            raise ValueError(f"Nieznany rozmiar wektora modelu '{model}' - ustaw ROZMIAR_WEKTORA.")
+        super().__init__(model, rozmiar or domyslny_rozmiar)
+
+        # Modele text-embedding-3 potrafią zwrócić krótszy wektor (parametr "dimensions")
+        self._skrocony = bool(rozmiar) and rozmiar != domyslny_rozmiar
+
+        klucz_api = klucz_api or os.getenv("OPENAI_API_KEY")
+        if not klucz_api:
+            raise ValueError("Brak klucza OpenAI w zmiennych środowiskowych (OPENAI_API_KEY).")
+        self._klucz_api = klucz_api
+        self._klient = None
+
+    def rozmiar_partii(self):
+        return ROZMIAR_PARTII_OPENAI
+
+    def _osadz_partie(self, teksty):
+        if self._klient is None:
+            from openai import OpenAI  # import dopiero przy pierwszym zapytaniu
+            self._klient = OpenAI(api_key=self._klucz_api, timeout=LIMIT_CZASU_OPENAI)
+
+        parametry = {"model": self.model, "input": teksty}
+        if self._skrocony:
+            parametry["dimensions"] = self.rozmiar
+        odpowiedz = self._klient.embeddings.create(**parametry)
+
+        # OpenAI zwraca element "index" - sortujemy dla pewności kolejności
+        return [element.embedding for element in sorted(odpowiedz.data, key=lambda e: e.index)]
+
+class DostawcaLokalny(DostawcaEmbeddingow):
+    """
+    Embeddingi offline: hashowane n-gramy znaków (i całe słowa) z wagą log(1 + tf),
+    rzutowane rzadką losową projekcją na wektor o rozmiarze `rozmiar`
+
+    Każda cecha (n-gram) jest hashowana do jednego z 2^BITY_HASHA kubełków, a każdy
+    kubełek ma na stałe przypisane K pozycji w wektorze i znaki +/-1 (ziarno generatora
+    jest stałe - te same teksty dają te same wektory w każdym procesie).
+    Teksty o wspólnych fragmentach słów ("kot", "kota", "kotem") są blisko siebie.
+    """
+
+    nazwa = "lokalny"
+    BITY_HASHA = 18  # 262 144 kubełki cech
+    K = 4  # ile pozycji wektora dostaje każda cecha
+    N = 3  # długość n-gramów znakowych
+    ZIARNO = 1729  # stałe ziarno projekcji (zmiana = konieczna migracja kolekcji)
+
+    def __init__(self, model=None, rozmiar=None):
+        super().__init__(model or DOMYSLNE_MODELE["lokalny"], rozmiar or ROZMIAR_LOKALNY)
+        self._indeksy = None  # kubełek -> K pozycji w wektorze
+        self._znaki = None  # kubełek -> K znaków +/-1
+
+    def _projekcja(self):
+        """
+        Tablice projekcji (tworzone raz, ok. 8 MB)
+        """
+        if self._indeksy is None:
+            import numpy as np
+            generator = np.random.default_rng(self.ZIARNO)
+            liczba_kubelkow = 1 << self.BITY_HASHA
+            self._indeksy = generator.integers(0, self.rozmiar, size=(liczba_kubelkow, self.K), dtype=np.int32)
+            self._znaki = generator.choice(np.array([-1.0, 1.0], dtype=np.float32), size=(liczba_kubelkow, self.K))
+        return self._indeksy, self._znaki
+
+    def _cechy(self, tekst):
+        """
+        Kubełki cech tekstu: n-gramy znakowe (wektorowo w numpy) i całe słowa (crc32)
+        """
+        import numpy as np
+
+        tekst = " " + " ".join(re.findall(r"\w+", tekst.lower())) + " "
+        maska = (1 << self.BITY_HASHA) - 1
+
+        # n-gramy znakowe: wielomianowy hash kolejnych N znaków, bez pętli w Pythonie
+        znaki = np.frombuffer(tekst.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if len(znaki) >= self.N:
+            hashe = np.zeros(len(znaki) - self.N + 1, dtype=np.uint64)
+            for przesuniecie in range(self.N):
+                hashe = hashe * np.uint64(1000003) + znaki[przesuniecie:len(znaki) - self.N + 1 + przesuniecie]
+            ngramy = (hashe ^ (hashe >> np.uint64(29))) & np.uint64(maska)
+        else:
+            ngramy = np.zeros(0, dtype=np.uint64)
+
+        # Całe słowa - osobne cechy, żeby dokładne dopasowanie słowa ważyło więcej
+        slowa = np.fromiter(
+            (zlib.crc32(slowo.encode("utf-8")) & maska for slowo in tekst.split()), dtype=np.uint64
+        )
+        return np.concatenate([ngramy, slowa]).astype(np.int64)
+
+    def _osadz_partie(self, teksty):
+        import numpy as np
+
+        indeksy, znaki = self._projekcja()
+        wynik = np.zeros((len(teksty), self.rozmiar), dtype=np.float32)
+        for wiersz, tekst in enumerate(teksty):
+            kubelki, liczby = np.unique(self._cechy(tekst), return_counts=True)
+            if not len(kubelki):
+                continue
+            wagi = (1.0 + np.log(liczby)).astype(np.float32)  # tf liniowo-logarytmiczne
+            wynik[wiersz] = np.bincount(
+                indeksy[kubelki].ravel(),
+                weights=(znaki[kubelki] * wagi[:, None]).ravel(),
+                minlength=self.rozmiar
+            )
+        return wynik
+
+def rozmiar_modelu(dostawca, model=None):
+    """
+    Zwróć domyślny rozmiar wektora dla dostawcy i modelu (bez tworzenia klienta)
+    """
+    if dostawca == "lokalny":
+        return ROZMIAR_LOKALNY
+    return ROZMIARY_MODELI_OPENAI.get(model or DOMYSLNE_MODELE["openai"])
+
+@lru_cache(maxsize=8)
+def pobierz_dostawce(dostawca=None, model=None, rozmiar=None, klucz_api=None):
+    """
+    Zwróć dostawcę embeddingów (zapamiętany dla danej konfiguracji)
+
+    Parametry:
+    - dostawca: "openai" albo "lokalny" (domyślnie DOSTAWCA_EMBEDDINGOW z .env)
+    - model: nazwa modelu (domyślnie model domyślny dostawcy)
+    - rozmiar: długość wektora (domyślnie rozmiar modelu)
+    - klucz_api: klucz OpenAI (tylko dla "openai")
+    """
+    dostawca = dostawca or os.getenv("DOSTAWCA_EMBEDDINGOW", "openai")
+    if dostawca == "openai":
+        return DostawcaOpenAI(model, rozmiar, klucz_api)
+    if dostawca == "lokalny":
+        return DostawcaLokalny(model, rozmiar)
+    raise ValueError(f"Nieznany dostawca embeddingów: '{dostawca}' (dostępni: openai, lokalny)")
+
+def generuj_embedding(opis, model=None):
+    """
+    Funkcja generuje embedding dla podanego opisu (zgodność ze starszym kodem).
+
     :param opis: Opis, dla którego chcemy wygenerować embedding.
-    :param model: Model OpenAI, który ma być użyty do generacji embeddingu.
-    :return: Tablica NumPy reprezentująca embedding.
-    """
-    # Wywołanie API OpenAI w celu uzyskania embeddingu
-    odpowiedz = openai.Embedding.create(
-        input=opis,
-        model=model
-    )
-    
-    # Ekstrakcja embeddingu z odpowiedzi
-    embedding = odpowiedz['data'][0]['embedding']
-    
-    # Konwersja embeddingu na tablicę NumPy
-    return np.array(embedding)
-
-def przygotuj_dane_do_bazy(embedding: np.ndarray, id_zdjecia: str) -> dict:
+    :param model: Model embeddingów (domyślnie model domyślny wybranego dostawcy).
+    :return: Tablica NumPy float32 (znormalizowana) reprezentująca embedding.
+    """
+    return pobierz_dostawce(model=model).osadz([opis])[0]
+
+def przygotuj_dane_do_bazy(embedding, id_zdjecia):
     """
     Funkcja przygotowuje dane do zapisania w bazie danych QDrant.
-    
+
     :param embedding: Tablica NumPy reprezentująca embedding.
     :param id_zdjecia: Unikalny identyfikator zdjęcia.
-    :return: Słownik z danymi do zapisania w bazie.
+    :return: Słownik z danymi do zapisania w bazie (embedding jako float32, bez zamiany na listę).
     """
+    import numpy as np
+
     # Przygotowanie słownika z danymi
     dane = {
         "id": id_zdjecia,
-        "embedding": embedding.tolist()  # Konwersja tablicy NumPy na listę
+        "embedding": np.asarray(embedding, dtype=np.float32)  # Qdrant przyjmuje tablice NumPy
     }
-    return dane
\ No newline at end of file
+    return dane
@@ -0,0 +1,108 @@
+# Zawartość pliku: src/hasze_percepcyjne.py
+#
+# Hasze percepcyjne (dHash) i drzewo BK do wyszukiwania podobnych zdjęć.
+# dHash zmienia się tylko nieznacznie gdy zdjęcie jest zmniejszone, ponownie
+# skompresowane albo ma inną nazwę - podobne zdjęcia mają hasze różniące się
+# na kilku bitach (mała odległość Hamminga).
+# Drzewo BK odpowiada na pytanie "które hasze są w odległości <= k" bez
+# porównywania z każdym zapisanym zdjęciem.
+
+# Rozmiar dHash: 8x8 porównań = 64 bity
+ROZMIAR_HASZA = 8
+
+def dhash(obraz, rozmiar=ROZMIAR_HASZA):
+    """
+    Oblicz dHash (difference hash) obrazu
+
+    Obraz jest zmniejszany do (rozmiar+1) x rozmiar w skali szarości, a każdy bit
+    mówi czy piksel jest jaśniejszy od sąsiada po prawej.
+
+    Parametry:
+    - obraz: obiekt PIL.Image (najlepiej już obrócony zgodnie z EXIF)
+    - rozmiar: liczba porównań w wierszu (8 -> hash 64-bitowy)
+
+    Zwraca: hash jako tekst szesnastkowy (16 znaków dla 64 bitów)
+    """
+    from PIL import Image  # Pillow - zmniejszanie obrazu do 9x8 pikseli (import dopiero tutaj - drzewo BK go nie potrzebuje)
+
+    maly = obraz.convert("L").resize((rozmiar + 1, rozmiar), Image.LANCZOS)
+    piksele = list(maly.getdata())
+
+    wartosc = 0
+    for wiersz in range(rozmiar):
+        for kolumna in range(rozmiar):
+            lewy = piksele[wiersz * (rozmiar + 1) + kolumna]
+            prawy = piksele[wiersz * (rozmiar + 1) + kolumna + 1]
+            wartosc = (wartosc << 1) | (1 if lewy > prawy else 0)
+
+    return f"{wartosc:0{rozmiar * rozmiar // 4}x}"
+
+def odleglosc_hamminga(hash_a, hash_b):
+    """
+    Liczba różniących się bitów między dwoma haszami (liczby całkowite)
+    """
+    return bin(hash_a ^ hash_b).count("1")
+
+class DrzewoBK:
+    """
+    Drzewo BK (Burkhard-Keller) dla odległości Hamminga
+
+    Każdy węzeł przechowuje hash i dzieci pogrupowane po odległości od niego.
+    Dzięki nierówności trójkąta przy wyszukiwaniu "odległość <= k" odwiedzamy
+    tylko dzieci z odległością w przedziale [d - k, d + k].
+    """
+
+    def __init__(self):
+        self.korzen = None  # węzeł: [hash, lista_wartosci, {odleglosc: dziecko}]
+        self.liczba = 0  # liczba dodanych wartości
+
+    def dodaj(self, hash_tekst, wartosc):
+        """
+        Dodaj hash (tekst szesnastkowy) z dowolną wartością (np. nazwą zdjęcia)
+        Identyczne hasze trafiają do tego samego węzła
+        """
+        hash_liczba = int(hash_tekst, 16)
+        self.liczba += 1
+
+        if self.korzen is None:
+            self.korzen = [hash_liczba, [wartosc], {}]
+            return
+
+        wezel = self.korzen
+        while True:
+            odleglosc = odleglosc_hamminga(hash_liczba, wezel[0])
+            if odleglosc == 0:
+                wezel[1].append(wartosc)
+                return
+            dziecko = wezel[2].get(odleglosc)
+            if dziecko is None:
+                wezel[2][odleglosc] = [hash_liczba, [wartosc], {}]
+                return
+            wezel = dziecko
+
+    def znajdz(self, hash_tekst, maks_odleglosc):
+        """
+        Znajdź wszystkie wartości z haszem w odległości <= maks_odleglosc
+
+        Zwraca: lista tupli (odleglosc, wartosc) posortowana od najbliższych
+        """
+        if self.korzen is None:
+            return []
+
+        hash_liczba = int(hash_tekst, 16)
+        wyniki = []
+        do_odwiedzenia = [self.korzen]  # stos zamiast rekurencji
+
+        while do_odwiedzenia:
+            wezel = do_odwiedzenia.pop()
+            odleglosc = odleglosc_hamminga(hash_liczba, wezel[0])
+            if odleglosc <= maks_odleglosc:
+                wyniki.extend((odleglosc, wartosc) for wartosc in wezel[1])
+
+            # Tylko dzieci, które mogą zawierać pasujące hasze (nierówność trójkąta)
+            for odleglosc_dziecka, dziecko in wezel[2].items():
+                if odleglosc - maks_odleglosc <= odleglosc_dziecka <= odleglosc + maks_odleglosc:
+                    do_odwiedzenia.append(dziecko)
+
+        wyniki.sort(key=lambda w: w[0])
+        return wyniki
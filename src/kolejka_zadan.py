@@ -0,0 +1,302 @@
+# Zawartość pliku: src/kolejka_zadan.py
+#
+# Kolejka zadań przetwarzania zdjęć (SQLite, bez zewnętrznego brokera).
+# Interfejs (main.py) tylko zapisuje przesłane pliki na dysk i dodaje zadanie
+# do kolejki, a przetwarzanie (Vision API, embeddingi, zapis) wykonuje osobny
+# proces roboczy (pracownik.py). Ponowne uruchomienie skryptu Streamlit ani
+# zamknięcie przeglądarki nie przerywa pracy, a interfejs tylko odpytuje stan.
+#
+# Stany zadania:  oczekuje -> w_toku -> zakonczone / blad
+# Stany pliku:    oczekuje -> opisane -> zapisane / blad / pominiete
+
+import os  # ścieżki, zmienne środowiskowe, PID procesu
+import json  # wynik zadania jako JSON
+import time  # znaczniki czasu sygnału życia
+import uuid  # identyfikatory zadań
+import shutil  # przenoszenie plików i usuwanie folderu z plikami zadania
+import sqlite3  # wbudowana baza danych SQLite
+import threading  # osobne połączenie dla każdego wątku
+from datetime import datetime  # znaczniki czasu
+
+# Ścieżka do pliku bazy kolejki
+SCIEZKA_KOLEJKI = os.getenv("KOLEJKA_ZADAN", "kolejka_zadan.sqlite3")
+
+# Folder na przesłane pliki czekające na przetworzenie (jeden podfolder na zadanie)
+FOLDER_PLIKOW_ZADAN = os.getenv("FOLDER_PLIKOW_ZADAN", "kolejka_plikow")
+
+# Po ilu sekundach bez sygnału życia pracownik jest uznawany za martwy
+# (jego zadanie wraca do kolejki, a interfejs uruchamia nowego pracownika)
+LIMIT_CISZY_PRACOWNIKA = 30
+
+# Ile razy zadanie może być przejęte, zanim pracownik umierający w trakcie (brak pamięci,
+# zabity proces, błąd dekodera) oznaczy je jako nieudane zamiast uruchamiać w kółko
+MAKS_PROB_ZADANIA = int(os.getenv("MAKS_PROB_ZADANIA", "3"))
+
+SCHEMAT = """
+CREATE TABLE IF NOT EXISTS zadania (
+    id TEXT PRIMARY KEY,
+    stan TEXT NOT NULL,            -- oczekuje / w_toku / zakonczone / blad
+    model TEXT,                    -- nazwa modelu Vision (np. gpt-4o-mini)
+    model_id TEXT,                 -- alias modelu w aplikacji (do wyliczenia kosztu)
+    klucz_api TEXT,                -- klucz OpenAI podany w interfejsie (usuwany po zakończeniu)
+    wynik TEXT,                    -- JSON ze statystykami zapisu
+    blad TEXT,
+    utworzono TEXT NOT NULL,
+    rozpoczeto TEXT,
+    zakonczono TEXT,
+    profiluj INTEGER DEFAULT 0,    -- profil zadania w pracowniku: 0 nie, 1 cProfile, 2 także pamięć
+    proby INTEGER DEFAULT 0        -- ile razy zadanie przejął pracownik
+);
+CREATE INDEX IF NOT EXISTS idx_zadania_stan ON zadania(stan, utworzono);
+CREATE TABLE IF NOT EXISTS pliki_zadan (
+    zadanie TEXT NOT NULL,
+    idx INTEGER NOT NULL,          -- kolejność pliku w zadaniu
+    nazwa TEXT NOT NULL,           -- nazwa pod jaką zdjęcie zostanie zapisane
+    sciezka TEXT NOT NULL,         -- plik czekający na dysku
+    stan TEXT NOT NULL,
+    blad TEXT,
+    id_punktu,                     -- ID punktu w Qdrant po zapisie (np. obserwacja folderu usuwa po nim)
+    PRIMARY KEY (zadanie, idx)
+);
+CREATE TABLE IF NOT EXISTS pracownicy (
+    pid INTEGER PRIMARY KEY,
+    zadanie TEXT,                  -- zadanie przetwarzane przez pracownika
+    sygnal REAL NOT NULL           -- ostatni sygnał życia (time.time())
+);
+"""
+
+# Kolumny dodane w późniejszych wersjach (dla baz utworzonych wcześniej)
+DODANE_KOLUMNY = {
+    "zadania": {
+        "profiluj": "INTEGER DEFAULT 0",
+        "proby": "INTEGER DEFAULT 0"
+    },
+    "pliki_zadan": {
+        "id_punktu": ""
+    }
+}
+
+_lokalne = threading.local()
+
+def _uzupelnij_kolumny(polaczenie):
+    """
+    Dodaj brakujące kolumny do tabel kolejki (kolejka utworzona przez starszą wersję)
+    """
+    for tabela, kolumny in DODANE_KOLUMNY.items():
+        istniejace = {w[1] for w in polaczenie.execute(f"PRAGMA table_info({tabela})")}
+        for kolumna, typ in kolumny.items():
+            if kolumna not in istniejace:
+                polaczenie.execute(f"ALTER TABLE {tabela} ADD COLUMN {kolumna} {typ}")
+
+def _polaczenie():
+    """
+    Pobierz połączenie SQLite dla bieżącego wątku (tworzone przy pierwszym użyciu)
+    """
+    polaczenie = getattr(_lokalne, "polaczenie", None)
+    if polaczenie is None:
+        # isolation_level=None - transakcje otwierane jawnie (BEGIN IMMEDIATE przy przejmowaniu zadań)
+        polaczenie = sqlite3.connect(SCIEZKA_KOLEJKI, timeout=30, isolation_level=None)
+        polaczenie.row_factory = sqlite3.Row
+        polaczenie.execute("PRAGMA journal_mode=WAL")  # interfejs czyta, gdy pracownik zapisuje
+        polaczenie.execute("PRAGMA synchronous=NORMAL")
+        polaczenie.executescript(SCHEMAT)
+        _uzupelnij_kolumny(polaczenie)
+        _lokalne.polaczenie = polaczenie
+    return polaczenie
+
+def _teraz():
+    return datetime.now().isoformat(timespec="seconds")
+
+# ===== INTERFEJS (dodawanie i odpytywanie) =====
+
+def dodaj_zadanie(pliki, model, model_id=None, klucz_api=None, kopiuj=False, profiluj=0):
+    """
+    Zapisz pliki na dysku i dodaj zadanie do kolejki
+
+    Parametry:
+    - pliki: lista tupli (nazwa_docelowa, bajty albo ścieżka pliku na dysku - plik jest przenoszony)
+    - model: nazwa modelu Vision
+    - model_id: alias modelu w aplikacji (do wyliczenia kosztu)
+    - klucz_api: klucz OpenAI (gdy nie ma go w .env pracownika)
+    - kopiuj: pliki z dysku są kopiowane zamiast przenoszenia (oryginały zostają, np. obserwowany folder)
+    - profiluj: profil zadania w pracowniku (0 nie, 1 cProfile, 2 także pamięć - patrz profilowanie.py)
+
+    Zwraca: ID zadania
+    """
+    id_zadania = uuid.uuid4().hex
+    folder = os.path.join(FOLDER_PLIKOW_ZADAN, id_zadania)
+    os.makedirs(folder, exist_ok=True)
+
+    # Najpierw pliki na dysk - zadanie trafia do kolejki dopiero gdy wszystko jest zapisane
+    wiersze = []
+    for idx, (nazwa, zawartosc) in enumerate(pliki):
+        sciezka = os.path.join(folder, f"{idx}_{os.path.basename(nazwa)}")
+        if isinstance(zawartosc, (str, os.PathLike)):
+            # Plik już jest na dysku (folder sesji) - przenosimy bez wczytywania do pamięci
+            # (shutil.move kopiuje kawałkami, gdy foldery są na różnych dyskach)
+            if kopiuj:
+                shutil.copyfile(zawartosc, sciezka)
+            else:
+                shutil.move(zawartosc, sciezka)
+        else:
+            with open(sciezka, "wb") as f:
+                f.write(zawartosc)
+        wiersze.append((id_zadania, idx, nazwa, sciezka, "oczekuje"))
+
+    polaczenie = _polaczenie()
+    with polaczenie:
+        polaczenie.execute("BEGIN")
+        polaczenie.executemany(
+            "INSERT INTO pliki_zadan (zadanie, idx, nazwa, sciezka, stan) VALUES (?, ?, ?, ?, ?)", wiersze
+        )
+        polaczenie.execute(
+            "INSERT INTO zadania (id, stan, model, model_id, klucz_api, utworzono, profiluj) "
+            "VALUES (?, 'oczekuje', ?, ?, ?, ?, ?)",
+            (id_zadania, model, model_id, klucz_api, _teraz(), int(profiluj))
+        )
+
+    print(f"[kolejka_zadan] Dodano zadanie {id_zadania} ({len(wiersze)} plików)")
+    return id_zadania
+
+def pobierz_zadanie(id_zadania):
+    """
+    Zwróć stan zadania razem z postępem poszczególnych plików
+
+    Zwraca: słownik (id, stan, model_id, wynik, blad, pliki, postep) albo None
+    """
+    polaczenie = _polaczenie()
+    zadanie = polaczenie.execute(
+        "SELECT id, stan, model_id, wynik, blad, utworzono, rozpoczeto, zakonczono FROM zadania WHERE id = ?",
+        (id_zadania,)
+    ).fetchone()
+    if zadanie is None:
+        return None
+
+    pliki = [dict(w) for w in polaczenie.execute(
+        "SELECT idx, nazwa, stan, blad, id_punktu FROM pliki_zadan WHERE zadanie = ? ORDER BY idx", (id_zadania,)
+    )]
+    gotowe = sum(p["stan"] in ("zapisane", "blad", "pominiete") for p in pliki)
+
+    wynik = dict(zadanie)
+    wynik["wynik"] = json.loads(zadanie["wynik"]) if zadanie["wynik"] else None
+    wynik["pliki"] = pliki
+    wynik["postep"] = gotowe / len(pliki) if pliki else 1.0
+    return wynik
+
+def czy_pracownik_dziala():
+    """
+    Sprawdź czy jakiś pracownik dał sygnał życia w ciągu LIMIT_CISZY_PRACOWNIKA sekund
+    """
+    wiersz = _polaczenie().execute(
+        "SELECT 1 FROM pracownicy WHERE sygnal > ? LIMIT 1", (time.time() - LIMIT_CISZY_PRACOWNIKA,)
+    ).fetchone()
+    return wiersz is not None
+
+# ===== PRACOWNIK (przejmowanie i kończenie zadań) =====
+
+def zglos_pracownika(id_zadania=None, pid=None):
+    """
+    Sygnał życia pracownika (wywoływany regularnie przez pracownik.py)
+    pid - PID procesu (domyślnie bieżący; interfejs zgłasza tak świeżo uruchomiony proces)
+    """
+    _polaczenie().execute(
+        "INSERT OR REPLACE INTO pracownicy (pid, zadanie, sygnal) VALUES (?, ?, ?)",
+        (pid or os.getpid(), id_zadania, time.time())
+    )
+
+def wyrejestruj_pracownika():
+    """
+    Usuń wpis pracownika przy zamykaniu procesu
+    """
+    _polaczenie().execute("DELETE FROM pracownicy WHERE pid = ?", (os.getpid(),))
+
+def przywroc_porzucone_zadania():
+    """
+    Zadania "w_toku", których pracownik przestał dawać sygnał życia, wracają do kolejki
+    (wywoływane przy starcie pracownika i okresowo, gdy czeka na zadania)
+
+    Zadanie przejęte już MAKS_PROB_ZADANIA razy jest oznaczane jako nieudane - najpewniej
+    to ono zabija pracownika, a każdy nowy pracownik padałby na nim ponownie.
+
+    Zwraca: liczba przywróconych zadań
+    """
+    polaczenie = _polaczenie()
+    granica = time.time() - LIMIT_CISZY_PRACOWNIKA
+    with polaczenie:
+        polaczenie.execute("BEGIN IMMEDIATE")
+        zywe = {w["zadanie"] for w in polaczenie.execute(
+            "SELECT zadanie FROM pracownicy WHERE sygnal > ? AND zadanie IS NOT NULL", (granica,)
+        )}
+        porzucone = [w for w in polaczenie.execute("SELECT id, proby FROM zadania WHERE stan = 'w_toku'")
+                     if w["id"] not in zywe]
+        przywrocone, nieudane = [], []
+        for wiersz in porzucone:
+            if wiersz["proby"] >= MAKS_PROB_ZADANIA:
+                polaczenie.execute(
+                    "UPDATE zadania SET stan = 'blad', blad = ?, klucz_api = NULL, zakonczono = ? WHERE id = ?",
+                    (f"pracownik przerwał zadanie {wiersz['proby']} razy (np. brak pamięci)", _teraz(), wiersz["id"])
+                )
+                nieudane.append(wiersz["id"])
+            else:
+                polaczenie.execute("UPDATE zadania SET stan = 'oczekuje', rozpoczeto = NULL WHERE id = ?", (wiersz["id"],))
+                przywrocone.append(wiersz["id"])
+        polaczenie.execute("DELETE FROM pracownicy WHERE sygnal <= ?", (granica,))
+
+    # Pliki nieudanych zadań usuwamy po zatwierdzeniu transakcji (jak w zakoncz_zadanie)
+    for id_zadania in nieudane:
+        shutil.rmtree(os.path.join(FOLDER_PLIKOW_ZADAN, id_zadania), ignore_errors=True)
+        print(f"[kolejka_zadan] ❌ Zadanie {id_zadania} nieudane po {MAKS_PROB_ZADANIA} próbach")
+    if przywrocone:
+        print(f"[kolejka_zadan] Przywrócono {len(przywrocone)} porzuconych zadań")
+    return len(przywrocone)
+
+def przejmij_zadanie():
+    """
+    Atomowo przejmij najstarsze oczekujące zadanie (bezpieczne przy kilku pracownikach)
+
+    Zwraca: słownik (id, model, model_id, klucz_api, profiluj, pliki) albo None gdy kolejka jest pusta
+    """
+    polaczenie = _polaczenie()
+    with polaczenie:
+        # BEGIN IMMEDIATE - blokada zapisu od razu, dwa procesy nie przejmą tego samego zadania
+        polaczenie.execute("BEGIN IMMEDIATE")
+        zadanie = polaczenie.execute(
+            "SELECT id, model, model_id, klucz_api, profiluj FROM zadania WHERE stan = 'oczekuje' ORDER BY utworzono LIMIT 1"
+        ).fetchone()
+        if zadanie is None:
+            return None
+        polaczenie.execute(
+            "UPDATE zadania SET stan = 'w_toku', rozpoczeto = ?, proby = proby + 1 WHERE id = ?",
+            (_teraz(), zadanie["id"])
+        )
+        # W tej samej transakcji - inny pracownik nie uzna zadania za porzucone
+        polaczenie.execute(
+            "INSERT OR REPLACE INTO pracownicy (pid, zadanie, sygnal) VALUES (?, ?, ?)",
+            (os.getpid(), zadanie["id"], time.time())
+        )
+
+    wynik = dict(zadanie)
+    wynik["pliki"] = [dict(w) for w in polaczenie.execute(
+        "SELECT idx, nazwa, sciezka, stan FROM pliki_zadan WHERE zadanie = ? ORDER BY idx", (zadanie["id"],)
+    )]
+    return wynik
+
+def ustaw_stan_pliku(id_zadania, idx, stan, blad=None, id_punktu=None):
+    """
+    Zapisz postęp jednego pliku (odczytywany przez interfejs)
+    id_punktu - ID punktu w Qdrant, pod którym plik zapisano (stan "zapisane")
+    """
+    _polaczenie().execute(
+        "UPDATE pliki_zadan SET stan = ?, blad = ?, id_punktu = ? WHERE zadanie = ? AND idx = ?",
+        (stan, blad, id_punktu, id_zadania, idx)
+    )
+
+def zakoncz_zadanie(id_zadania, wynik=None, blad=None):
+    """
+    Oznacz zadanie jako zakończone (lub nieudane), usuń klucz API i pliki z dysku
+    """
+    _polaczenie().execute(
+        "UPDATE zadania SET stan = ?, wynik = ?, blad = ?, klucz_api = NULL, zakonczono = ? WHERE id = ?",
+        ("blad" if blad else "zakonczone", json.dumps(wynik) if wynik is not None else None, blad, _teraz(), id_zadania)
+    )
+    shutil.rmtree(os.path.join(FOLDER_PLIKOW_ZADAN, id_zadania), ignore_errors=True)
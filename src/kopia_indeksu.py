@@ -0,0 +1,196 @@
+# Zawartość pliku: src/kopia_indeksu.py
+#
+# Eksport i import indeksu zdjęć (wektory + payload) do zwartej kopii na dysku.
+# Odtworzenie indeksu z kopii nie wymaga żadnych zapytań do OpenAI
+# (ani Vision, ani embeddingów).
+#
+# Format kopii (folder):
+#   manifest.json  - opis kopii (liczba punktów, rozmiar wektora, miara, model)
+#   wektory.npy    - macierz float32 (liczba_punktow x rozmiar_wektora), do odczytu przez mmap
+#   payload.jsonl  - jeden wiersz JSON na punkt: {"id": ..., "payload": {...}}
+#
+# Użycie:
+#   python src/kopia_indeksu.py eksport kopia_indeksu/
+#   python src/kopia_indeksu.py import kopia_indeksu/
+
+import os  # ścieżki
+import json  # manifest i payload
+import argparse  # argumenty wiersza poleceń
+from datetime import datetime  # data utworzenia kopii
+
+import numpy as np  # macierz wektorów float32
+
+import baza_danych  # klient Qdrant, alias, tworzenie kolekcji
+import ladowanie_zbiorcze  # równoległe ładowanie partii z barierą spójności
+
+# Wersja formatu kopii (zmienić przy niekompatybilnych zmianach formatu)
+WERSJA_FORMATU = 1
+
+# Nazwy plików w folderze kopii
+PLIK_MANIFESTU = "manifest.json"
+PLIK_WEKTOROW = "wektory.npy"
+PLIK_PAYLOADU = "payload.jsonl"
+
+# Liczba punktów w jednej partii (scroll przy eksporcie, upsert przy imporcie)
+ROZMIAR_PARTII = 512
+
+# Liczba równoległych wątków wstawiających partie przy imporcie
+LICZBA_WATKOW = 4
+
+def eksportuj_indeks(folder, rozmiar_partii=ROZMIAR_PARTII):
+    """
+    Zapisz cały indeks (kolekcję wskazywaną przez alias) do folderu kopii
+
+    Parametry:
+    - folder: folder docelowy (zostanie utworzony)
+    - rozmiar_partii: ile punktów pobierać z Qdrant na raz
+
+    Zwraca: słownik manifestu
+    """
+    klient = baza_danych.pobierz_klienta_qdrant()
+    nazwa_kolekcji = baza_danych.rozwiaz_alias()
+
+    # Konfiguracja wektorów kolekcji (rozmiar, miara)
+    parametry = klient.get_collection(nazwa_kolekcji).config.params.vectors
+    liczba_punktow = klient.count(collection_name=nazwa_kolekcji, exact=True).count
+
+    os.makedirs(folder, exist_ok=True)
+
+    # Macierz wektorów zapisywana bezpośrednio do pliku .npy (bez trzymania całości w RAM)
+    wektory = np.lib.format.open_memmap(
+        os.path.join(folder, PLIK_WEKTOROW), mode="w+",
+        dtype=np.float32, shape=(liczba_punktow, parametry.size)
+    )
+
+    zapisane = 0
+    offset = None
+    with open(os.path.join(folder, PLIK_PAYLOADU), "w", encoding="utf-8") as plik_payloadu:
+        while zapisane < liczba_punktow:
+            punkty, offset = klient.scroll(
+                collection_name=nazwa_kolekcji, limit=rozmiar_partii, offset=offset,
+                with_payload=True, with_vectors=True
+            )
+
+            # Punkty dodane w trakcie eksportu nie mieszczą się w macierzy - pomijamy je
+            punkty = punkty[:liczba_punktow - zapisane]
+            if punkty:
+                wektory[zapisane:zapisane + len(punkty)] = np.asarray([p.vector for p in punkty], dtype=np.float32)
+                for punkt in punkty:
+                    plik_payloadu.write(json.dumps({"id": punkt.id, "payload": punkt.payload}, ensure_ascii=False) + "\n")
+                zapisane += len(punkty)
+
+            print(f"[kopia_indeksu] Wyeksportowano {zapisane}/{liczba_punktow} punktów")
+            if offset is None:
+                break
+
+    wektory.flush()
+    del wektory
+
+    # Jeśli punkty usunięto w trakcie eksportu - przytnij macierz do faktycznej liczby
+    if zapisane < liczba_punktow:
+        pelne = np.load(os.path.join(folder, PLIK_WEKTOROW))[:zapisane]
+        np.save(os.path.join(folder, PLIK_WEKTOROW), pelne)
+
+    manifest = {
+        "wersja_formatu": WERSJA_FORMATU,
+        "kolekcja": nazwa_kolekcji,  # z której kolekcji pochodzi kopia
+        "liczba_punktow": zapisane,
+        "rozmiar_wektora": parametry.size,
+        "miara": parametry.distance.value if hasattr(parametry.distance, "value") else str(parametry.distance),
+        "dostawca_embeddingow": baza_danych.DOSTAWCA_EMBEDDINGOW,
+        "model_embeddingu": baza_danych.MODEL_EMBEDDINGU,
+        "typ_wektorow": "float32",
+        "utworzono": datetime.now().isoformat(timespec="seconds"),
+        "pliki": {"wektory": PLIK_WEKTOROW, "payload": PLIK_PAYLOADU}
+    }
+    with open(os.path.join(folder, PLIK_MANIFESTU), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print(f"[kopia_indeksu] ✅ Kopia zapisana w '{folder}' ({zapisane} punktów)")
+    return manifest
+
+def wczytaj_kopie(folder):
+    """
+    Wczytaj kopię z dysku bez ładowania wektorów do pamięci
+
+    Zwraca: tupla (manifest, wektory jako memmap, lista ID, lista payloadów)
+    """
+    with open(os.path.join(folder, PLIK_MANIFESTU), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("wersja_formatu") != WERSJA_FORMATU:
+        raise ValueError(f"Nieobsługiwana wersja formatu kopii: {manifest.get('wersja_formatu')}")
+
+    # mmap_mode="r" - wektory czytane z dysku dopiero gdy są potrzebne
+    wektory = np.load(os.path.join(folder, manifest["pliki"]["wektory"]), mmap_mode="r")
+
+    identyfikatory = []
+    payloady = []
+    with open(os.path.join(folder, manifest["pliki"]["payload"]), "r", encoding="utf-8") as f:
+        for wiersz in f:
+            rekord = json.loads(wiersz)
+            identyfikatory.append(rekord["id"])
+            payloady.append(rekord["payload"])
+
+    if len(identyfikatory) != wektory.shape[0]:
+        raise ValueError("Kopia jest niespójna: liczba wektorów różni się od liczby payloadów.")
+
+    return manifest, wektory, identyfikatory, payloady
+
+def importuj_indeks(folder, wersja=None, rozmiar_partii=ROZMIAR_PARTII, liczba_watkow=LICZBA_WATKOW, grpc=None):
+    """
+    Odtwórz indeks z kopii do nowej wersji kolekcji i przełącz na nią alias
+
+    Parametry:
+    - folder: folder z kopią (wynik eksportuj_indeks)
+    - wersja: numer wersji kolekcji docelowej (domyślnie pierwszy wolny)
+    - rozmiar_partii: ile punktów w jednym upsert
+    - liczba_watkow: ile partii wstawiać równolegle
+    - grpc: True = transport gRPC (None = QDRANT_PREFER_GRPC z .env)
+
+    Zwraca: nazwa utworzonej kolekcji
+    """
+    klient = baza_danych.pobierz_klienta_qdrant()
+    manifest, wektory, identyfikatory, payloady = wczytaj_kopie(folder)
+
+    if manifest["model_embeddingu"] != baza_danych.MODEL_EMBEDDINGU:
+        print(f"[kopia_indeksu] ⚠️ Kopia używa modelu '{manifest['model_embeddingu']}', "
+              f"a aplikacja '{baza_danych.MODEL_EMBEDDINGU}' - ustaw MODEL_EMBEDDINGU w .env")
+
+    # Stara kolekcja bez aliasu blokuje utworzenie aliasu o tej samej nazwie
+    if baza_danych.rozwiaz_alias() == baza_danych.NAZWA_KOLEKCJI and klient.collection_exists(baza_danych.NAZWA_KOLEKCJI):
+        raise ValueError(f"Kolekcja '{baza_danych.NAZWA_KOLEKCJI}' nie ma aliasu - najpierw uruchom migracja.py.")
+
+    nazwa_kolekcji = baza_danych.nazwa_wersji_kolekcji(wersja or baza_danych.nastepna_wersja_kolekcji())
+    baza_danych.utworz_kolekcje(nazwa_kolekcji, manifest["rozmiar_wektora"], manifest["miara"])
+
+    # Ładowanie zbiorcze: partie równolegle bez czekania na każdą, na końcu bariera
+    # spójności - alias przełączany dopiero gdy kolekcja ma wszystkie punkty
+    ladowanie_zbiorcze.zaladuj(
+        nazwa_kolekcji, wektory, payloady, identyfikatory, rozmiar_partii, liczba_watkow,
+        grpc=grpc, oczekiwana_liczba=len(identyfikatory)
+    )
+
+    # Nowa kolekcja gotowa - przełącz alias (atomowo, bez przerwy w wyszukiwaniu)
+    baza_danych.przelacz_alias(nazwa_kolekcji)
+    
+    # Katalog w magazynie metadanych musi odpowiadać odtworzonemu indeksowi
+    baza_danych.zsynchronizuj_magazyn(wymus=True)
+
+    print(f"[kopia_indeksu] ✅ Indeks odtworzony w kolekcji '{nazwa_kolekcji}'")
+    return nazwa_kolekcji
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eksport/import kopii indeksu zdjęć")
+    parser.add_argument("polecenie", choices=["eksport", "import"], help="co zrobić")
+    parser.add_argument("folder", help="folder kopii")
+    parser.add_argument("--wersja", type=int, help="numer wersji kolekcji przy imporcie")
+    parser.add_argument("--partia", type=int, default=ROZMIAR_PARTII, help="liczba punktów w partii")
+    parser.add_argument("--watki", type=int, default=LICZBA_WATKOW, help="liczba równoległych wątków importu")
+    parser.add_argument("--grpc", action="store_true", default=None, help="importuj przez gRPC")
+    argumenty = parser.parse_args()
+
+    if argumenty.polecenie == "eksport":
+        eksportuj_indeks(argumenty.folder, argumenty.partia)
+    else:
+        importuj_indeks(argumenty.folder, argumenty.wersja, argumenty.partia, argumenty.watki, argumenty.grpc)
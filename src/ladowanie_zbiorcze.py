@@ -0,0 +1,181 @@
+# Zawartość pliku: src/ladowanie_zbiorcze.py
+#
+# Zbiorcze ładowanie wektorów do Qdrant (uzupełnianie indeksu, import kopii).
+# Zwykły zapis (baza_danych.zapisz_embedding/zapisz_embeddingi) czeka na
+# potwierdzenie każdego zapytania (wait=True), bo musi być spójny z magazynem
+# metadanych. Przy ładowaniu dziesiątek tysięcy punktów to zbędne:
+# - partie po ROZMIAR_PARTII punktów wysyłane przez upload_collection
+# - kilka wątków wysyła partie równolegle (czekanie na sieć, nie na CPU)
+# - wait=False - Qdrant tylko przyjmuje partię do kolejki i od razu odpowiada
+# - na końcu jedna bariera spójności: ostatni zapis z wait=True (Qdrant stosuje
+#   operacje po kolei, więc jego potwierdzenie oznacza zastosowanie wcześniejszych)
+#   i sprawdzenie liczby punktów
+# - opcjonalnie transport gRPC (--grpc albo QDRANT_PREFER_GRPC=1) - protobuf zamiast JSON
+#
+# Użycie (pomiar: stara ścieżka zapisu vs ładowanie zbiorcze na tymczasowej kolekcji):
+#   python src/ladowanie_zbiorcze.py --pomiar 20000
+#   python src/ladowanie_zbiorcze.py --pomiar 20000 --grpc --partia 512 --watki 8
+
+import os  # zmienne środowiskowe
+import time  # pomiar czasu i odpytywanie przy barierze
+import argparse  # argumenty wiersza poleceń
+from concurrent.futures import ThreadPoolExecutor  # równoległe wysyłanie partii
+
+import baza_danych  # klient Qdrant i konfiguracja połączenia
+
+# Liczba punktów w jednym zapytaniu do Qdrant
+ROZMIAR_PARTII = int(os.getenv("ROZMIAR_PARTII_ZAPISU", "256"))
+
+# Liczba wątków wysyłających partie równolegle
+LICZBA_WATKOW = int(os.getenv("LICZBA_WATKOW_ZAPISU", "4"))
+
+# Ile sekund bariera czeka, aż wszystkie punkty będą widoczne
+LIMIT_BARIERY = 120
+
+def _bariera(klient, kolekcja, ostatni_wektor, ostatni_payload, ostatni_id, oczekiwana_liczba):
+    """
+    Poczekaj, aż wszystkie wysłane partie zostaną zastosowane
+
+    Ostatni punkt jest zapisywany ponownie z wait=True (ta sama treść - operacja
+    idempotentna), a potem liczba punktów jest sprawdzana aż osiągnie oczekiwaną.
+
+    Zwraca: liczba punktów w kolekcji
+    """
+    klient.upload_collection(
+        collection_name=kolekcja, vectors=ostatni_wektor, payload=ostatni_payload,
+        ids=[ostatni_id], wait=True
+    )
+    if oczekiwana_liczba is None:
+        return klient.count(collection_name=kolekcja, exact=True).count
+
+    koniec = time.monotonic() + LIMIT_BARIERY
+    while True:
+        liczba = klient.count(collection_name=kolekcja, exact=True).count
+        if liczba >= oczekiwana_liczba or time.monotonic() > koniec:
+            return liczba
+        time.sleep(0.2)
+
+def zaladuj(kolekcja, wektory, payloady=None, identyfikatory=None, rozmiar_partii=ROZMIAR_PARTII,
+            liczba_watkow=LICZBA_WATKOW, grpc=None, oczekiwana_liczba=None, klient=None):
+    """
+    Załaduj macierz wektorów do kolekcji partiami, równolegle, bez czekania na każdą partię
+
+    Parametry:
+    - kolekcja: nazwa kolekcji docelowej
+    - wektory: macierz float32 (liczba_punktow x rozmiar), także np.memmap z kopii indeksu
+    - payloady: lista payloadów (None = puste)
+    - identyfikatory: lista ID punktów
+    - rozmiar_partii: liczba punktów w jednym zapytaniu
+    - liczba_watkow: ile partii wysyłać równolegle
+    - grpc: True/False - wymuś transport (None = klient aplikacji, QDRANT_PREFER_GRPC z .env)
+    - oczekiwana_liczba: liczba punktów w kolekcji po załadowaniu (bariera czeka aż się zgadza)
+    - klient: gotowy klient Qdrant (domyślnie wg parametru grpc)
+
+    Zwraca: słownik {"punkty", "sekundy", "na_sekunde", "w_kolekcji"}
+    """
+    import numpy as np
+
+    if klient is None:
+        klient = baza_danych.pobierz_klienta_qdrant() if grpc is None else baza_danych.utworz_klienta_qdrant(grpc)
+
+    liczba_punktow = len(identyfikatory)
+    if payloady is None:
+        payloady = [{}] * liczba_punktow
+    if liczba_punktow == 0:
+        return {"punkty": 0, "sekundy": 0.0, "na_sekunde": 0.0, "w_kolekcji": None}
+
+    # Każdy wątek dostaje kilka kolejnych partii (mniej przełączeń, mniej małych zadań)
+    na_watek = rozmiar_partii * 8
+
+    def wyslij(poczatek):
+        koniec = min(poczatek + na_watek, liczba_punktow)
+        klient.upload_collection(
+            collection_name=kolekcja,
+            vectors=np.asarray(wektory[poczatek:koniec], dtype=np.float32),
+            payload=payloady[poczatek:koniec],
+            ids=identyfikatory[poczatek:koniec],
+            batch_size=rozmiar_partii,
+            wait=False  # Qdrant tylko przyjmuje partię - spójność zapewnia bariera
+        )
+        return koniec - poczatek
+
+    start = time.perf_counter()
+    wyslane = 0
+    with ThreadPoolExecutor(max_workers=liczba_watkow) as watki:
+        for liczba in watki.map(wyslij, range(0, liczba_punktow, na_watek)):
+            wyslane += liczba
+            print(f"[ladowanie_zbiorcze] Wysłano {wyslane}/{liczba_punktow} punktów")
+
+    w_kolekcji = _bariera(
+        klient, kolekcja, np.asarray(wektory[-1:], dtype=np.float32), payloady[-1:],
+        identyfikatory[-1], oczekiwana_liczba
+    )
+    sekundy = time.perf_counter() - start
+
+    if oczekiwana_liczba is not None and w_kolekcji < oczekiwana_liczba:
+        raise RuntimeError(
+            f"Po {LIMIT_BARIERY} s w kolekcji '{kolekcja}' jest {w_kolekcji} z {oczekiwana_liczba} punktów."
+        )
+
+    print(f"[ladowanie_zbiorcze] ✅ {liczba_punktow} punktów w {sekundy:.1f} s "
+          f"({liczba_punktow / sekundy:.0f} wektorów/s)")
+    return {"punkty": liczba_punktow, "sekundy": sekundy, "na_sekunde": liczba_punktow / sekundy, "w_kolekcji": w_kolekcji}
+
+def zmierz(liczba_punktow, rozmiar_partii=ROZMIAR_PARTII, liczba_watkow=LICZBA_WATKOW, grpc=None,
+           proba_pojedynczych=500):
+    """
+    Porównaj zapis punkt po punkcie (upsert z wait=True) z ładowaniem zbiorczym
+    na tymczasowej kolekcji (usuwanej na końcu)
+
+    Zwraca: tupla (wektory/s zapisu pojedynczego, wektory/s ładowania zbiorczego)
+    """
+    import numpy as np
+    from qdrant_client.models import PointStruct
+
+    klient = baza_danych.pobierz_klienta_qdrant() if grpc is None else baza_danych.utworz_klienta_qdrant(grpc)
+    rozmiar = baza_danych.ROZMIAR_WEKTORA or 1536
+    generator = np.random.default_rng(0)
+    wektory = generator.standard_normal((liczba_punktow, rozmiar), dtype=np.float32)
+    wektory /= np.linalg.norm(wektory, axis=1, keepdims=True)
+    payloady = [{"opis": f"punkt {i}", "nazwa_zdjecia": f"pomiar_{i}.jpg"} for i in range(liczba_punktow)]
+
+    kolekcja = f"pomiar_ladowania_{os.getpid()}"
+    klient.create_collection(kolekcja, vectors_config={"size": rozmiar, "distance": baza_danych.MIARA_ODLEGLOSCI})
+    try:
+        # Stara ścieżka: jeden punkt na zapytanie, czekanie na każde potwierdzenie
+        proba = min(proba_pojedynczych, liczba_punktow)
+        start = time.perf_counter()
+        for i in range(proba):
+            klient.upsert(
+                collection_name=kolekcja,
+                points=[PointStruct(id=i, vector=wektory[i].tolist(), payload=payloady[i])],
+                wait=True
+            )
+        pojedyncze = proba / (time.perf_counter() - start)
+
+        klient.delete_collection(kolekcja)
+        klient.create_collection(kolekcja, vectors_config={"size": rozmiar, "distance": baza_danych.MIARA_ODLEGLOSCI})
+
+        zbiorcze = zaladuj(
+            kolekcja, wektory, payloady, list(range(liczba_punktow)), rozmiar_partii, liczba_watkow,
+            oczekiwana_liczba=liczba_punktow, klient=klient
+        )["na_sekunde"]
+    finally:
+        klient.delete_collection(kolekcja)
+
+    print(f"[ladowanie_zbiorcze] Zapis pojedynczy: {pojedyncze:.0f} wektorów/s (próba {proba} punktów)")
+    transport = "gRPC" if (baza_danych.QDRANT_PREFER_GRPC if grpc is None else grpc) else "REST"
+    print(f"[ladowanie_zbiorcze] Ładowanie zbiorcze: {zbiorcze:.0f} wektorów/s "
+          f"(partia {rozmiar_partii}, wątki {liczba_watkow}, {transport})")
+    print(f"[ladowanie_zbiorcze] Przyspieszenie: {zbiorcze / pojedyncze:.1f}x")
+    return pojedyncze, zbiorcze
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zbiorcze ładowanie wektorów do Qdrant - pomiar przepustowości")
+    parser.add_argument("--pomiar", type=int, default=20000, help="liczba punktów w pomiarze")
+    parser.add_argument("--partia", type=int, default=ROZMIAR_PARTII, help="liczba punktów w partii")
+    parser.add_argument("--watki", type=int, default=LICZBA_WATKOW, help="liczba równoległych wątków")
+    parser.add_argument("--grpc", action="store_true", default=None, help="użyj transportu gRPC")
+    argumenty = parser.parse_args()
+
+    zmierz(argumenty.pomiar, argumenty.partia, argumenty.watki, argumenty.grpc)
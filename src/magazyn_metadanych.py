@@ -0,0 +1,350 @@
+# Zawartość pliku: src/magazyn_metadanych.py
+#
+# Lokalny magazyn metadanych (SQLite) - źródło prawdy dla katalogu zdjęć.
+# Proste pytania (lista nazw, czy nazwa istnieje, ID po nazwie) są obsługiwane
+# przez indeksy SQLite w mikrosekundach, bez przewijania payloadów w Qdrant.
+# Zapisy odbywają się w tej samej transakcji co upsert do Qdrant
+# (patrz baza_danych.zapisz_embedding).
+#
+# Tabela "tagi" to lokalny indeks odwrócony tagów z Vision API (obiekty, scena,
+# kolory, liczba osób): (pole, wartość) -> ID zdjęć. Liczniki tagów i przeglądanie
+# po tagach są odpowiadane z SQLite - bez embeddingów i bez zapytań do Qdrant.
+
+import os  # ścieżki i zmienne środowiskowe
+import json  # zapis metadanych EXIF jako JSON
+import sqlite3  # wbudowana baza danych SQLite
+import threading  # osobne połączenie dla każdego wątku (Streamlit jest wielowątkowy)
+from contextlib import contextmanager  # menedżer kontekstu dla transakcji
+from datetime import datetime  # znaczniki czasu
+
+# Ścieżka do pliku bazy SQLite
+SCIEZKA_MAGAZYNU = os.getenv("MAGAZYN_METADANYCH", "metadane_zdjec.sqlite3")
+
+# Schemat bazy (tworzony przy pierwszym połączeniu)
+SCHEMAT = """
+CREATE TABLE IF NOT EXISTS zdjecia (
+    id_punktu PRIMARY KEY,      -- ID punktu w Qdrant (liczba lub UUID)
+    nazwa TEXT NOT NULL,        -- nazwa zdjęcia (np. "foto.jpg")
+    sciezka TEXT,               -- ścieżka do zapisanego pliku
+    hash TEXT,                  -- sha256 zawartości pliku
+    dhash TEXT,                 -- hash percepcyjny (szesnastkowo)
+    opis TEXT,                  -- opis wygenerowany przez AI
+    model TEXT,                 -- model embeddingów użyty dla punktu
+    exif TEXT,                  -- metadane (EXIF, wymiary) jako JSON
+    utworzono TEXT NOT NULL,    -- kiedy zdjęcie dodano
+    zaktualizowano TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_zdjecia_nazwa ON zdjecia(nazwa);
+CREATE INDEX IF NOT EXISTS idx_zdjecia_hash ON zdjecia(hash);
+CREATE TABLE IF NOT EXISTS tagi (
+    pole TEXT NOT NULL,         -- np. "obiekty", "scena", "kolory", "liczba_osob"
+    wartosc TEXT NOT NULL,      -- np. "pies", "plaża", "czerwony", "2"
+    id_punktu NOT NULL,
+    PRIMARY KEY (pole, wartosc, id_punktu)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tagi_punkt ON tagi(id_punktu);
+-- Usunięcie zdjęcia usuwa jego tagi (usun_po_id, usun_wszystkie)
+CREATE TRIGGER IF NOT EXISTS usun_tagi_zdjecia AFTER DELETE ON zdjecia BEGIN
+    DELETE FROM tagi WHERE id_punktu = old.id_punktu;
+END;
+CREATE TABLE IF NOT EXISTS ustawienia (
+    klucz TEXT PRIMARY KEY,
+    wartosc TEXT
+);
+"""
+
+# Pola metadanych trafiające do indeksu tagów (wartości pojedyncze albo listy)
+POLA_TAGOW = ("obiekty", "scena", "kolory", "liczba_osob")
+
+# Klucz licznika zmian w tabeli ustawień (sygnatura_zmian)
+KLUCZ_LICZNIKA_ZMIAN = "licznik_zmian"
+
+# Połączenia per wątek (obiekt sqlite3.Connection nie powinien być dzielony między wątkami)
+_lokalne = threading.local()
+
+# Kolumny dodane w późniejszych wersjach (dla baz utworzonych wcześniej)
+DODANE_KOLUMNY = {
+    "dhash": "TEXT"
+}
+
+def _uzupelnij_kolumny(polaczenie):
+    """
+    Dodaj brakujące kolumny do tabeli zdjęć (baza utworzona przez starszą wersję)
+    """
+    istniejace = {w[1] for w in polaczenie.execute("PRAGMA table_info(zdjecia)")}
+    for kolumna, typ in DODANE_KOLUMNY.items():
+        if kolumna not in istniejace:
+            polaczenie.execute(f"ALTER TABLE zdjecia ADD COLUMN {kolumna} {typ}")
+    polaczenie.commit()
+
+def _polaczenie():
+    """
+    Pobierz połączenie SQLite dla bieżącego wątku (tworzone przy pierwszym użyciu)
+    """
+    polaczenie = getattr(_lokalne, "polaczenie", None)
+    if polaczenie is None:
+        polaczenie = sqlite3.connect(SCIEZKA_MAGAZYNU, timeout=30)
+        polaczenie.row_factory = sqlite3.Row  # wiersze dostępne po nazwach kolumn
+        polaczenie.execute("PRAGMA journal_mode=WAL")  # czytelnicy nie blokują zapisu
+        polaczenie.execute("PRAGMA synchronous=NORMAL")  # bezpieczne w trybie WAL, dużo szybsze
+        polaczenie.executescript(SCHEMAT)
+        _uzupelnij_kolumny(polaczenie)
+        _lokalne.polaczenie = polaczenie
+    return polaczenie
+
+@contextmanager
+def transakcja():
+    """
+    Transakcja SQLite - zatwierdzana na końcu bloku, wycofywana przy wyjątku
+    Każda zatwierdzona transakcja zwiększa licznik zmian (sygnatura_zmian)
+
+    Użycie:
+        with transakcja() as polaczenie:
+            zapisz_zdjecie(..., polaczenie=polaczenie)
+            klient_qdrant.upsert(...)  # wyjątek tutaj wycofa zapis w SQLite
+    """
+    polaczenie = _polaczenie()
+    with polaczenie:  # sqlite3: commit przy sukcesie, rollback przy wyjątku
+        yield polaczenie
+        # W tej samej transakcji - wycofany zapis nie zmienia licznika
+        polaczenie.execute(
+            "INSERT INTO ustawienia (klucz, wartosc) VALUES (?, 1) "
+            "ON CONFLICT(klucz) DO UPDATE SET wartosc = CAST(wartosc AS INTEGER) + 1",
+            (KLUCZ_LICZNIKA_ZMIAN,)
+        )
+
+# ===== ZAPIS =====
+
+def zapisz_zdjecie(id_punktu, nazwa, sciezka=None, hash_zawartosci=None, opis=None,
+                   model=None, exif=None, polaczenie=None, dhash=None):
+    """
+    Zapisz (lub zaktualizuj) rekord zdjęcia
+
+    Parametry:
+    - id_punktu: ID punktu w Qdrant
+    - nazwa, sciezka, hash_zawartosci, opis, model: dane zdjęcia
+    - exif: słownik metadanych (zapisywany jako JSON)
+    - polaczenie: połączenie z otwartą transakcją (domyślnie: zapis od razu zatwierdzany)
+    - dhash: hash percepcyjny (tekst szesnastkowy)
+    """
+    teraz = datetime.now().isoformat(timespec="seconds")
+    zapytanie = """
+        INSERT INTO zdjecia (id_punktu, nazwa, sciezka, hash, dhash, opis, model, exif, utworzono, zaktualizowano)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id_punktu) DO UPDATE SET
+            nazwa = excluded.nazwa, sciezka = excluded.sciezka, hash = excluded.hash,
+            dhash = excluded.dhash, opis = excluded.opis, model = excluded.model,
+            exif = excluded.exif, zaktualizowano = excluded.zaktualizowano
+    """
+    parametry = (
+        id_punktu, nazwa, sciezka, hash_zawartosci, dhash, opis, model,
+        json.dumps(exif, ensure_ascii=False) if exif else None, teraz, teraz
+    )
+
+    # Tagi zdjęcia (poprzednie są zastępowane przy aktualizacji)
+    tagi = [
+        (pole, str(wartosc), id_punktu)
+        for pole in POLA_TAGOW
+        for wartosc in _wartosci_tagu((exif or {}).get(pole))
+    ]
+
+    if polaczenie is not None:
+        _zapisz_z_tagami(polaczenie, zapytanie, parametry, id_punktu, tagi)
+    else:
+        with transakcja() as nowe_polaczenie:
+            _zapisz_z_tagami(nowe_polaczenie, zapytanie, parametry, id_punktu, tagi)
+
+def _wartosci_tagu(wartosc):
+    """
+    Zamień wartość pola tagu na listę wartości (lista, pojedyncza wartość albo brak)
+    """
+    if wartosc is None or wartosc == "":
+        return []
+    if isinstance(wartosc, (list, tuple)):
+        return [w for w in wartosc if w is not None and w != ""]
+    return [wartosc]
+
+def _zapisz_z_tagami(polaczenie, zapytanie, parametry, id_punktu, tagi):
+    polaczenie.execute(zapytanie, parametry)
+    polaczenie.execute("DELETE FROM tagi WHERE id_punktu = ?", (id_punktu,))
+    polaczenie.executemany("INSERT OR IGNORE INTO tagi (pole, wartosc, id_punktu) VALUES (?, ?, ?)", tagi)
+
+# ===== ODCZYT =====
+
+def czy_nazwa_istnieje(nazwa):
+    """
+    Sprawdź czy zdjęcie o danej nazwie jest w magazynie (indeks na kolumnie nazwa)
+    """
+    wiersz = _polaczenie().execute("SELECT 1 FROM zdjecia WHERE nazwa = ? LIMIT 1", (nazwa,)).fetchone()
+    return wiersz is not None
+
+def czy_hash_istnieje(hash_zawartosci):
+    """
+    Sprawdź czy zdjęcie o danej zawartości (sha256) jest w magazynie
+    """
+    wiersz = _polaczenie().execute("SELECT 1 FROM zdjecia WHERE hash = ? LIMIT 1", (hash_zawartosci,)).fetchone()
+    return wiersz is not None
+
+def znajdz_id_po_nazwie(nazwa):
+    """
+    Zwróć listę ID punktów Qdrant dla zdjęć o danej nazwie
+    """
+    wiersze = _polaczenie().execute("SELECT id_punktu FROM zdjecia WHERE nazwa = ?", (nazwa,)).fetchall()
+    return [w["id_punktu"] for w in wiersze]
+
+def pobierz_wszystkie(limit=None, offset=0):
+    """
+    Zwróć listę wszystkich zdjęć (jedno na punkt, w kolejności dodania - zdjęcia
+    o tej samej nazwie są osobnymi wpisami)
+
+    Parametry:
+    - limit: ile zdjęć zwrócić (None = wszystkie)
+    - offset: ile pierwszych zdjęć pominąć (stronicowanie)
+
+    Zwraca: lista słowników z kluczami "nazwa", "opis", "sciezka", "id"
+    """
+    wiersze = _polaczenie().execute("""
+        SELECT nazwa, opis, sciezka, id_punktu
+        FROM zdjecia
+        ORDER BY rowid
+        LIMIT ? OFFSET ?
+    """, (-1 if limit is None else limit, offset)).fetchall()
+    return [{"nazwa": w["nazwa"], "opis": w["opis"], "sciezka": w["sciezka"], "id": w["id_punktu"]} for w in wiersze]
+
+def pobierz_zdjecie(id_punktu):
+    """
+    Zwróć pełny rekord zdjęcia (z metadanymi EXIF i tagami) albo None
+    """
+    wiersz = _polaczenie().execute("SELECT * FROM zdjecia WHERE id_punktu = ?", (id_punktu,)).fetchone()
+    if wiersz is None:
+        return None
+    zdjecie = dict(wiersz)
+    zdjecie["exif"] = json.loads(zdjecie["exif"]) if zdjecie["exif"] else {}
+    return zdjecie
+
+def _pasujace_do_tagow(wybrane):
+    """
+    Podzapytanie SQL z ID zdjęć mającymi wszystkie wybrane tagi
+
+    wybrane: słownik pole -> lista wartości (np. {"obiekty": ["pies"], "scena": ["plaża"]})
+    Zwraca: tupla (tekst podzapytania albo None gdy nic nie wybrano, parametry)
+    """
+    warunki = [(pole, str(wartosc)) for pole, wartosci in (wybrane or {}).items() for wartosc in wartosci]
+    if not warunki:
+        return None, []
+    podzapytanie = " INTERSECT ".join(["SELECT id_punktu FROM tagi WHERE pole = ? AND wartosc = ?"] * len(warunki))
+    return podzapytanie, [parametr for warunek in warunki for parametr in warunek]
+
+def policz_tagi(wybrane=None):
+    """
+    Liczniki tagów (fasety) wśród zdjęć mających wszystkie wybrane tagi
+
+    Parametr:
+    - wybrane: słownik pole -> lista wartości (None = wszystkie zdjęcia)
+
+    Zwraca: słownik pole -> lista tupli (wartość, liczba zdjęć), od najczęstszych
+    """
+    podzapytanie, parametry = _pasujace_do_tagow(wybrane)
+    zapytanie = "SELECT pole, wartosc, COUNT(*) AS liczba FROM tagi"
+    if podzapytanie:
+        zapytanie += f" WHERE id_punktu IN ({podzapytanie})"
+    zapytanie += " GROUP BY pole, wartosc ORDER BY pole, liczba DESC, wartosc"
+
+    liczniki = {}
+    for wiersz in _polaczenie().execute(zapytanie, parametry):
+        liczniki.setdefault(wiersz["pole"], []).append((wiersz["wartosc"], wiersz["liczba"]))
+    return liczniki
+
+def znajdz_po_tagach(wybrane, limit=None, offset=0):
+    """
+    Zwróć zdjęcia mające wszystkie wybrane tagi (w kolejności dodania)
+
+    Parametry:
+    - wybrane: słownik pole -> lista wartości
+    - limit, offset: stronicowanie (None = wszystkie)
+
+    Zwraca: lista słowników z kluczami "nazwa", "opis", "sciezka", "id"
+    """
+    podzapytanie, parametry = _pasujace_do_tagow(wybrane)
+    zapytanie = "SELECT nazwa, opis, sciezka, id_punktu FROM zdjecia"
+    if podzapytanie:
+        zapytanie += f" WHERE id_punktu IN ({podzapytanie})"
+    zapytanie += " ORDER BY rowid LIMIT ? OFFSET ?"
+    parametry += [-1 if limit is None else limit, offset]
+
+    return [
+        {"nazwa": w["nazwa"], "opis": w["opis"], "sciezka": w["sciezka"], "id": w["id_punktu"]}
+        for w in _polaczenie().execute(zapytanie, parametry)
+    ]
+
+def pobierz_hasze_percepcyjne():
+    """
+    Zwróć listę (dhash, nazwa) wszystkich zdjęć, które mają hash percepcyjny
+    """
+    wiersze = _polaczenie().execute("SELECT dhash, nazwa FROM zdjecia WHERE dhash IS NOT NULL").fetchall()
+    return [(w["dhash"], w["nazwa"]) for w in wiersze]
+
+def sygnatura_zmian():
+    """
+    Zwróć licznik zmieniający się przy każdym zapisie/usunięciu
+    (do unieważniania pamięci podręcznej zbudowanej z zawartości magazynu)
+
+    Licznik jest zwiększany w każdej transakcji zapisu (transakcja()), także w innych
+    procesach. Wcześniejsza sygnatura (liczba wierszy, największy rowid, czas zmiany
+    z dokładnością do sekundy) nie zmieniała się po usunięciu najnowszego wiersza
+    i dodaniu innego w tej samej sekundzie.
+    """
+    return int(pobierz_ustawienie(KLUCZ_LICZNIKA_ZMIAN, 0))
+
+def liczba_zdjec():
+    """
+    Zwróć liczbę rekordów w magazynie
+    """
+    return _polaczenie().execute("SELECT COUNT(*) FROM zdjecia").fetchone()[0]
+
+# ===== USUWANIE =====
+
+def usun_po_id(identyfikatory, polaczenie=None):
+    """
+    Usuń rekordy o podanych ID punktów
+    """
+    identyfikatory = list(identyfikatory)
+    if not identyfikatory:
+        return
+
+    znaki = ",".join("?" * len(identyfikatory))
+    if polaczenie is not None:
+        polaczenie.execute(f"DELETE FROM zdjecia WHERE id_punktu IN ({znaki})", identyfikatory)
+    else:
+        with transakcja() as nowe_polaczenie:
+            nowe_polaczenie.execute(f"DELETE FROM zdjecia WHERE id_punktu IN ({znaki})", identyfikatory)
+
+def usun_wszystkie(polaczenie=None):
+    """
+    Usuń wszystkie rekordy zdjęć
+    """
+    if polaczenie is not None:
+        polaczenie.execute("DELETE FROM zdjecia")
+    else:
+        with transakcja() as nowe_polaczenie:
+            nowe_polaczenie.execute("DELETE FROM zdjecia")
+
+# ===== USTAWIENIA =====
+
+def pobierz_ustawienie(klucz, domyslna=None):
+    """
+    Odczytaj wartość z tabeli ustawień (np. znacznik synchronizacji z Qdrant)
+    """
+    wiersz = _polaczenie().execute("SELECT wartosc FROM ustawienia WHERE klucz = ?", (klucz,)).fetchone()
+    return wiersz["wartosc"] if wiersz else domyslna
+
+def zapisz_ustawienie(klucz, wartosc, polaczenie=None):
+    """
+    Zapisz wartość w tabeli ustawień
+    """
+    zapytanie = "INSERT OR REPLACE INTO ustawienia (klucz, wartosc) VALUES (?, ?)"
+    if polaczenie is not None:
+        polaczenie.execute(zapytanie, (klucz, wartosc))
+    else:
+        with transakcja() as nowe_polaczenie:
+            nowe_polaczenie.execute(zapytanie, (klucz, wartosc))
@@ -0,0 +1,105 @@
+# Zawartość pliku: src/magazyn_plikow.py
+#
+# Magazyn plików zdjęć adresowany zawartością.
+# Każde zdjęcie jest zapisywane pod ścieżką wyliczoną z jego hasha sha256,
+# rozłożoną na podfoldery (np. "zdjecia_przetworzone/ab/cd/abcd1234....jpg"):
+# - żaden folder nie rośnie do setek tysięcy plików
+# - identyczne pliki zajmują miejsce tylko raz (ta sama ścieżka)
+# - nie trzeba szukać wolnej nazwy ("foto_2.jpg", "foto_3.jpg"...) - oryginalna
+#   nazwa pliku jest tylko metadaną (payload "nazwa_zdjecia" i magazyn metadanych)
+# Zapis jest atomowy: plik tymczasowy w tym samym folderze + os.replace,
+# więc równoległe sesje nigdy nie zobaczą w połowie zapisanego pliku.
+
+import os  # ścieżki i podmiana plików
+import shutil  # kopiowanie pliku źródłowego kawałkami
+import hashlib  # sha256 zawartości (gdy hash nie został podany)
+import tempfile  # plik tymczasowy przy zapisie atomowym
+
+# Główny folder zdjęć i folder miniatur
+FOLDER_ZDJEC = os.getenv("FOLDER_ZDJEC", "zdjecia_przetworzone")
+FOLDER_MINIATUR = os.path.join(FOLDER_ZDJEC, "miniatury")
+
+# Długość hasha sha256 w zapisie szesnastkowym (rozpoznawanie ścieżek adresowanych zawartością)
+DLUGOSC_HASHA = 64
+
+def sciezka_obiektu(hash_zawartosci, rozszerzenie, folder=FOLDER_ZDJEC):
+    """
+    Zwróć ścieżkę pliku dla danego hasha, np. "ab/cd/abcd....jpg" w podanym folderze
+
+    Dwa poziomy po 2 znaki = 65 536 podfolderów, więc nawet przy milionach
+    zdjęć w jednym folderze jest ich tylko kilkanaście.
+    """
+    return os.path.join(folder, hash_zawartosci[:2], hash_zawartosci[2:4], f"{hash_zawartosci}{rozszerzenie}")
+
+def zapisz_obiekt(bajty, rozszerzenie, hash_zawartosci=None, folder=FOLDER_ZDJEC):
+    """
+    Zapisz bajty pod ścieżką wyliczoną z hasha (atomowo, bez duplikatów)
+
+    Parametry:
+    - bajty: zawartość pliku albo ścieżka do pliku na dysku (kopiowanego kawałkami)
+    - rozszerzenie: rozszerzenie z kropką, np. ".jpg"
+    - hash_zawartosci: sha256 bajtów (jeśli już policzony - np. w puli procesów)
+    - folder: folder główny (zdjęcia albo miniatury)
+
+    Zwraca: ścieżka zapisanego pliku
+    """
+    z_pliku = isinstance(bajty, (str, os.PathLike))
+
+    if hash_zawartosci is None:
+        if z_pliku:
+            hash_pliku = hashlib.sha256()
+            with open(bajty, "rb") as f:
+                while kawalek := f.read(1024 * 1024):
+                    hash_pliku.update(kawalek)
+            hash_zawartosci = hash_pliku.hexdigest()
+        else:
+            hash_zawartosci = hashlib.sha256(bajty).hexdigest()
+
+    sciezka = sciezka_obiektu(hash_zawartosci, rozszerzenie, folder)
+
+    # Ta sama zawartość jest już zapisana - nic nie robimy (deduplikacja)
+    if os.path.exists(sciezka):
+        return sciezka
+
+    katalog = os.path.dirname(sciezka)
+    os.makedirs(katalog, exist_ok=True)
+
+    # Plik tymczasowy w tym samym folderze (os.replace jest atomowy tylko w obrębie jednego systemu plików)
+    deskryptor, sciezka_tymczasowa = tempfile.mkstemp(dir=katalog, suffix=".tmp")
+    try:
+        with os.fdopen(deskryptor, "wb") as f:
+            if z_pliku:
+                with open(bajty, "rb") as zrodlo:
+                    shutil.copyfileobj(zrodlo, f)
+            else:
+                f.write(bajty)
+        os.replace(sciezka_tymczasowa, sciezka)
+    except BaseException:
+        # Nie zostawiaj śmieci po nieudanym zapisie
+        if os.path.exists(sciezka_tymczasowa):
+            os.remove(sciezka_tymczasowa)
+        raise
+
+    return sciezka
+
+def hash_ze_sciezki(sciezka):
+    """
+    Odczytaj hash z nazwy pliku adresowanego zawartością (albo None dla starych ścieżek)
+    """
+    rdzen = os.path.splitext(os.path.basename(sciezka))[0]
+    if len(rdzen) == DLUGOSC_HASHA and all(znak in "0123456789abcdef" for znak in rdzen):
+        return rdzen
+    return None
+
+def sciezka_miniatury(sciezka_zdjecia):
+    """
+    Zwróć ścieżkę miniatury dla zapisanego zdjęcia
+
+    Zdjęcia adresowane zawartością mają miniatury w tym samym układzie podfolderów
+    ("miniatury/ab/cd/<hash>.jpg"), zdjęcia zapisane przez starsze wersje -
+    w płaskim folderze ("miniatury/foto.png.jpg").
+    """
+    hash_zawartosci = hash_ze_sciezki(sciezka_zdjecia)
+    if hash_zawartosci:
+        return sciezka_obiektu(hash_zawartosci, ".jpg", FOLDER_MINIATUR)
+    return os.path.join(FOLDER_MINIATUR, os.path.basename(sciezka_zdjecia) + ".jpg")
@@ -2,13 +2,26 @@
 
 import streamlit as st
 import os
-from config import wczytaj_klucz_openai, wczytaj_modele, pobierz_rzeczywista_nazwe_modelu
-from przetwarzanie_zdjec import przetworz_zdjecia
+import time
+from config import wczytaj_klucz_openai, wczytaj_modele, pobierz_rzeczywista_nazwe_modelu, MODELE, MODEL_KASKADA
+from przetwarzanie_zdjec import pobierz_sciezke_miniatury
+from przygotowanie_zdjec import zlec_odciski
+from kolejka_zadan import dodaj_zadanie, pobierz_zadanie
+from pliki_sesji import ObszarSesji
+import profilowanie
+from wyszukiwanie_w_tle import (
+    Wyszukiwarka, Anulowano, PrzekroczonoLimit,
+    OPOZNIENIE_WYSZUKIWANIA, LIMIT_CZASU_EMBEDDINGU, LIMIT_CZASU_QDRANT
+)
+from pracownik import uruchom_w_tle as uruchom_pracownika_w_tle
 from baza_danych import (
-    zapisz_embedding, wyszukaj_zdjecia, pobierz_wszystkie_zdjecia,
-    usun_embedding, usun_wszystkie_embeddingi, sprawdz_czy_zdjecie_istnieje
+    wyszukaj_strone, wyszukaj_podobne_strone, pobierz_wszystkie_zdjecia, embedding_zapytania,
+    usun_punkty, usun_wszystkie_embeddingi, sprawdz_czy_zdjecie_istnieje,
+    znajdz_podobne_zdjecia, policz_tagi, przegladaj_po_tagach, ROZNORODNOSC_WYNIKOW
 )
-from utils import oszacuj_koszt
+from magazyn_metadanych import POLA_TAGOW
+from utils import oszacuj_koszt, oszacuj_koszt_kaskady
+from magazyn_metadanych import sygnatura_zmian
 
 # ===== FUNKCJE POMOCNICZE =====
 def czy_streamlit_cloud():
@@ -49,6 +62,24 @@ if "klucz_z_env" not in st.session_state:
 # ===== KONFIGURACJA STRONY =====
 st.set_page_config(page_title="Znajdywacz zdjęć", layout="wide")
 
+# ===== PROFILOWANIE NA ŻĄDANIE =====
+# Wykonanie przerwane przez st.rerun/st.stop nie doszło do końca skryptu - jego profil
+# jest zapisywany teraz, przed rozpoczęciem nowego
+if st.session_state.get("profil_wykonania") is not None:
+    st.session_state.profil_wykonania.zakoncz("wykonanie przerwane (st.rerun / st.stop)")
+    st.session_state.profil_wykonania = None
+
+# Adres z ?profil=<KLUCZ_PROFILOWANIA> włącza panel administratora na całą sesję
+if profilowanie.KLUCZ_PROFILOWANIA and st.query_params.get("profil") == profilowanie.KLUCZ_PROFILOWANIA:
+    if not st.session_state.get("admin_profilowania"):
+        st.session_state.admin_profilowania = True
+        st.session_state.profiluj_wykonania = True
+
+if profilowanie.wlaczone("rerun") or st.session_state.get("profiluj_wykonania"):
+    st.session_state.profil_wykonania = profilowanie.rozpocznij(
+        "wykonanie", pamiec=profilowanie.PROFILOWANIE_PAMIECI or st.session_state.get("profiluj_pamiec", False)
+    )
+
 # ===== INICJALIZACJA SESJI =====
 if "reset_uploader" not in st.session_state:
     st.session_state.reset_uploader = False
@@ -72,15 +103,232 @@ if "znalezione_duplikaty" not in st.session_state:
 if "decyzje_uzytkownika" not in st.session_state:
     st.session_state.decyzje_uzytkownika = {}
 
+# Przesłane pliki odłożone na dysk - lekkie uchwyty (nazwa, ścieżka, rozmiar, hash), nie bufory w RAM
 if "cached_files" not in st.session_state:
     st.session_state.cached_files = None
 
+# Folder tymczasowy sesji na przesłane pliki (tworzony przy pierwszym przesłaniu,
+# usuwany automatycznie, gdy Streamlit zwolni stan zakończonej sesji)
+if "obszar_plikow" not in st.session_state:
+    st.session_state.obszar_plikow = None
+
 if "model_do_przetworzenia" not in st.session_state:
     st.session_state.model_do_przetworzenia = None
 
 if "model_id_do_przetworzenia" not in st.session_state:
     st.session_state.model_id_do_przetworzenia = None
 
+# Wyszukiwanie w tle - nowe zapytanie anuluje poprzednie, jeszcze trwające
+if "wyszukiwarka" not in st.session_state:
+    st.session_state.wyszukiwarka = Wyszukiwarka()
+
+# Zadania tej sesji w kolejce przetwarzania (ID zadań)
+if "zadania_w_toku" not in st.session_state:
+    st.session_state.zadania_w_toku = []
+
+# Zadania zakończone od ostatniego odświeżenia (podsumowanie pokazywane raz)
+if "zakonczone_zadania" not in st.session_state:
+    st.session_state.zakonczone_zadania = []
+
+@st.fragment(run_every=2)
+def pokaz_postep_zadan():
+    """
+    Postęp zadań w kolejce - fragment odświeżany co 2 sekundy bez przeładowania całej strony
+    """
+    st.divider()
+    niezakonczone = False
+    for id_zadania in list(st.session_state.zadania_w_toku):
+        zadanie = pobierz_zadanie(id_zadania)
+        if zadanie is None:
+            st.session_state.zadania_w_toku.remove(id_zadania)
+            continue
+        niezakonczone = niezakonczone or zadanie["stan"] in ("oczekuje", "w_toku")
+        
+        gotowe = sum(p["stan"] in ("zapisane", "blad", "pominiete") for p in zadanie["pliki"])
+        
+        if zadanie["stan"] == "oczekuje":
+            st.progress(0.0, text=f"⏳ Czeka w kolejce ({len(zadanie['pliki'])} zdjęć)")
+        elif zadanie["stan"] == "w_toku":
+            st.progress(zadanie["postep"], text=f"⏳ Przetwarzanie zdjęć: {gotowe}/{len(zadanie['pliki'])}")
+        else:
+            # Zadanie skończone - pokaż wynik i koszt, a następnie odśwież całą stronę (nowe zdjęcia w katalogu)
+            st.session_state.zadania_w_toku.remove(id_zadania)
+            st.session_state.zakonczone_zadania.append(zadanie)
+            st.session_state.przetwarzanie_zakonczone = zadanie["stan"] == "zakonczone"
+            st.rerun()
+    
+    # Pracownik zginął w trakcie (brak pamięci, zabity proces) - nowy przywróci jego zadanie
+    if niezakonczone:
+        uruchom_pracownika_w_tle()
+
+def pokaz_wynik_zadania(zadanie):
+    """
+    Podsumowanie zakończonego zadania: koszt, liczba zapisanych zdjęć, błędy
+    """
+    st.divider()
+    if zadanie["stan"] == "blad":
+        st.error(f"❌ Przetwarzanie nieudane: {zadanie['blad']}")
+        return
+    
+    # Statystyki modeli (zapytania i czas każdego poziomu kaskady)
+    opisy = zadanie["wynik"].get("opisy") or {}
+    statystyki_modeli = opisy.get("modele", {})
+    
+    # Wylicz koszt - w kaskadzie każdy model płaci tylko za swoje zapytania
+    # (bez statystyk, np. gdy żadne zdjęcie nie dotarło do Vision API, płacimy tylko za embeddingi;
+    # alias kaskady nie ma ceny w oszacuj_koszt)
+    if zadanie["model_id"] == MODEL_KASKADA:
+        aliasy = {nazwa: alias for alias, nazwa in MODELE.items()}
+        wynik = oszacuj_koszt_kaskady(
+            {aliasy.get(model, "model_prosty"): s["zapytania"] for model, s in statystyki_modeli.items()},
+            len(zadanie["pliki"])
+        )
+    else:
+        wynik = oszacuj_koszt(len(zadanie["pliki"]), zadanie["model_id"])
+    st.info(wynik["uwaga"])
+    st.write(f"💰 Koszt: {wynik['koszt_calkowity_pln']} PLN")
+    st.write(f"  • Tekst: {wynik['szczegoly']['koszt_generacji_tokeny_pln']} PLN")
+    st.write(f"  • Embeddingi: {wynik['szczegoly']['koszt_embedding_pln']} PLN")
+    
+    # Liczba zdjęć i średni czas odpowiedzi na każdym poziomie
+    if opisy.get("zdjecia"):
+        st.write(f"⏱️ Średni czas opisu zdjęcia: {opisy['sekundy_zdjec'] / opisy['zdjecia']:.1f} s")
+        if opisy.get("paczki"):
+            st.write(f"📦 Zdjęcia wysłane w {opisy['paczki']} paczkach (czas i tokeny paczki dzielone na zdjęcia)")
+        for model, s in statystyki_modeli.items():
+            st.write(
+                f"  • {model}: {s['zakonczone']} zdjęć, {s['zapytania']} zapytań"
+                + (f" ({s['eskalacje']} eskalacji)" if s["eskalacje"] else "")
+                + (f" ({s['ponowienia']} ponowionych pojedynczo)" if s.get("ponowienia") else "")
+                + f", średnio {s['sekundy'] / s['zapytania']:.1f} s"
+                + (f", {s['tokeny'] / s['zapytania']:.0f} tokenów/zdjęcie" if s.get("tokeny") else "")
+            )
+    
+    if zadanie["wynik"].get("profil"):
+        st.caption(f"🩺 Profil zadania: {zadanie['wynik']['profil']}")
+    
+    st.success(f"✅ Zdjęcia przetworzone i zapisane! ({zadanie['wynik']['zapisane']}/{len(zadanie['pliki'])})")
+    if zadanie["wynik"]["zgrupowane"]:
+        st.info(f"🔁 {zadanie['wynik']['zgrupowane']} prawie identycznych zdjęć dołączono do istniejących grup")
+    for plik in zadanie["pliki"]:
+        if plik["stan"] == "blad":
+            st.warning(f"⚠️ {plik['nazwa']}: {plik['blad']}")
+
+def wolna_nazwa(nazwa, zajete):
+    """
+    Nazwa, pod którą zdjęcie trafi do indeksu: oryginalna, a gdy jest już zajęta
+    (w indeksie albo w tej samej partii) - pierwsza wolna z przyrostkiem _1, _2, ...
+    
+    Parametry:
+    - nazwa: nazwa przesłanego pliku
+    - zajete: nazwy nadane wcześniej w tej samej partii
+    """
+    rdzen, rozszerzenie = os.path.splitext(nazwa)
+    kandydat, numer = nazwa, 0
+    while kandydat in zajete or sprawdz_czy_zdjecie_istnieje(kandydat):
+        numer += 1
+        kandydat = f"{rdzen}_{numer}{rozszerzenie}"
+    return kandydat
+
+def pokaz_podobne_do(id_punktu, nazwa):
+    """
+    Rozpocznij wyszukiwanie "więcej takich" od wskazanego zdjęcia (wywoływane przez przycisk)
+    """
+    st.session_state.podobne_do = {"pozytywne": [id_punktu], "negatywne": [], "nazwa": nazwa}
+
+def dodaj_mniej_takich(id_punktu):
+    """
+    Dodaj zdjęcie do negatywnych przykładów bieżącego wyszukiwania "więcej takich"
+    """
+    st.session_state.podobne_do["negatywne"].append(id_punktu)
+
+def pokaz_wyniki(wyniki, prefiks, mniej_takich=False):
+    """
+    Lista wyników wyszukiwania: zdjęcie, dopasowanie, opis i przycisk "Podobne"
+    
+    Parametry:
+    - wyniki: lista WynikWyszukiwania
+    - prefiks: początek kluczy przycisków (ta sama lista zdjęć może być w kilku miejscach strony)
+    - mniej_takich: pokaż też przycisk "Mniej takich" (negatywny przykład)
+    """
+    for wynik in wyniki:
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            sciezka = wynik.sciezka
+            if sciezka and os.path.exists(sciezka):
+                try:
+                    st.image(sciezka, use_column_width=True)
+                except Exception as e:
+                    st.error(f"❌ Błąd wyświetlania: {wynik.nazwa_zdjecia or 'brak nazwy'}")
+                    print(f"[main] Błąd wyświetlania zdjęcia {sciezka}: {e}")
+            else:
+                st.warning(f"⚠️ Plik nie istnieje: {wynik.nazwa_zdjecia or 'brak nazwy'}")
+        
+        with col2:
+            procent_dopasowania = int(wynik.podobienstwo * 100)
+            
+            st.metric(label="Dopasowanie", value=f"{procent_dopasowania}%")
+            st.write(f"**Opis:**")
+            st.write(wynik.opis)
+            
+            # "Więcej takich" - zapytaniem jest zapisany wektor tego zdjęcia (bez OpenAI)
+            col_podobne, col_mniej = st.columns(2)
+            col_podobne.button(
+                "🔎 Podobne", key=f"{prefiks}_podobne_{wynik.id}",
+                on_click=pokaz_podobne_do, args=(wynik.id, wynik.nazwa_zdjecia or "zdjęcie")
+            )
+            if mniej_takich:
+                col_mniej.button(
+                    "👎 Mniej takich", key=f"{prefiks}_mniej_{wynik.id}",
+                    on_click=dodaj_mniej_takich, args=(wynik.id,)
+                )
+        
+        st.divider()
+
+def wyszukaj_w_tle(opis, klucz_api, klucz_wyszukiwania, filtry):
+    """
+    Pierwsza strona wyników wyszukiwania wykonana w tle (embedding i Qdrant jako osobne etapy)
+    
+    Czekając na etap, skrypt co chwilę odświeża komunikat postępu - zmiana zapytania
+    w tym czasie przerywa skrypt, a poprzednie zadanie jest anulowane (jego wynik odrzucony).
+    
+    Zwraca: słownik wyszukiwania zapisany w sesji albo None (przekroczony limit czasu)
+    """
+    komunikat = st.empty()
+    start = time.monotonic()
+    
+    def postep():
+        # Każde wywołanie st.* to miejsce, w którym Streamlit może przerwać nieaktualny skrypt
+        komunikat.caption(f"⏳ Szukam... {time.monotonic() - start:.1f} s")
+    
+    try:
+        with st.session_state.wyszukiwarka.nowe_zadanie() as zadanie:
+            zadanie.odczekaj(OPOZNIENIE_WYSZUKIWANIA, postep)
+            try:
+                # Embedding trafia do pamięci podręcznej - wyszukaj_strone użyje gotowego wektora
+                zadanie.etap("embedding", LIMIT_CZASU_EMBEDDINGU, embedding_zapytania, opis, klucz_api, postep=postep)
+            except (Anulowano, PrzekroczonoLimit):
+                raise
+            except Exception as e:
+                print(f"[main] Błąd embeddingu zapytania: {e}")
+            wyniki, token_strony = zadanie.etap(
+                "Qdrant", LIMIT_CZASU_QDRANT, wyszukaj_strone, opis, klucz_api=klucz_api,
+                limit_czasu=LIMIT_CZASU_QDRANT, postep=postep, **filtry
+            )
+    except Anulowano:
+        # Zapytanie zastąpione nowszym - jego wyniki nie są już potrzebne
+        komunikat.empty()
+        return None
+    except PrzekroczonoLimit as e:
+        komunikat.error(f"⌛ Wyszukiwanie trwa zbyt długo ({e}). Spróbuj ponownie za chwilę.")
+        return None
+    
+    komunikat.empty()
+    wyszukiwanie = {"klucz": klucz_wyszukiwania, "wyniki": wyniki, "token": token_strony}
+    st.session_state.wyszukiwanie = wyszukiwanie
+    return wyszukiwanie
+
 # ===== PASEK BOCZNY =====
 with st.sidebar:
     st.header("⚙️ Konfiguracja")
@@ -149,7 +397,8 @@ with st.sidebar:
     mapy_modeli = {
         "model_prosty": "Model prosty: gpt-4o-mini",
         "model_sredni": "Model średni: gpt-4o",
-        "model_zaawansowany": "Model zaawansowany: gpt-4-turbo"
+        "model_zaawansowany": "Model zaawansowany: gpt-4-turbo",
+        MODEL_KASKADA: "Kaskada: gpt-4o-mini, trudne zdjęcia gpt-4o"
     }
     
     opcje_wyswietlane = [mapy_modeli.get(m, m) for m in modele]
@@ -176,7 +425,12 @@ with st.sidebar:
     # PRZYCISK: Przetwórz zdjęcia
     if st.button("Przetwórz zdjęcia", key="btn_process", disabled=not klucz_openai_aktywny):
         if uploaded_files:
-            st.session_state.cached_files = uploaded_files
+            if st.session_state.obszar_plikow is None:
+                st.session_state.obszar_plikow = ObszarSesji()
+            # Pliki od razu na dysk - w stanie sesji zostają tylko uchwyty
+            st.session_state.cached_files = st.session_state.obszar_plikow.zapisz_wszystkie(uploaded_files)
+            # Nowy klucz uploadera - bufory przesłanych plików nie są już potrzebne
+            st.session_state.reset_uploader = not st.session_state.reset_uploader
             st.session_state.model_do_przetworzenia = model_wybrany
             st.session_state.model_id_do_przetworzenia = model_wybrany_id
             st.session_state.w_trakcie_sprawdzania = True
@@ -190,16 +444,28 @@ with st.sidebar:
     if st.session_state.w_trakcie_sprawdzania and st.session_state.cached_files:
         st.divider()
         
-        # KROK 1: Sprawdzenie duplikatów (tylko raz)
+        # KROK 1: Sprawdzenie duplikatów (tylko raz) - po podobieństwie wizualnym (dHash), nie po nazwie
         if not st.session_state.znalezione_duplikaty and len(st.session_state.decyzje_uzytkownika) == 0:
-            st.write("🔍 Sprawdzanie duplikatów w bazie Qdrant...")
+            st.write("🔍 Sprawdzanie podobnych zdjęć w bazie...")
             
-            for idx, plik in enumerate(st.session_state.cached_files):
-                czy_istnieje = sprawdz_czy_zdjecie_istnieje(plik.name)
-                
-                if czy_istnieje:
-                    st.session_state.znalezione_duplikaty.append((idx, plik.name))
-                    st.write(f"  ⚠️ Duplikat: {plik.name}")
+            # Odciski (dHash) liczone równolegle w puli procesów - procesy dostają tylko ścieżki
+            pliki = st.session_state.cached_files
+            hasze_percepcyjne = []
+            for plik, przyszle in zip(pliki, zlec_odciski([p.sciezka for p in pliki])):
+                try:
+                    hasze_percepcyjne.append(przyszle.result()["dhash"])
+                except Exception as e:
+                    print(f"[main] Nie udało się obliczyć odcisku {plik.name}: {e}")
+                    hasze_percepcyjne.append(None)
+            
+            podobne = znajdz_podobne_zdjecia(hasze_percepcyjne, [p.name for p in pliki])
+            
+            for idx, plik in enumerate(pliki):
+                if idx in podobne:
+                    # Najbardziej podobne zdjęcie (najmniejsza odległość Hamminga)
+                    _, nazwa_podobnego = podobne[idx][0]
+                    st.session_state.znalezione_duplikaty.append((idx, plik.name, nazwa_podobnego))
+                    st.write(f"  ⚠️ Duplikat: {plik.name} ≈ {nazwa_podobnego}")
                 else:
                     st.write(f"  ✅ Nowe: {plik.name}")
         
@@ -209,8 +475,8 @@ with st.sidebar:
             st.write("Co chcesz zrobić z każdym duplikatem?")
             
             # Dla każdego duplikatu pokaż opcje
-            for idx, nazwa_pliku in st.session_state.znalezione_duplikaty:
-                st.write(f"📄 **{nazwa_pliku}**")
+            for idx, nazwa_pliku, nazwa_podobnego in st.session_state.znalezione_duplikaty:
+                st.write(f"📄 **{nazwa_pliku}** - podobne do: {nazwa_podobnego}")
                 
                 col1, col2 = st.columns(2)
                 
@@ -240,71 +506,66 @@ with st.sidebar:
         
         if czy_gotowe_do_przetworzenia and st.session_state.cached_files and st.session_state.w_trakcie_sprawdzania:
                 
-                with st.spinner("⏳ Przetwarzanie zdjęć..."):
-                    # Przygotuj mapowanie nazw
-                    mapowanie_nazw = {}
-                    
-                    for idx, plik in enumerate(st.session_state.cached_files):
-                        decyzja = st.session_state.decyzje_uzytkownika.get(idx, None)
-                        
-                        # Pomiń?
-                        if decyzja == "pomiń":
-                            continue
-                        
-                        # Przetwórz jako duplikat?
-                        if decyzja == "przetwórz":
-                            nazwa_bez_rozszerzenia, rozszerzenie = plik.name.rsplit('.', 1)
-                            nowa_nazwa = f"{nazwa_bez_rozszerzenia}_1.{rozszerzenie}"
-                            mapowanie_nazw[idx] = nowa_nazwa
-                        else:
-                            # Nie duplikat - użyj oryginalnej nazwy
-                            mapowanie_nazw[idx] = plik.name
+                # Przygotuj listę (nazwa docelowa, ścieżka pliku) - bez pominiętych duplikatów
+                pliki_do_przetworzenia = []
+                nazwy_partii = set()
+                
+                for idx, plik in enumerate(st.session_state.cached_files):
+                    decyzja = st.session_state.decyzje_uzytkownika.get(idx, None)
                     
-                    # Przygotuj listę do przetworzenia
-                    pliki_do_przetworzenia = []
-                    nowe_mapowanie = {}
+                    # Pomiń?
+                    if decyzja == "pomiń":
+                        continue
                     
-                    for idx, plik in enumerate(st.session_state.cached_files):
-                        if idx in mapowanie_nazw:
-                            pliki_do_przetworzenia.append(plik)
-                            nowe_mapowanie[len(pliki_do_przetworzenia) - 1] = mapowanie_nazw[idx]
+                    # Każda zajęta nazwa dostaje przyrostek - także inne zdjęcie o tej samej nazwie
+                    # (np. IMG_0001.jpg z innego aparatu), które nie zostało uznane za duplikat
+                    nazwa_docelowa = wolna_nazwa(plik.name, nazwy_partii)
+                    nazwy_partii.add(nazwa_docelowa)
                     
-                    if pliki_do_przetworzenia:
-                        # Przetwórz
-                        opisy = przetworz_zdjecia(
-                            pliki_do_przetworzenia,
-                            st.session_state.model_do_przetworzenia,
-                            klucz_openai,
-                            nowe_mapowanie
-                        )
-                        
-                        # Wylicz koszt
-                        wynik = oszacuj_koszt(len(pliki_do_przetworzenia), st.session_state.model_id_do_przetworzenia)
-                        
-                        # Pokaż wyniki
-                        st.divider()
-                        st.info(wynik["uwaga"])
-                        st.write(f"💰 Koszt: {wynik['koszt_calkowity_pln']} PLN")
-                        st.write(f"  • Tekst: {wynik['szczegoly']['koszt_generacji_tokeny_pln']} PLN")
-                        st.write(f"  • Embeddingi: {wynik['szczegoly']['koszt_embedding_pln']} PLN")
-                        
-                        # Zapisz embeddingi
-                        for item in opisy:
-                            zapisz_embedding(item["opis"], item["sciezka"], klucz_openai)
-                        
-                        st.success("✅ Zdjęcia przetworzone i zapisane!")
-                        
-                        # Ustaw flagę dla animowanego komunikatu
-                        st.session_state.przetwarzanie_zakonczone = True
-                    else:
-                        st.warning("Wszystkie zdjęcia pominięte.")
-                    
-                    # Resetuj stany
-                    st.session_state.w_trakcie_sprawdzania = False
-                    st.session_state.cached_files = None
-                    st.session_state.znalezione_duplikaty = []
-                    st.session_state.decyzje_uzytkownika = {}
-                    st.session_state.reset_uploader = not st.session_state.reset_uploader
+                    # Plik zostanie przeniesiony z folderu sesji do folderu zadania (bez wczytywania)
+                    pliki_do_przetworzenia.append((nazwa_docelowa, plik.sciezka))
+                
+                if pliki_do_przetworzenia:
+                    # Dodaj zadanie do kolejki - przetwarza je pracownik w osobnym procesie,
+                    # więc interfejs nie jest blokowany na czas zapytań do Vision API
+                    id_zadania = dodaj_zadanie(
+                        pliki_do_przetworzenia,
+                        st.session_state.model_do_przetworzenia,
+                        st.session_state.model_id_do_przetworzenia,
+                        # Klucz z .env pracownik ma sam - przekazujemy tylko klucz wpisany ręcznie
+                        None if st.session_state.get("klucz_z_env") else klucz_openai,
+                        # Profil zadania (przełącznik administratora): 2 = także pamięć
+                        profiluj=(1 + st.session_state.get("profiluj_pamiec", False))
+                        if st.session_state.get("profiluj_zadania") else 0
+                    )
+                    uruchom_pracownika_w_tle()
+                    st.session_state.zadania_w_toku.append(id_zadania)
+                else:
+                    st.warning("Wszystkie zdjęcia pominięte.")
+                
+                # Resetuj stany (pominięte duplikaty usuwamy z folderu sesji)
+                st.session_state.obszar_plikow.wyczysc()
+                st.session_state.w_trakcie_sprawdzania = False
+                st.session_state.cached_files = None
+                st.session_state.znalezione_duplikaty = []
+                st.session_state.decyzje_uzytkownika = {}
+    
+    # ===== POSTĘP ZADAŃ W KOLEJCE =====
+    for zadanie in st.session_state.zakonczone_zadania:
+        pokaz_wynik_zadania(zadanie)
+    st.session_state.zakonczone_zadania = []
+    
+    if st.session_state.zadania_w_toku:
+        pokaz_postep_zadan()
+    
+    # ===== PROFILOWANIE (tylko administrator) =====
+    if st.session_state.get("admin_profilowania"):
+        st.divider()
+        st.subheader("🩺 Profilowanie")
+        st.toggle("Profiluj wykonania strony", key="profiluj_wykonania")
+        st.toggle("Profiluj zadania przetwarzania", key="profiluj_zadania")
+        st.toggle("Także pamięć (tracemalloc)", key="profiluj_pamiec")
+        st.caption(f"Profile: {os.path.abspath(profilowanie.FOLDER_PROFILI)}")
 
 # ===== GŁÓWNY WIDOK APLIKACJI =====
 st.title("🖼️ Znajdywacz zdjęć na podstawie opisu")
@@ -353,8 +614,44 @@ if st.session_state.get("przetwarzanie_zakonczone", False):
 
 st.divider()
 
+# ===== WIĘCEJ TAKICH =====
+# Zdjęcia podobne do wybranego - zapytaniem są wektory zapisane w Qdrant, więc
+# wyszukiwanie nie wymaga klucza OpenAI ani zapytania o embedding.
+# Sekcja jest nad zakładkami, bo przycisk "Podobne" jest w kilku zakładkach.
+if st.session_state.get("podobne_do"):
+    podobne_do = st.session_state.podobne_do
+    st.subheader(f"🔎 Podobne do: {podobne_do['nazwa']}")
+    if podobne_do["negatywne"]:
+        st.caption(f"Pominięto zdjęcia podobne do {len(podobne_do['negatywne'])} oznaczonych „Mniej takich”")
+    
+    # Wyniki trzymane w sesji jak przy wyszukiwaniu tekstowym ("Pokaż więcej" pobiera kolejną stronę)
+    klucz_podobnych = (tuple(podobne_do["pozytywne"]), tuple(podobne_do["negatywne"]), sygnatura_zmian())
+    podobne = st.session_state.get("podobne")
+    if podobne is None or podobne["klucz"] != klucz_podobnych:
+        wyniki, token_strony = wyszukaj_podobne_strone(podobne_do["pozytywne"], negatywne=podobne_do["negatywne"])
+        podobne = {"klucz": klucz_podobnych, "wyniki": wyniki, "token": token_strony}
+        st.session_state.podobne = podobne
+    
+    if podobne["wyniki"]:
+        pokaz_wyniki(podobne["wyniki"], "podobne", mniej_takich=True)
+        if podobne["token"] and st.button("⬇️ Pokaż więcej", key="pokaz_wiecej_podobnych"):
+            kolejne, token_strony = wyszukaj_podobne_strone(
+                podobne_do["pozytywne"], podobne["token"], negatywne=podobne_do["negatywne"]
+            )
+            podobne["wyniki"] = podobne["wyniki"] + kolejne
+            podobne["token"] = token_strony
+            st.rerun()
+    else:
+        st.info("Brak podobnych zdjęć.")
+    
+    if st.button("✖️ Zamknij podobne", key="zamknij_podobne"):
+        st.session_state.podobne_do = None
+        st.session_state.podobne = None
+        st.rerun()
+    st.divider()
+
 # --- ZAKŁADKI ---
-tab1, tab2 = st.tabs(["Wyszukiwanie", "Zarządzanie zdjęciami"])
+tab1, tab2, tab3 = st.tabs(["Wyszukiwanie", "Zarządzanie zdjęciami", "Przeglądaj tagi"])
 
 # ZAKŁADKA 1: WYSZUKIWANIE
 with tab1:
@@ -365,41 +662,54 @@ with tab1:
         key="search_input"
     )
     
+    # Filtry metadanych EXIF (przekazywane do Qdrant razem z zapytaniem)
+    filtry_wyszukiwania = {}
+    with st.expander("🗂️ Filtry (data, aparat)"):
+        if st.checkbox("Filtruj po dacie wykonania", key="filtr_data"):
+            col_od, col_do = st.columns(2)
+            data_od = col_od.date_input("Od:", key="filtr_data_od")
+            data_do = col_do.date_input("Do:", key="filtr_data_do")
+            filtry_wyszukiwania["data_od"] = f"{data_od.isoformat()}T00:00:00"
+            filtry_wyszukiwania["data_do"] = f"{data_do.isoformat()}T23:59:59"
+        
+        aparat = st.text_input("Aparat (np. iPhone, Canon):", key="filtr_aparat")
+        if aparat.strip():
+            filtry_wyszukiwania["aparat"] = aparat.strip()
+    
+    # Zróżnicowanie wyników (MMR) - mniej zdjęć seryjnych tej samej sceny
+    filtry_wyszukiwania["roznorodnosc_wynikow"] = st.slider(
+        "Różnorodność wyników:", min_value=0.0, max_value=1.0,
+        value=ROZNORODNOSC_WYNIKOW, step=0.1, key="roznorodnosc_wynikow",
+        help="0 = kolejność według dopasowania, wyższe wartości pomijają zdjęcia bardzo podobne do już pokazanych"
+    )
+    
     # Sprawdź czy użytkownik wprowadził klucz OpenAI
     if klucz_openai_aktywny:
         if opis_wyszukiwania:
             st.subheader("📋 Wyniki wyszukiwania")
             
-            wyniki = wyszukaj_zdjecia(opis_wyszukiwania, klucz_api=klucz_openai)
+            # Wyniki tego samego zapytania są trzymane w sesji - "Pokaż więcej" pobiera tylko kolejną stronę
+            # (sygnatura magazynu unieważnia je po dodaniu lub usunięciu zdjęć)
+            klucz_wyszukiwania = (opis_wyszukiwania, tuple(sorted(filtry_wyszukiwania.items())), sygnatura_zmian())
+            wyszukiwanie = st.session_state.get("wyszukiwanie")
+            if wyszukiwanie is None or wyszukiwanie["klucz"] != klucz_wyszukiwania:
+                wyszukiwanie = wyszukaj_w_tle(opis_wyszukiwania, klucz_openai, klucz_wyszukiwania, filtry_wyszukiwania)
+            wyniki = wyszukiwanie["wyniki"] if wyszukiwanie else []
             
             if wyniki:
                 st.write(f"**Znalezione {len(wyniki)} zdjęcie(a):**")
+                pokaz_wyniki(wyniki, "wyniki")
                 
-                for idx, wynik in enumerate(wyniki):
-                    col1, col2 = st.columns([1, 2])
-                    
-                    with col1:
-                        sciezka = wynik.get("sciezka")
-                        if sciezka and os.path.exists(sciezka):
-                            try:
-                                st.image(sciezka, use_column_width=True)
-                            except Exception as e:
-                                st.error(f"❌ Błąd wyświetlania: {wynik.get('nazwa_zdjecia', 'brak nazwy')}")
-                                print(f"[main] Błąd wyświetlania zdjęcia {sciezka}: {e}")
-                        else:
-                            st.warning(f"⚠️ Plik nie istnieje: {wynik.get('nazwa_zdjecia', 'brak nazwy')}")
-                    
-                    with col2:
-                        opis = wynik.get("opis")
-                        dopasowanie = wynik.get("similarity", 0)
-                        procent_dopasowania = int(dopasowanie * 100)
-                        
-                        st.metric(label="Dopasowanie", value=f"{procent_dopasowania}%")
-                        st.write(f"**Opis:**")
-                        st.write(opis)
-                    
-                    st.divider()
-            else:
+                # Kolejna strona wyników (offset przekazywany do Qdrant w tokenie strony)
+                if wyszukiwanie["token"] and st.button("⬇️ Pokaż więcej", key="pokaz_wiecej"):
+                    kolejne, token_strony = wyszukaj_strone(
+                        opis_wyszukiwania, wyszukiwanie["token"], klucz_api=klucz_openai,
+                        limit_czasu=LIMIT_CZASU_QDRANT, **filtry_wyszukiwania
+                    )
+                    wyszukiwanie["wyniki"] = wyniki + kolejne
+                    wyszukiwanie["token"] = token_strony
+                    st.rerun()
+            elif wyszukiwanie:
                 st.info("Nie znaleziono zdjęć pasujących do opisu.")
         else:
             st.info("💡 Wpisz opis szukanych zdjęć, aby zobaczyć wyniki.")
@@ -448,8 +758,11 @@ with tab2:
                 col_thumb, col_check = st.columns([0.5, 3])
                 
                 with col_thumb:
-                    # Wyświetl miniaturkę zdjęcia
-                    if sciezka and os.path.exists(sciezka):
+                    # Wyświetl miniaturkę zdjęcia (gotowa miniatura jeśli istnieje, inaczej pełne zdjęcie)
+                    sciezka_miniatury = pobierz_sciezke_miniatury(sciezka) if sciezka else ""
+                    if sciezka_miniatury and os.path.exists(sciezka_miniatury):
+                        st.image(sciezka_miniatury, width=50)
+                    elif sciezka and os.path.exists(sciezka):
                         try:
                             st.image(sciezka, width=50)
                         except Exception as e:
@@ -459,17 +772,24 @@ with tab2:
                         st.write("📷")
                 
                 with col_check:
-                    is_selected = st.checkbox(nazwa, key=f"select_{nazwa}")
+                    col_nazwa, col_podobne = st.columns([4, 1])
+                    with col_nazwa:
+                        # Klucz i zaznaczenie po ID punktu - zdjęcia o tej samej nazwie to osobne wpisy
+                        is_selected = st.checkbox(nazwa, key=f"select_{zdj['id']}")
+                    if zdj.get("id") is not None:
+                        col_podobne.button(
+                            "🔎", key=f"katalog_podobne_{zdj['id']}", help="Pokaż podobne zdjęcia",
+                            on_click=pokaz_podobne_do, args=(zdj["id"], nazwa)
+                        )
                     
                     if is_selected:
-                        st.session_state.selected_images.add(nazwa)
+                        st.session_state.selected_images.add(zdj["id"])
                     else:
-                        st.session_state.selected_images.discard(nazwa)
+                        st.session_state.selected_images.discard(zdj["id"])
             
             if st.session_state.selected_images:
                 if st.button(f"🗑️ Usuń zaznaczone ({len(st.session_state.selected_images)})"):
-                    for nazwa in st.session_state.selected_images:
-                        usun_embedding(nazwa)
+                    usun_punkty(st.session_state.selected_images)
                     
                     st.success(f"Usunięto {len(st.session_state.selected_images)} zdjęcie(a).")
                     st.session_state.selected_images = set()
@@ -477,4 +797,63 @@ with tab2:
         else:
             st.info("Brak zapisanych zdjęć.")
     else:
-        st.warning("⚠️ Proszę wprowadzić klucz OpenAI na pasku bocznym.")
\ No newline at end of file
+        st.warning("⚠️ Proszę wprowadzić klucz OpenAI na pasku bocznym.")
+
+# ZAKŁADKA 3: PRZEGLĄDANIE PO TAGACH
+# Liczniki i lista zdjęć pochodzą z lokalnego indeksu tagów - bez zapytań do OpenAI
+with tab3:
+    st.subheader("🏷️ Przeglądaj po tagach")
+    
+    NAZWY_POL_TAGOW = {"obiekty": "Obiekty", "scena": "Scena", "kolory": "Kolory", "liczba_osob": "Liczba osób"}
+    
+    # Wybrane tagi z poprzedniego wykonania skryptu - liczniki pokazują ile zdjęć zostanie po dodaniu tagu
+    wybrane_tagi = {
+        pole: st.session_state.get(f"tagi_{pole}", []) for pole in POLA_TAGOW
+        if st.session_state.get(f"tagi_{pole}")
+    }
+    liczniki_tagow = policz_tagi(wybrane_tagi)
+    
+    if not liczniki_tagow and not wybrane_tagi:
+        st.info("Brak tagów - zdjęcia dodane od tej wersji dostają tagi z opisu Vision API.")
+    else:
+        kolumny_tagow = st.columns(len(POLA_TAGOW))
+        for kolumna, pole in zip(kolumny_tagow, POLA_TAGOW):
+            liczby = dict(liczniki_tagow.get(pole, []))
+            # Wybrane wartości zostają na liście nawet gdy licznik spadł do zera
+            opcje = list(liczby) + [w for w in wybrane_tagi.get(pole, []) if w not in liczby]
+            kolumna.multiselect(
+                NAZWY_POL_TAGOW.get(pole, pole), opcje, key=f"tagi_{pole}",
+                format_func=lambda wartosc, liczby=liczby: f"{wartosc} ({liczby.get(wartosc, 0)})"
+            )
+        
+        if wybrane_tagi:
+            zdjecia_z_tagami = przegladaj_po_tagach(wybrane_tagi, limit=100)
+            st.write(f"**Zdjęcia z wybranymi tagami: {len(zdjecia_z_tagami)}**"
+                     + (" (pierwsze 100)" if len(zdjecia_z_tagami) == 100 else ""))
+            
+            kolumny_zdjec = st.columns(4)
+            for idx, zdj in enumerate(zdjecia_z_tagami):
+                with kolumny_zdjec[idx % 4]:
+                    sciezka = zdj.get("sciezka") or ""
+                    sciezka_miniatury = pobierz_sciezke_miniatury(sciezka) if sciezka else ""
+                    if sciezka_miniatury and os.path.exists(sciezka_miniatury):
+                        st.image(sciezka_miniatury, caption=zdj["nazwa"])
+                    elif sciezka and os.path.exists(sciezka):
+                        st.image(sciezka, caption=zdj["nazwa"])
+                    else:
+                        st.write(f"📷 {zdj['nazwa']}")
+                    st.button(
+                        "🔎 Podobne", key=f"tagi_podobne_{zdj['id']}",
+                        on_click=pokaz_podobne_do, args=(zdj["id"], zdj["nazwa"])
+                    )
+        else:
+            st.info("💡 Wybierz tagi, aby zobaczyć pasujące zdjęcia.")
+
+# ===== PROFILOWANIE - KONIEC WYKONANIA =====
+if st.session_state.get("profil_wykonania") is not None:
+    sciezka_profilu = st.session_state.profil_wykonania.zakoncz()
+    st.session_state.profil_wykonania = None
+    if st.session_state.get("admin_profilowania"):
+        with st.sidebar.expander("🩺 Profil tego wykonania"):
+            with open(sciezka_profilu, encoding="utf-8") as f:
+                st.code(f.read(), language=None)
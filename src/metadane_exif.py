@@ -0,0 +1,133 @@
+# Zawartość pliku: src/metadane_exif.py
+#
+# Odczyt metadanych EXIF ze zdjęcia (data wykonania, aparat, orientacja, GPS).
+# Wynik trafia do payloadu w Qdrant jako typowane pola z indeksami,
+# dzięki czemu wyszukiwanie może filtrować np. po dacie bez przeglądania wyników w Pythonie.
+
+import math  # sprawdzenie współrzędnych GPS (NaN, nieskończoność)
+from datetime import datetime  # parsowanie daty z EXIF
+
+# ===== NUMERY TAGÓW EXIF =====
+TAG_PRODUCENT = 0x010F  # Make - producent aparatu (np. "Apple")
+TAG_MODEL = 0x0110  # Model - model aparatu (np. "iPhone 13")
+TAG_ORIENTACJA = 0x0112  # Orientation - jak obrócić zdjęcie (1-8)
+TAG_DATA = 0x0132  # DateTime - data modyfikacji pliku (zapasowa)
+TAG_IFD_EXIF = 0x8769  # wskaźnik na podkatalog Exif
+TAG_IFD_GPS = 0x8825  # wskaźnik na podkatalog GPS
+TAG_DATA_WYKONANIA = 0x9003  # DateTimeOriginal - kiedy zrobiono zdjęcie
+
+# Tagi w podkatalogu GPS
+TAG_GPS_SZEROKOSC_REF = 1  # "N" lub "S"
+TAG_GPS_SZEROKOSC = 2  # (stopnie, minuty, sekundy)
+TAG_GPS_DLUGOSC_REF = 3  # "E" lub "W"
+TAG_GPS_DLUGOSC = 4  # (stopnie, minuty, sekundy)
+
+# Format daty w EXIF (np. "2023:07:14 12:30:00")
+FORMAT_DATY_EXIF = "%Y:%m:%d %H:%M:%S"
+
+def _tekst(wartosc):
+    """
+    Zamień wartość tagu na oczyszczony tekst (EXIF często ma spacje i znaki \\x00 na końcu)
+    """
+    if wartosc is None:
+        return None
+    if isinstance(wartosc, bytes):
+        wartosc = wartosc.decode("utf-8", errors="ignore")
+    tekst = str(wartosc).strip().strip("\x00").strip()
+    return tekst or None
+
+def _data_iso(wartosc):
+    """
+    Zamień datę EXIF ("2023:07:14 12:30:00") na format ISO 8601 ("2023-07-14T12:30:00")
+    Zwraca None gdy data jest pusta lub niepoprawna (np. "0000:00:00 00:00:00")
+    """
+    tekst = _tekst(wartosc)
+    if not tekst:
+        return None
+    try:
+        return datetime.strptime(tekst[:19], FORMAT_DATY_EXIF).isoformat()
+    except ValueError:
+        return None
+
+def _stopnie_dziesietne(wspolrzedna, kierunek, zakres):
+    """
+    Zamień współrzędną GPS (stopnie, minuty, sekundy) na stopnie dziesiętne
+    Kierunek "S" lub "W" daje wartość ujemną
+
+    Zwraca None gdy wynik nie jest poprawną współrzędną: NaN (ułamek EXIF z mianownikiem 0),
+    nieskończoność albo |wynik| > zakres (90 dla szerokości, 180 dla długości) -
+    pole geo w Qdrant odrzuciłoby taki punkt
+    """
+    stopnie, minuty, sekundy = (float(x) for x in wspolrzedna)
+    wynik = stopnie + minuty / 60.0 + sekundy / 3600.0
+    if not math.isfinite(wynik) or abs(wynik) > zakres:
+        return None
+    if _tekst(kierunek) in ("S", "W"):
+        wynik = -wynik
+    return round(wynik, 7)
+
+def odczytaj_exif(obraz):
+    """
+    Odczytaj metadane EXIF z otwartego obrazu Pillow
+
+    Parametr:
+    - obraz: obiekt PIL.Image (przed exif_transpose - wtedy EXIF jest jeszcze kompletny)
+
+    Zwraca: słownik z polami, które udało się odczytać (brakujące pola są pomijane):
+    - "data_wykonania": data w formacie ISO 8601 (np. "2023-07-14T12:30:00")
+    - "rok": rok wykonania zdjęcia (int)
+    - "aparat": producent i model aparatu (np. "Apple iPhone 13")
+    - "orientacja": orientacja EXIF (1-8)
+    - "lokalizacja": słownik {"lat": ..., "lon": ...} (format pola geo w Qdrant)
+    """
+    metadane = {}
+
+    try:
+        exif = obraz.getexif()
+    except Exception as e:
+        # Uszkodzony EXIF nie może zatrzymać przetwarzania zdjęcia
+        print(f"[metadane_exif] Nie udało się odczytać EXIF: {e}")
+        return metadane
+
+    if not exif:
+        return metadane
+
+    # Data wykonania - najpierw DateTimeOriginal (podkatalog Exif), potem DateTime
+    try:
+        data = _data_iso(exif.get_ifd(TAG_IFD_EXIF).get(TAG_DATA_WYKONANIA)) or _data_iso(exif.get(TAG_DATA))
+        if data:
+            metadane["data_wykonania"] = data
+            metadane["rok"] = int(data[:4])
+    except Exception as e:
+        # Uszkodzony podkatalog Exif - pomiń tylko datę
+        print(f"[metadane_exif] Niepoprawna data wykonania: {e}")
+
+    # Aparat - producent + model (model często już zawiera producenta, np. "Canon EOS 80D")
+    producent = _tekst(exif.get(TAG_PRODUCENT))
+    model = _tekst(exif.get(TAG_MODEL))
+    if producent and model and model.lower().startswith(producent.lower()):
+        producent = None
+    aparat = " ".join(czesc for czesc in (producent, model) if czesc)
+    if aparat:
+        metadane["aparat"] = aparat
+
+    # Orientacja (1 = normalna, 6 = obrót o 90 stopni, ...)
+    orientacja = exif.get(TAG_ORIENTACJA)
+    if isinstance(orientacja, int):
+        metadane["orientacja"] = orientacja
+
+    # Współrzędne GPS
+    try:
+        gps = exif.get_ifd(TAG_IFD_GPS)
+        if TAG_GPS_SZEROKOSC in gps and TAG_GPS_DLUGOSC in gps:
+            szerokosc = _stopnie_dziesietne(gps[TAG_GPS_SZEROKOSC], gps.get(TAG_GPS_SZEROKOSC_REF), 90)
+            dlugosc = _stopnie_dziesietne(gps[TAG_GPS_DLUGOSC], gps.get(TAG_GPS_DLUGOSC_REF), 180)
+            if szerokosc is not None and dlugosc is not None:
+                metadane["lokalizacja"] = {"lat": szerokosc, "lon": dlugosc}
+            else:
+                print("[metadane_exif] Współrzędne GPS poza zakresem - pomijam lokalizację")
+    except Exception as e:
+        # Niepełne lub uszkodzone dane GPS - pomiń tylko lokalizację
+        print(f"[metadane_exif] Niepoprawne dane GPS: {e}")
+
+    return metadane
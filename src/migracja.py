@@ -0,0 +1,228 @@
+# Zawartość pliku: src/migracja.py
+#
+# Migracja indeksu do nowej wersji kolekcji bez przerwy w działaniu aplikacji.
+# Nowa kolekcja (np. "opisy_zdjec_v2") jest budowana w tle z zapisanych opisów
+# (bez ponownych zapytań do Vision API), a na końcu alias "opisy_zdjec" jest
+# atomowo przełączany na nową kolekcję. Wyszukiwania cały czas korzystają z aliasu.
+#
+# Użycie:
+#   python src/migracja.py --wersja 2 --model text-embedding-3-large --rozmiar 3072
+#
+# Przerwaną migrację wystarczy uruchomić ponownie z tymi samymi argumentami -
+# postęp jest zapisywany w pliku stanu po każdej partii.
+
+import os  # ścieżki i zmienne środowiskowe
+import json  # zapis stanu migracji
+import time  # przerwy między partiami (dławienie)
+import argparse  # argumenty wiersza poleceń
+
+import baza_danych  # klient Qdrant, alias i tworzenie kolekcji
+
+# Domyślna liczba opisów w jednej partii (jedno zapytanie o embeddingi + jeden upsert)
+ROZMIAR_PARTII = 64
+
+# Domyślna przerwa między partiami w sekundach - żeby migracja nie zagłodziła bieżącego ruchu
+PRZERWA_MIEDZY_PARTIAMI = 0.5
+
+# Folder na pliki stanu migracji
+FOLDER_STANU = "migracje"
+
+def _sciezka_stanu(kolekcja_docelowa):
+    """
+    Zwróć ścieżkę pliku stanu dla danej kolekcji docelowej
+    """
+    return os.path.join(FOLDER_STANU, f"{kolekcja_docelowa}.json")
+
+def wczytaj_stan(kolekcja_docelowa):
+    """
+    Wczytaj stan migracji (lub stan początkowy jeśli migracja jeszcze nie ruszyła)
+    """
+    sciezka = _sciezka_stanu(kolekcja_docelowa)
+    if os.path.exists(sciezka):
+        with open(sciezka, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"offset": None, "przeniesione": 0, "etap": "kopiowanie"}
+
+def zapisz_stan(kolekcja_docelowa, stan):
+    """
+    Zapisz stan migracji atomowo (plik tymczasowy + podmiana)
+    """
+    os.makedirs(FOLDER_STANU, exist_ok=True)
+    sciezka = _sciezka_stanu(kolekcja_docelowa)
+    with open(sciezka + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(stan, f)
+    os.replace(sciezka + ".tmp", sciezka)
+
+def _przenies_partie(punkty, kolekcja_docelowa, dostawca):
+    """
+    Wygeneruj nowe embeddingi z zapisanych opisów i wstaw punkty do nowej kolekcji
+    Identyfikatory i payload punktów pozostają bez zmian
+    
+    dostawca - dostawca embeddingów nowej kolekcji (embedding.DostawcaEmbeddingow)
+    """
+    # Punkty bez opisu nie mają z czego wygenerować wektora - pomijamy je
+    punkty = [p for p in punkty if (p.payload or {}).get("opis")]
+    if not punkty:
+        return 0
+
+    # Macierz float32 przekazywana bez zamiany na listy Pythona
+    wektory = dostawca.osadz([p.payload["opis"] for p in punkty])
+    baza_danych.pobierz_klienta_qdrant().upload_collection(
+        collection_name=kolekcja_docelowa, vectors=wektory,
+        payload=[p.payload for p in punkty], ids=[p.id for p in punkty], wait=True
+    )
+    return len(punkty)
+
+def _uzgodnij(kolekcja_zrodlowa, kolekcja_docelowa, dostawca, rozmiar_partii):
+    """
+    Końcowe uzgodnienie kolekcji - dogoń zmiany wykonane w trakcie migracji
+    - punkty dodane do starej kolekcji w trakcie kopiowania są przenoszone
+    - punkty usunięte ze starej kolekcji są usuwane z nowej
+    """
+    klient = baza_danych.pobierz_klienta_qdrant()
+
+    # Zbiór ID w starej kolekcji (bez wektorów - tylko identyfikatory i opisy)
+    id_zrodla = set()
+    offset = None
+    while True:
+        punkty, offset = klient.scroll(
+            collection_name=kolekcja_zrodlowa, limit=rozmiar_partii, offset=offset,
+            with_payload=True, with_vectors=False
+        )
+        id_zrodla.update(p.id for p in punkty)
+
+        # Sprawdź które z tych punktów brakuje w nowej kolekcji
+        istniejace = {p.id for p in klient.retrieve(
+            collection_name=kolekcja_docelowa, ids=[p.id for p in punkty],
+            with_payload=False, with_vectors=False
+        )}
+        brakujace = [p for p in punkty if p.id not in istniejace]
+        if brakujace:
+            _przenies_partie(brakujace, kolekcja_docelowa, dostawca)
+            print(f"[migracja] Dogoniono {len(brakujace)} nowych punktów")
+
+        if offset is None:
+            break
+
+    # Usuń z nowej kolekcji punkty, których w starej już nie ma
+    do_usuniecia = []
+    offset = None
+    while True:
+        punkty, offset = klient.scroll(
+            collection_name=kolekcja_docelowa, limit=rozmiar_partii, offset=offset,
+            with_payload=False, with_vectors=False
+        )
+        do_usuniecia.extend(p.id for p in punkty if p.id not in id_zrodla)
+        if offset is None:
+            break
+
+    if do_usuniecia:
+        klient.delete(collection_name=kolekcja_docelowa, points_selector=do_usuniecia)
+        print(f"[migracja] Usunięto {len(do_usuniecia)} punktów usuniętych w trakcie migracji")
+
+def migruj(wersja, model=None, rozmiar_wektora=None, miara=None, klucz_api=None,
+           rozmiar_partii=ROZMIAR_PARTII, przerwa=PRZERWA_MIEDZY_PARTIAMI, usun_stara=False, dostawca=None):
+    """
+    Zbuduj nową wersję kolekcji i przełącz na nią alias
+
+    Parametry:
+    - wersja: numer nowej wersji (kolekcja "opisy_zdjec_v{wersja}")
+    - model: model embeddingów dla nowej kolekcji (domyślnie MODEL_EMBEDDINGU)
+    - rozmiar_wektora: długość wektora nowego modelu (domyślnie rozmiar podany przez dostawcę embeddingów)
+    - miara: miara odległości (domyślnie MIARA_ODLEGLOSCI)
+    - klucz_api: klucz OpenAI (domyślnie z OPENAI_API_KEY)
+    - rozmiar_partii: ile opisów na jedno zapytanie o embeddingi
+    - przerwa: przerwa między partiami w sekundach (dławienie)
+    - usun_stara: czy usunąć starą kolekcję po przełączeniu aliasu
+    - dostawca: dostawca embeddingów nowej kolekcji ("openai", "lokalny"; domyślnie DOSTAWCA_EMBEDDINGOW)
+    """
+    klient = baza_danych.pobierz_klienta_qdrant()
+    kolekcja_zrodlowa = baza_danych.rozwiaz_alias()
+    kolekcja_docelowa = baza_danych.nazwa_wersji_kolekcji(wersja)
+
+    if kolekcja_zrodlowa == kolekcja_docelowa:
+        raise ValueError(f"Alias '{baza_danych.NAZWA_KOLEKCJI}' już wskazuje na '{kolekcja_docelowa}'.")
+
+    print(f"[migracja] '{kolekcja_zrodlowa}' -> '{kolekcja_docelowa}'")
+    stan = wczytaj_stan(kolekcja_docelowa)
+
+    # Dostawca embeddingów nowej kolekcji - podaje też rozmiar wektora
+    dostawca_embeddingow = baza_danych.pobierz_dostawce_embeddingow(klucz_api, model, dostawca, rozmiar_wektora)
+    
+    # Utwórz nową kolekcję (przy wznowieniu już istnieje)
+    if not klient.collection_exists(kolekcja_docelowa):
+        baza_danych.utworz_kolekcje(kolekcja_docelowa, dostawca_embeddingow.rozmiar, miara)
+
+    # ETAP 1: kopiowanie partiami (stronicowanie przez scroll od zapisanego offsetu)
+    while stan["etap"] == "kopiowanie":
+        punkty, nastepny_offset = klient.scroll(
+            collection_name=kolekcja_zrodlowa,
+            limit=rozmiar_partii,
+            offset=stan["offset"],
+            with_payload=True,
+            with_vectors=False  # stare wektory nie są potrzebne - liczymy nowe z opisów
+        )
+
+        stan["przeniesione"] += _przenies_partie(punkty, kolekcja_docelowa, dostawca_embeddingow)
+        stan["offset"] = nastepny_offset
+        if nastepny_offset is None:
+            stan["etap"] = "uzgadnianie"
+        zapisz_stan(kolekcja_docelowa, stan)
+        print(f"[migracja] Przeniesiono {stan['przeniesione']} punktów")
+
+        # Dławienie - daj miejsce bieżącemu ruchowi (wyszukiwania, zapisy)
+        if przerwa:
+            time.sleep(przerwa)
+
+    # ETAP 2: dogonienie zmian z czasu kopiowania
+    if stan["etap"] == "uzgadnianie":
+        _uzgodnij(kolekcja_zrodlowa, kolekcja_docelowa, dostawca_embeddingow, rozmiar_partii)
+        stan["etap"] = "przelaczanie"
+        zapisz_stan(kolekcja_docelowa, stan)
+
+    # ETAP 3: przełączenie aliasu
+    if kolekcja_zrodlowa == baza_danych.NAZWA_KOLEKCJI:
+        # Stara kolekcja bez aliasu ma tę samą nazwę co alias - alias można utworzyć
+        # dopiero po jej usunięciu (krótka chwila bez kolekcji jest nieunikniona)
+        print(f"[migracja] ⚠️ Kolekcja '{kolekcja_zrodlowa}' nie ma aliasu - usuwam ją przed utworzeniem aliasu")
+        klient.delete_collection(kolekcja_zrodlowa)
+        baza_danych.przelacz_alias(kolekcja_docelowa)
+    else:
+        baza_danych.przelacz_alias(kolekcja_docelowa)
+        if usun_stara:
+            klient.delete_collection(kolekcja_zrodlowa)
+            print(f"[migracja] Usunięto starą kolekcję '{kolekcja_zrodlowa}'")
+
+    stan["etap"] = "zakonczona"
+    zapisz_stan(kolekcja_docelowa, stan)
+    print(f"[migracja] ✅ Migracja zakończona ({stan['przeniesione']} punktów)")
+    if dostawca:
+        print(f"[migracja] Pamiętaj: ustaw DOSTAWCA_EMBEDDINGOW={dostawca} w .env")
+    if model:
+        print(f"[migracja] Pamiętaj: ustaw MODEL_EMBEDDINGU={model} w .env - zapytania muszą używać tego samego modelu")
+    if rozmiar_wektora:
+        print(f"[migracja] Pamiętaj: ustaw ROZMIAR_WEKTORA={rozmiar_wektora} w .env")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migracja indeksu zdjęć do nowej wersji kolekcji")
+    parser.add_argument("--wersja", type=int, required=True, help="numer nowej wersji kolekcji")
+    parser.add_argument("--dostawca", choices=["openai", "lokalny"], help="dostawca embeddingów (domyślnie DOSTAWCA_EMBEDDINGOW)")
+    parser.add_argument("--model", help="model embeddingów (domyślnie MODEL_EMBEDDINGU)")
+    parser.add_argument("--rozmiar", type=int, help="rozmiar wektora nowego modelu")
+    parser.add_argument("--miara", choices=["Cosine", "Dot", "Euclid"],
+                        help=f"miara odległości (domyślnie {baza_danych.MIARA_ODLEGLOSCI})")
+    parser.add_argument("--partia", type=int, default=ROZMIAR_PARTII, help="liczba opisów w partii")
+    parser.add_argument("--przerwa", type=float, default=PRZERWA_MIEDZY_PARTIAMI, help="przerwa między partiami [s]")
+    parser.add_argument("--usun-stara", action="store_true", help="usuń starą kolekcję po przełączeniu")
+    argumenty = parser.parse_args()
+
+    migruj(
+        argumenty.wersja,
+        model=argumenty.model,
+        rozmiar_wektora=argumenty.rozmiar,
+        miara=argumenty.miara,
+        rozmiar_partii=argumenty.partia,
+        przerwa=argumenty.przerwa,
+        usun_stara=argumenty.usun_stara,
+        dostawca=argumenty.dostawca
+    )
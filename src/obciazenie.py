@@ -0,0 +1,285 @@
+# Zawartość pliku: src/obciazenie.py
+#
+# Test obciążenia interfejsu: N równoczesnych sesji Streamlit (AppTest) wykonuje
+# losowe akcje użytkownika - wyszukiwanie, "pokaż więcej", przeglądanie katalogu
+# i przesyłanie zdjęć - na wspólnym module baza_danych (jeden klient Qdrant na
+# proces, jak na serwerze). Każda akcja to pełne ponowne wykonanie main.py.
+#
+# Qdrant i OpenAI są zastąpione lokalnymi odpowiednikami z regulowanym opóźnieniem:
+# - Qdrant: klient w pamięci (QdrantClient(":memory:")), każde wywołanie czeka
+#   --opoznienie-qdrant sekund (jak zapytanie przez sieć)
+# - OpenAI (embeddingi): dostawca lokalny, każda partia czeka --opoznienie-openai sekund
+# Przesyłanie kończy się na dodaniu zadania do kolejki - Vision API wywołuje dopiero
+# pracownik (osobny proces), którego tutaj nie uruchamiamy.
+#
+# Wynik dla każdego N: przepustowość (akcje/s), mediana i p99 czasu ponownego
+# wykonania skryptu oraz pamięć procesu (RSS).
+#
+# Użycie:
+#   python src/obciazenie.py
+#   python src/obciazenie.py --sesje 1 5 10 20 --akcje 20 --opoznienie-qdrant 0.005 --opoznienie-openai 0.1
+
+import os  # zmienne środowiskowe i ścieżki
+import io  # zdjęcia testowe w pamięci
+import sys  # ścieżka folderu src
+import time  # pomiar czasu akcji
+import random  # losowe akcje i zapytania
+import argparse  # argumenty wiersza poleceń
+import tempfile  # osobny folder na dane testu (magazyn, kolejka, zdjęcia)
+import threading  # sesje równolegle
+import statistics  # mediana czasów
+import contextlib  # pusty kontekst zamiast nadpisywania konfiguracji przy każdym wykonaniu
+
+FOLDER_SRC = os.path.dirname(os.path.abspath(__file__))
+SKRYPT_APLIKACJI = os.path.join(FOLDER_SRC, "main.py")
+
+# Zapytania i opisy zdjęć w bazie testowej
+ZAPYTANIA = ["kot na kanapie", "zachód słońca", "pies w parku", "góry zimą", "czerwona kurtka", "plaża", "las"]
+SLOWA_OPISOW = ["kot", "pies", "kanapa", "park", "góry", "śnieg", "plaża", "morze", "las", "miasto",
+                "zachód", "słońca", "kurtka", "czerwona", "rower", "samochód", "dom", "ogród", "rzeka", "most"]
+
+# Akcje użytkownika i ich udział w ruchu
+AKCJE = {"wyszukiwanie": 0.5, "wiecej": 0.15, "katalog": 0.25, "przeslanie": 0.1}
+
+class ZOpoznieniem:
+    """
+    Opakowanie obiektu (klienta Qdrant), które przed każdym wywołaniem metody czeka
+    `opoznienie` sekund - czas sieci nie blokuje innych sesji, samo wywołanie
+    jest wykonywane pod blokadą (klient w pamięci nie jest bezpieczny wątkowo)
+    """
+
+    def __init__(self, obiekt, opoznienie):
+        self._obiekt = obiekt
+        self._opoznienie = opoznienie
+        self._blokada = threading.Lock()
+
+    def __getattr__(self, nazwa):
+        atrybut = getattr(self._obiekt, nazwa)
+        if not callable(atrybut):
+            return atrybut
+
+        def z_opoznieniem(*args, **kwargs):
+            time.sleep(self._opoznienie)
+            with self._blokada:
+                return atrybut(*args, **kwargs)
+        return z_opoznieniem
+
+def _wspolbiezny_apptest():
+    """
+    Przystosuj AppTest do wielu równoczesnych sesji w jednym procesie
+
+    AppTest zakłada jeden test naraz: przy każdym wykonaniu podstawia globalny
+    Runtime i nadpisuje konfigurację, a na końcu je zeruje - równoległe sesje
+    traciłyby je w trakcie wykonania. Tutaj wszystkie sesje dzielą jeden Runtime
+    i jedną pamięć skompilowanego skryptu (jak na prawdziwym serwerze), a konfiguracja
+    testowa jest ustawiana raz.
+    """
+    from unittest.mock import patch
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    class _JedenRuntime(type):
+        def __setattr__(cls, nazwa, wartosc):
+            if nazwa != "_instance":
+                super().__setattr__(nazwa, wartosc)
+            elif wartosc is not None and Runtime._instance is None:
+                Runtime._instance = wartosc  # pierwszy Runtime zostaje do końca testu
+
+    app_test.Runtime = _JedenRuntime("Runtime", (Runtime,), {})
+    wspolna_pamiec_skryptu = ScriptCache()  # main.py kompilowany raz, nie przy każdym wykonaniu
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: wspolna_pamiec_skryptu
+    patch.object(config, "get_option", new=build_mock_config_get_option({"global.appTest": True})).start()
+    app_test.patch_config_options = lambda opcje: contextlib.nullcontext()
+
+def _zdjecie_testowe(ziarno):
+    """
+    Małe losowe zdjęcie PNG (różne dHash - nie są zgłaszane jako duplikaty)
+    """
+    from PIL import Image
+
+    generator = random.Random(ziarno)
+    obraz = Image.new("RGB", (64, 48))
+    obraz.putdata([tuple(generator.randrange(256) for _ in range(3)) for _ in range(64 * 48)])
+    bufor = io.BytesIO()
+    obraz.save(bufor, format="PNG")
+    return bufor.getvalue()
+
+def przygotuj_srodowisko(folder, liczba_zdjec, opoznienie_qdrant, opoznienie_openai):
+    """
+    Skieruj aplikację na folder testu i podstaw lokalne odpowiedniki Qdrant i OpenAI
+
+    Musi być wywołane przed pierwszym importem modułów aplikacji (ścieżki z .env
+    są odczytywane przy imporcie).
+    """
+    os.environ.update({
+        "MAGAZYN_METADANYCH": os.path.join(folder, "metadane.sqlite3"),
+        "KOLEJKA_ZADAN": os.path.join(folder, "kolejka.sqlite3"),
+        "FOLDER_PLIKOW_ZADAN": os.path.join(folder, "kolejka_plikow"),
+        "FOLDER_ZDJEC": os.path.join(folder, "zdjecia"),
+        "DOSTAWCA_EMBEDDINGOW": "lokalny",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-test-obciazenia",  # tylko odblokowuje interfejs
+    })
+    os.environ.pop("QDRANT_URL", None)
+    sys.path.insert(0, FOLDER_SRC)
+
+    import embedding
+    import pracownik
+    import baza_danych
+    from qdrant_client import QdrantClient
+
+    class DostawcaZastepczy(embedding.DostawcaLokalny):
+        # Embeddingi lokalne z opóźnieniem zapytania do API
+        def _osadz_partie(self, teksty):
+            time.sleep(opoznienie_openai)
+            return super()._osadz_partie(teksty)
+
+    dostawca = DostawcaZastepczy()
+    baza_danych.pobierz_dostawce_embeddingow = lambda *args, **kwargs: dostawca
+    baza_danych._klient_qdrant = ZOpoznieniem(QdrantClient(":memory:"), opoznienie_qdrant)
+
+    # Pracownik nie jest uruchamiany - test mierzy interfejs, nie przetwarzanie
+    pracownik.uruchom_w_tle = lambda: False
+
+    _wspolbiezny_apptest()
+
+    # Baza testowa: losowe opisy zapisane jedną partią
+    generator = random.Random(0)
+    baza_danych.zapisz_embeddingi([
+        {"opis": " ".join(generator.sample(SLOWA_OPISOW, 6)), "sciezka": f"brak/{i}.jpg", "nazwa": f"zdjecie_{i}.jpg"}
+        for i in range(liczba_zdjec)
+    ])
+
+def _wykonaj_akcje(sesja, akcja, generator, numer):
+    """
+    Jedna akcja użytkownika w sesji (zmiana widżetu + ponowne wykonanie skryptu)
+    """
+    if akcja == "wyszukiwanie":
+        sesja.text_input(key="search_input").input(generator.choice(ZAPYTANIA)).run()
+    elif akcja == "wiecej":
+        przyciski = [p for p in sesja.button if p.key == "pokaz_wiecej"]
+        if przyciski:
+            przyciski[0].click().run()
+        else:
+            sesja.text_input(key="search_input").input(generator.choice(ZAPYTANIA)).run()
+    elif akcja == "katalog":
+        pola = [p for p in sesja.checkbox if (p.key or "").startswith("select_")]
+        if pola:
+            pole = generator.choice(pola)
+            pole.set_value(not pole.value).run()
+        else:
+            sesja.run()
+    elif akcja == "przeslanie":
+        przesylanie = [p for p in sesja.file_uploader][0]
+        przesylanie.set_value([(f"obciazenie_{numer}.png", _zdjecie_testowe(numer), "image/png")]).run()
+        sesja.button(key="btn_process").click().run()
+        # Podobne zdjęcie w bazie - decyzja "przetwórz jako nowy"
+        for przycisk in [p for p in sesja.button if (p.key or "").startswith("przetwarzac_")]:
+            przycisk.click().run()
+
+def _sesja(numer, liczba_akcji, czasy, bledy, limit_czasu):
+    """
+    Przebieg jednej sesji: pierwsze wyświetlenie i `liczba_akcji` losowych akcji
+    """
+    from streamlit.testing.v1 import AppTest
+
+    generator = random.Random(numer)
+    sesja = AppTest.from_file(SKRYPT_APLIKACJI, default_timeout=limit_czasu)
+    akcje, wagi = zip(*AKCJE.items())
+    for krok in range(liczba_akcji + 1):
+        akcja = "start" if krok == 0 else generator.choices(akcje, wagi)[0]
+        poczatek = time.perf_counter()
+        try:
+            if akcja == "start":
+                sesja.run()
+            else:
+                _wykonaj_akcje(sesja, akcja, generator, numer * 1000 + krok)
+            if sesja.exception:
+                raise RuntimeError(sesja.exception[0].message)
+        except Exception as e:
+            bledy.append(f"sesja {numer}, {akcja}: {e}")
+            continue
+        czasy.append((akcja, time.perf_counter() - poczatek))
+
+def _pamiec_mb():
+    """
+    Bieżąca pamięć procesu (RSS) w MB; bez /proc - szczytowa z resource
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        szczyt = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return szczyt / 2 ** 20 if sys.platform == "darwin" else szczyt / 1024
+
+def _percentyl(wartosci, p):
+    posortowane = sorted(wartosci)
+    return posortowane[min(len(posortowane) - 1, int(round(p / 100 * (len(posortowane) - 1))))]
+
+def zmierz(liczba_sesji, liczba_akcji, limit_czasu=120):
+    """
+    Uruchom `liczba_sesji` równoczesnych sesji i zwróć statystyki
+
+    Zwraca: słownik (sesje, akcje, bledy, przepustowosc, mediana_ms, p99_ms, pamiec_mb, czasy_akcji)
+    """
+    czasy, bledy = [], []
+    watki = [
+        threading.Thread(target=_sesja, args=(numer, liczba_akcji, czasy, bledy, limit_czasu))
+        for numer in range(liczba_sesji)
+    ]
+    poczatek = time.perf_counter()
+    for watek in watki:
+        watek.start()
+    for watek in watki:
+        watek.join()
+    czas_calkowity = time.perf_counter() - poczatek
+
+    sekundy = [czas for _, czas in czasy] or [0.0]
+    return {
+        "sesje": liczba_sesji,
+        "akcje": len(czasy),
+        "bledy": bledy,
+        "przepustowosc": len(czasy) / czas_calkowity,
+        "mediana_ms": statistics.median(sekundy) * 1000,
+        "p99_ms": _percentyl(sekundy, 99) * 1000,
+        "pamiec_mb": _pamiec_mb(),
+        "czasy_akcji": {
+            akcja: statistics.median(c for a, c in czasy if a == akcja) * 1000
+            for akcja in {a for a, _ in czasy}
+        }
+    }
+
+def wypisz_raport(wyniki):
+    print("\n[obciazenie] sesje | akcje | akcje/s | mediana [ms] |  p99 [ms] | RSS [MB] | błędy")
+    for w in wyniki:
+        print(f"[obciazenie] {w['sesje']:5d} | {w['akcje']:5d} | {w['przepustowosc']:7.1f} | "
+              f"{w['mediana_ms']:12.0f} | {w['p99_ms']:9.0f} | {w['pamiec_mb']:8.0f} | {len(w['bledy'])}")
+    print("[obciazenie] Mediana czasu akcji [ms] (ostatni pomiar): " + ", ".join(
+        f"{akcja} {czas:.0f}" for akcja, czas in sorted(wyniki[-1]["czasy_akcji"].items())
+    ))
+    for w in wyniki:
+        for blad in w["bledy"][:3]:
+            print(f"[obciazenie] ❌ N={w['sesje']}: {blad}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test obciążenia interfejsu (równoczesne sesje Streamlit)")
+    parser.add_argument("--sesje", type=int, nargs="+", default=[1, 5, 10, 20], help="liczby równoczesnych sesji")
+    parser.add_argument("--akcje", type=int, default=15, help="liczba akcji w każdej sesji")
+    parser.add_argument("--zdjecia", type=int, default=200, help="liczba zdjęć w bazie testowej")
+    parser.add_argument("--opoznienie-qdrant", type=float, default=0.005, help="opóźnienie wywołania Qdrant [s]")
+    parser.add_argument("--opoznienie-openai", type=float, default=0.1, help="opóźnienie zapytania o embeddingi [s]")
+    argumenty = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="obciazenie_") as folder:
+        # Ścieżki względne aplikacji (np. folder kolejki) też trafiają do folderu testu
+        os.chdir(folder)
+        przygotuj_srodowisko(folder, argumenty.zdjecia, argumenty.opoznienie_qdrant, argumenty.opoznienie_openai)
+
+        wyniki = []
+        for liczba_sesji in argumenty.sesje:
+            print(f"[obciazenie] {liczba_sesji} sesji x {argumenty.akcje} akcji...")
+            wyniki.append(zmierz(liczba_sesji, argumenty.akcje))
+        wypisz_raport(wyniki)
@@ -0,0 +1,336 @@
+# Zawartość pliku: src/obserwacja_folderu.py
+#
+# Obserwacja folderu ze zdjęciami (np. archiwum na NAS) - indeks nadąża za folderem
+# bez ręcznego przesyłania zdjęć przez pasek boczny.
+# Manifest (SQLite) pamięta dla każdego pliku: ścieżkę, rozmiar, mtime i hash zawartości.
+# Ponowne skanowanie:
+# - przechodzi drzewo przez os.scandir i porównuje tylko (rozmiar, mtime) z manifestem -
+#   niezmienione pliki nie są w ogóle otwierane (200 tys. plików = sekundy, nie godziny)
+# - hash sha256 liczony jest tylko dla plików nowych albo ze zmienionym rozmiarem/mtime;
+#   plik tylko "dotknięty" (ten sam hash) aktualizuje wpis w manifeście i nic więcej
+# - nowe i zmienione pliki trafiają do kolejki zadań (kopie - oryginały zostają na miejscu),
+#   zmienione najpierw tracą stary embedding
+# - pliki usunięte z folderu są usuwane z indeksu po ID punktu zapisanym w manifeście
+#   (nie po nazwie - zdjęcie o tej samej nazwie przesłane przez interfejs zostaje)
+# - pliki z nieudanego zadania są dodawane ponownie przy kolejnym skanowaniu
+#
+# Tryb ciągły: skanowanie co PRZERWA_SKANOWANIA sekund. Jeśli zainstalowany jest
+# pakiet watchdog (inotify w Linuksie), zdarzenia systemu plików budzą skanowanie
+# od razu; okresowe skanowanie zostaje, bo udziały sieciowe (NFS/SMB) nie zgłaszają
+# zmian zrobionych przez inne komputery.
+#
+# Nazwa zdjęcia w indeksie to ścieżka względna w obserwowanym folderze (np. "2023/lato/IMG_001.jpg"),
+# więc pliki o tej samej nazwie w różnych podfolderach się nie nadpisują.
+#
+# Użycie:
+#   python src/obserwacja_folderu.py /mnt/nas/zdjecia              # obserwuj aż do przerwania
+#   python src/obserwacja_folderu.py /mnt/nas/zdjecia --jednorazowo # jedno skanowanie i koniec
+#   python src/obserwacja_folderu.py /mnt/nas/zdjecia --model model_kaskada --przerwa 600
+
+import os  # przechodzenie drzewa folderów i zmienne środowiskowe
+import time  # przerwy między skanowaniami i pomiar czasu
+import hashlib  # sha256 zmienionych plików
+import sqlite3  # manifest plików
+import argparse  # argumenty wiersza poleceń
+import threading  # zdarzenie budzące skanowanie (watchdog)
+from datetime import datetime  # znaczniki czasu w manifeście
+
+import config  # przy imporcie wczytuje .env - przed ustawieniami poniżej i kolejką zadań
+import kolejka_zadan  # kolejka zadań przetwarzania
+
+# Ścieżka do pliku manifestu
+SCIEZKA_MANIFESTU = os.getenv("MANIFEST_FOLDERU", "manifest_folderu.sqlite3")
+
+# Co ile sekund skanować folder w trybie ciągłym
+PRZERWA_SKANOWANIA = float(os.getenv("PRZERWA_SKANOWANIA", "300"))
+
+# Ile sekund czekać po zdarzeniu watchdog (kopiowanie wielu plików = jedno skanowanie)
+OPOZNIENIE_ZDARZEN = 5.0
+
+# Maksymalna liczba plików w jednym zadaniu kolejki
+PLIKOW_NA_ZADANIE = int(os.getenv("PLIKOW_NA_ZADANIE", "50"))
+
+# Rozszerzenia zdjęć (jak w polu przesyłania w interfejsie)
+ROZSZERZENIA = (".jpg", ".jpeg", ".png")
+
+# Rozmiar kawałka przy liczeniu hasha
+ROZMIAR_KAWALKA = 1024 * 1024
+
+SCHEMAT = """
+CREATE TABLE IF NOT EXISTS pliki (
+    folder TEXT NOT NULL,          -- obserwowany folder (ścieżka bezwzględna)
+    sciezka TEXT NOT NULL,         -- ścieżka względna = nazwa zdjęcia w indeksie
+    rozmiar INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,        -- st_mtime_ns
+    hash TEXT NOT NULL,            -- sha256 zawartości
+    zadanie TEXT,                  -- zadanie kolejki (NULL gdy zapis potwierdzony)
+    zaktualizowano TEXT NOT NULL,
+    punkt,                         -- ID punktu w Qdrant (z wyniku zadania)
+    PRIMARY KEY (folder, sciezka)
+) WITHOUT ROWID;
+"""
+
+# Kolumny dodane w późniejszych wersjach (dla manifestów utworzonych wcześniej)
+DODANE_KOLUMNY = {
+    "punkt": ""
+}
+
+def _polaczenie():
+    """
+    Połączenie z manifestem (tworzony przy pierwszym użyciu)
+    """
+    polaczenie = sqlite3.connect(SCIEZKA_MANIFESTU, timeout=30)
+    polaczenie.execute("PRAGMA journal_mode=WAL")
+    polaczenie.execute("PRAGMA synchronous=NORMAL")
+    polaczenie.executescript(SCHEMAT)
+    istniejace = {w[1] for w in polaczenie.execute("PRAGMA table_info(pliki)")}
+    for kolumna, typ in DODANE_KOLUMNY.items():
+        if kolumna not in istniejace:
+            polaczenie.execute(f"ALTER TABLE pliki ADD COLUMN {kolumna} {typ}")
+    return polaczenie
+
+def _teraz():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _hash_pliku(sciezka):
+    """
+    sha256 zawartości pliku (czytanego kawałkami)
+    """
+    hash_zawartosci = hashlib.sha256()
+    with open(sciezka, "rb") as f:
+        while kawalek := f.read(ROZMIAR_KAWALKA):
+            hash_zawartosci.update(kawalek)
+    return hash_zawartosci.hexdigest()
+
+def przejdz_drzewo(folder):
+    """
+    Wszystkie zdjęcia w drzewie folderów - bez otwierania plików (tylko stat)
+
+    Zwraca: słownik {ścieżka względna: (rozmiar, mtime_ns)}
+    """
+    pliki = {}
+    do_odwiedzenia = [folder]
+    while do_odwiedzenia:
+        biezacy = do_odwiedzenia.pop()
+        try:
+            wpisy = os.scandir(biezacy)
+        except OSError as e:
+            print(f"[obserwacja_folderu] Pominięto folder {biezacy}: {e}")
+            continue
+        with wpisy:
+            for wpis in wpisy:
+                try:
+                    if wpis.is_dir(follow_symlinks=False):
+                        if not wpis.name.startswith("."):
+                            do_odwiedzenia.append(wpis.path)
+                    elif wpis.name.lower().endswith(ROZSZERZENIA) and wpis.is_file():
+                        stat = wpis.stat()
+                        sciezka = os.path.relpath(wpis.path, folder).replace(os.sep, "/")
+                        pliki[sciezka] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    pass  # plik zniknął w trakcie skanowania - zostanie obsłużony następnym razem
+    return pliki
+
+def _wyniki_zadan(zadania):
+    """
+    Sprawdź wcześniej dodane zadania (jedno zapytanie na zadanie, nie na plik)
+
+    Pliki z zadania nieudanego w całości (np. błąd klucza API, brak połączenia) są
+    dodawane ponownie. Błąd pojedynczego pliku w udanym zadaniu (np. uszkodzone zdjęcie)
+    nie jest ponawiany - plik wróci do kolejki dopiero, gdy się zmieni.
+
+    Parametr:
+    - zadania: słownik {ID zadania: lista ścieżek względnych}
+
+    Zwraca: tupla (zbiór ścieżek do ponowienia, lista (ścieżka, ID zadania, ID punktu) zakończonych,
+            zbiór ścieżek z zadań jeszcze w kolejce) - ID punktu None, gdy plik nie został zapisany
+    """
+    do_ponowienia, zakonczone, w_kolejce = set(), [], set()
+    for id_zadania, sciezki in zadania.items():
+        zadanie = kolejka_zadan.pobierz_zadanie(id_zadania)
+        if zadanie is not None and zadanie["stan"] in ("oczekuje", "w_toku"):
+            w_kolejce.update(sciezki)
+            continue
+        stany = {p["nazwa"]: p for p in zadanie["pliki"]} if zadanie else {}
+        for sciezka in sciezki:
+            plik = stany.get(sciezka)
+            if plik is None or (zadanie["stan"] == "blad" and plik["stan"] != "zapisane"):
+                do_ponowienia.add(sciezka)
+            else:
+                if plik["stan"] == "blad":
+                    print(f"[obserwacja_folderu] {sciezka}: {plik['blad']} (ponowienie po zmianie pliku)")
+                zakonczone.append((sciezka, id_zadania, plik.get("id_punktu")))
+    return do_ponowienia, zakonczone, w_kolejce
+
+def skanuj(folder, model_id, klucz_api=None):
+    """
+    Porównaj folder z manifestem: nowe i zmienione pliki do kolejki, usunięte z indeksu
+
+    Parametry:
+    - folder: obserwowany folder
+    - model_id: alias modelu Vision w aplikacji (np. "model_prosty", "model_kaskada")
+    - klucz_api: klucz OpenAI (domyślnie OPENAI_API_KEY pracownika)
+
+    Zwraca: słownik {"pliki", "nowe", "zmienione", "usuniete", "zadania", "sekundy"}
+    """
+    from baza_danych import usun_punkty, identyfikator_punktu
+
+    start = time.perf_counter()
+    folder = os.path.abspath(folder)
+    na_dysku = przejdz_drzewo(folder)
+
+    polaczenie = _polaczenie()
+    manifest, punkty = {}, {}
+    for sciezka, rozmiar, mtime, hash_zawartosci, zadanie, punkt in polaczenie.execute(
+        "SELECT sciezka, rozmiar, mtime, hash, zadanie, punkt FROM pliki WHERE folder = ?", (folder,)
+    ):
+        manifest[sciezka] = (rozmiar, mtime, hash_zawartosci, zadanie)
+        punkty[sciezka] = punkt
+
+    # Wynik wcześniej dodanych zadań
+    zadania_w_manifescie = {}
+    for sciezka, (_, _, _, id_zadania) in manifest.items():
+        if id_zadania:
+            zadania_w_manifescie.setdefault(id_zadania, []).append(sciezka)
+    do_ponowienia, zakonczone, w_kolejce = _wyniki_zadan(zadania_w_manifescie)
+    for sciezka, _, id_punktu in zakonczone:
+        punkty[sciezka] = id_punktu
+
+    nowe, zmienione, dotkniete = [], [], []
+    for sciezka, (rozmiar, mtime) in na_dysku.items():
+        wpis = manifest.get(sciezka)
+        if wpis is not None and wpis[:2] == (rozmiar, mtime) and sciezka not in do_ponowienia:
+            continue  # niezmieniony - bez otwierania pliku
+        if sciezka in w_kolejce:
+            continue  # zmieniony w trakcie przetwarzania - obsłuży go skanowanie po zakończeniu zadania
+        try:
+            hash_zawartosci = _hash_pliku(os.path.join(folder, sciezka))
+        except OSError as e:
+            print(f"[obserwacja_folderu] Nie można odczytać {sciezka}: {e}")
+            continue
+        if wpis is None:
+            nowe.append((sciezka, rozmiar, mtime, hash_zawartosci))
+        elif wpis[2] != hash_zawartosci or sciezka in do_ponowienia:
+            zmienione.append((sciezka, rozmiar, mtime, hash_zawartosci))
+        else:
+            dotkniete.append((sciezka, rozmiar, mtime, hash_zawartosci))
+
+    # Pliki z zadań w kolejce usuwamy dopiero po zapisie (inaczej pracownik zapisałby je po usunięciu)
+    usuniete = [sciezka for sciezka in manifest if sciezka not in na_dysku and sciezka not in w_kolejce]
+
+    def punkt_pliku(sciezka):
+        # Manifest sprzed zapisywania ID punktu - to samo ID, które wyliczył zapis (nazwa + sha256)
+        if punkty.get(sciezka) is not None:
+            return punkty[sciezka]
+        return identyfikator_punktu(sciezka, manifest[sciezka][2])
+
+    # Usunięte z folderu oraz zmienione (stary embedding znika przed dodaniem nowego,
+    # jak "zastąp" w interfejsie; ponawiane po nieudanym zadaniu nie mają czego usuwać) -
+    # usuwane po ID punktów zapisanych przez ten obserwator, nie po nazwie
+    do_usuniecia = [punkt_pliku(sciezka) for sciezka in usuniete]
+    do_usuniecia += [punkt_pliku(sciezka) for sciezka, *_ in zmienione if sciezka not in do_ponowienia]
+    usun_punkty(do_usuniecia)
+
+    # Nowe i zmienione do kolejki, w zadaniach po PLIKOW_NA_ZADANIE
+    do_kolejki = nowe + zmienione
+    zakonczone_zbior = {(sciezka, id_zadania) for sciezka, id_zadania, _ in zakonczone}
+    wiersze = [
+        (folder, s, r, m, h, None if (s, manifest[s][3]) in zakonczone_zbior else manifest[s][3], _teraz(), punkty[s])
+        for s, r, m, h in dotkniete
+    ]
+    zadania = []
+    if do_kolejki:
+        model = config.pobierz_rzeczywista_nazwe_modelu(model_id)
+        for poczatek in range(0, len(do_kolejki), PLIKOW_NA_ZADANIE):
+            partia = do_kolejki[poczatek:poczatek + PLIKOW_NA_ZADANIE]
+            id_zadania = kolejka_zadan.dodaj_zadanie(
+                [(s, os.path.join(folder, s)) for s, *_ in partia], model, model_id, klucz_api, kopiuj=True
+            )
+            zadania.append(id_zadania)
+            wiersze.extend((folder, s, r, m, h, id_zadania, _teraz(), None) for s, r, m, h in partia)
+
+    with polaczenie:
+        # Zadanie zakończone - nie będzie już sprawdzane (warunek na ID: plik mógł właśnie trafić do nowego zadania)
+        polaczenie.executemany(
+            "UPDATE pliki SET zadanie = NULL, punkt = ? WHERE folder = ? AND sciezka = ? AND zadanie = ?",
+            [(id_punktu, folder, s, id_zadania) for s, id_zadania, id_punktu in zakonczone]
+        )
+        polaczenie.executemany(
+            "INSERT OR REPLACE INTO pliki (folder, sciezka, rozmiar, mtime, hash, zadanie, zaktualizowano, punkt) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", wiersze
+        )
+        polaczenie.executemany("DELETE FROM pliki WHERE folder = ? AND sciezka = ?", [(folder, s) for s in usuniete])
+    polaczenie.close()
+
+    if zadania:
+        from pracownik import uruchom_w_tle
+        uruchom_w_tle()
+
+    wynik = {
+        "pliki": len(na_dysku), "nowe": len(nowe), "zmienione": len(zmienione),
+        "usuniete": len(usuniete), "zadania": zadania, "sekundy": time.perf_counter() - start
+    }
+    print(f"[obserwacja_folderu] {wynik['pliki']} plików w {wynik['sekundy']:.1f} s: nowe {wynik['nowe']}, "
+          f"zmienione {wynik['zmienione']}, usunięte {wynik['usuniete']}, zadania {len(zadania)}")
+    return wynik
+
+def _obserwator_zdarzen(folder, obudz):
+    """
+    Obserwator zdarzeń systemu plików (watchdog, inotify w Linuksie) budzący skanowanie
+
+    Zwraca: uruchomiony obserwator albo None, gdy watchdog nie jest zainstalowany
+    """
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        print("[obserwacja_folderu] Brak pakietu watchdog - tylko okresowe skanowanie")
+        return None
+
+    class Obsluga(FileSystemEventHandler):
+        def on_any_event(self, zdarzenie):
+            if zdarzenie.is_directory or str(zdarzenie.src_path).lower().endswith(ROZSZERZENIA):
+                obudz.set()
+
+    obserwator = Observer()
+    obserwator.schedule(Obsluga(), folder, recursive=True)
+    obserwator.start()
+    print("[obserwacja_folderu] Zdarzenia systemu plików włączone (watchdog)")
+    return obserwator
+
+def obserwuj(folder, model_id, klucz_api=None, przerwa=PRZERWA_SKANOWANIA, jednorazowo=False):
+    """
+    Skanuj folder od razu, a potem co `przerwa` sekund albo po zdarzeniu systemu plików
+    """
+    if jednorazowo:
+        return skanuj(folder, model_id, klucz_api)
+
+    obudz = threading.Event()
+    obserwator = _obserwator_zdarzen(folder, obudz)
+    print(f"[obserwacja_folderu] Obserwuję {folder} (skanowanie co {przerwa:.0f} s)")
+    try:
+        while True:
+            obudz.clear()
+            try:
+                skanuj(folder, model_id, klucz_api)
+            except Exception as e:
+                print(f"[obserwacja_folderu] Błąd skanowania: {e}")
+            if obudz.wait(przerwa):
+                time.sleep(OPOZNIENIE_ZDARZEN)  # poczekaj, aż skończy się kopiowanie serii plików
+    except KeyboardInterrupt:
+        print("[obserwacja_folderu] Zatrzymano")
+    finally:
+        if obserwator is not None:
+            obserwator.stop()
+            obserwator.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Obserwacja folderu ze zdjęciami - indeks nadąża za folderem")
+    parser.add_argument("folder", help="obserwowany folder (np. archiwum na NAS)")
+    parser.add_argument("--model", default=config.MODEL_DOMYSLNY,
+                        choices=list(config.MODELE) + [config.MODEL_KASKADA], help="model opisu zdjęć")
+    parser.add_argument("--przerwa", type=float, default=PRZERWA_SKANOWANIA, help="sekundy między skanowaniami")
+    parser.add_argument("--jednorazowo", action="store_true", help="jedno skanowanie i koniec")
+    argumenty = parser.parse_args()
+
+    obserwuj(argumenty.folder, argumenty.model, przerwa=argumenty.przerwa, jednorazowo=argumenty.jednorazowo)
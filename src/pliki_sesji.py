@@ -0,0 +1,122 @@
+# Zawartość pliku: src/pliki_sesji.py
+#
+# Przesłane pliki odkładane na dysk zamiast trzymania ich w pamięci sesji.
+# Pliki z st.file_uploader to bufory w RAM - trzymane w st.session_state przez
+# wszystkie ponowne uruchomienia skryptu (decyzje o duplikatach) zajmowały pamięć
+# serwera proporcjonalnie do liczby sesji razy rozmiar przesłania.
+# Teraz:
+# - każda sesja ma własny folder tymczasowy (ObszarSesji)
+# - plik jest przepisywany na dysk kawałkami, hash sha256 liczony w locie
+# - w st.session_state zostaje tylko lekki uchwyt PlikNaDysku (nazwa, ścieżka, rozmiar, hash)
+# - dalsze etapy czytają plik z dysku (mmap w procesach roboczych, kopiowanie kawałkami)
+# - folder znika, gdy sesja się kończy (weakref.finalize przy zwolnieniu stanu sesji
+#   albo przy zamknięciu procesu); foldery porzucone po awarii usuwa następna sesja
+
+import os  # ścieżki i rozmiary plików
+import time  # wiek porzuconych folderów
+import shutil  # usuwanie folderu sesji
+import hashlib  # sha256 liczony podczas zapisu
+import tempfile  # folder tymczasowy sesji
+import weakref  # sprzątanie przy zwolnieniu obiektu sesji
+from typing import NamedTuple
+
+# Folder główny na foldery sesji (domyślnie w folderze tymczasowym systemu)
+FOLDER_SESJI = os.getenv("FOLDER_PLIKOW_SESJI", os.path.join(tempfile.gettempdir(), "znajdywacz_sesje"))
+
+# Rozmiar kawałka przy przepisywaniu pliku na dysk
+ROZMIAR_KAWALKA = 1024 * 1024
+
+# Foldery starsze niż tyle sekund to pozostałości po przerwanym procesie
+MAKS_WIEK_FOLDERU = 24 * 3600
+
+class PlikNaDysku(NamedTuple):
+    """
+    Lekki uchwyt pliku zapisanego na dysku
+
+    Pole "name" nazywa się jak w plikach Streamlit (UploadedFile.name),
+    więc uchwyt można przekazać wszędzie tam, gdzie używana jest tylko nazwa.
+    """
+    name: str  # oryginalna nazwa przesłanego pliku
+    sciezka: str  # plik na dysku
+    rozmiar: int  # rozmiar w bajtach
+    hash: str  # sha256 zawartości (hex)
+
+def _usun_porzucone(folder_glowny):
+    """
+    Usuń foldery sesji porzucone po przerwanym procesie (bez sprzątania przy zamknięciu)
+    """
+    granica = time.time() - MAKS_WIEK_FOLDERU
+    try:
+        wpisy = list(os.scandir(folder_glowny))
+    except FileNotFoundError:
+        return
+    for wpis in wpisy:
+        try:
+            if wpis.is_dir() and wpis.stat().st_mtime < granica:
+                shutil.rmtree(wpis.path, ignore_errors=True)
+                print(f"[pliki_sesji] Usunięto porzucony folder {wpis.name}")
+        except OSError:
+            pass
+
+class ObszarSesji:
+    """
+    Folder tymczasowy jednej sesji Streamlit
+
+    Obiekt trzymany w st.session_state - gdy Streamlit zwalnia stan zakończonej
+    sesji, finalizator usuwa folder razem z plikami.
+    """
+
+    def __init__(self, folder_glowny=FOLDER_SESJI):
+        os.makedirs(folder_glowny, exist_ok=True)
+        _usun_porzucone(folder_glowny)
+        self.folder = tempfile.mkdtemp(prefix="sesja_", dir=folder_glowny)
+        # Finalizator nie może trzymać odwołania do self (inaczej obiekt nigdy nie zostałby zwolniony)
+        self._sprzatanie = weakref.finalize(self, shutil.rmtree, self.folder, ignore_errors=True)
+
+    def zapisz(self, plik):
+        """
+        Przepisz przesłany plik na dysk kawałkami, licząc sha256 w locie
+
+        Parametr:
+        - plik: obiekt pliku z .read() i .name (np. UploadedFile ze Streamlit)
+
+        Zwraca: PlikNaDysku
+        """
+        hash_zawartosci = hashlib.sha256()
+        deskryptor, sciezka = tempfile.mkstemp(dir=self.folder, suffix=os.path.splitext(plik.name)[1])
+        rozmiar = 0
+        plik.seek(0)
+        with os.fdopen(deskryptor, "wb") as f:
+            while kawalek := plik.read(ROZMIAR_KAWALKA):
+                hash_zawartosci.update(kawalek)
+                f.write(kawalek)
+                rozmiar += len(kawalek)
+        return PlikNaDysku(plik.name, sciezka, rozmiar, hash_zawartosci.hexdigest())
+
+    def zapisz_wszystkie(self, pliki):
+        """
+        Zapisz listę przesłanych plików (poprzednie pliki sesji są usuwane)
+
+        Zwraca: lista PlikNaDysku w tej samej kolejności
+        """
+        self.wyczysc()
+        uchwyty = [self.zapisz(plik) for plik in pliki]
+        print(f"[pliki_sesji] Zapisano {len(uchwyty)} plików ({sum(u.rozmiar for u in uchwyty) / 1e6:.1f} MB) "
+              f"w {os.path.basename(self.folder)}")
+        return uchwyty
+
+    def wyczysc(self):
+        """
+        Usuń pliki z folderu sesji (folder zostaje na kolejne przesłanie)
+        """
+        for wpis in os.scandir(self.folder):
+            try:
+                os.remove(wpis.path)
+            except OSError:
+                pass
+
+    def zamknij(self):
+        """
+        Usuń folder sesji od razu (zamiast czekać na zwolnienie obiektu)
+        """
+        self._sprzatanie()
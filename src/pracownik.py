@@ -0,0 +1,177 @@
+# Zawartość pliku: src/pracownik.py
+#
+# Proces roboczy kolejki zadań - przetwarza zdjęcia dodane przez interfejs.
+# Działa niezależnie od sesji Streamlit: kilka osób może dodawać zdjęcia
+# jednocześnie, a zadania są wykonywane po kolei (można też uruchomić kilku
+# pracowników - każde zadanie przejmuje dokładnie jeden z nich).
+#
+# Użycie:
+#   python src/pracownik.py             # działa aż do przerwania (Ctrl+C)
+#   python src/pracownik.py --jednorazowo   # przetwórz kolejkę i zakończ
+#
+# Interfejs uruchamia pracownika sam (uruchom_w_tle), jeśli żaden nie działa.
+
+import os  # ścieżki i zmienne środowiskowe
+import sys  # interpreter Pythona dla procesu w tle
+import time  # przerwy między sprawdzeniami kolejki
+import argparse  # argumenty wiersza poleceń
+import threading  # wątek sygnału życia
+import subprocess  # uruchamianie pracownika w tle
+
+import config  # przy imporcie wczytuje .env - przed modułami, które czytają zmienne przy imporcie
+import kolejka_zadan  # kolejka zadań w SQLite
+import profilowanie  # profil zadania na żądanie (PROFILOWANIE=zadania albo przełącznik w interfejsie)
+from pliki_sesji import PlikNaDysku  # uchwyt pliku na dysku (nazwa jak w plikach Streamlit)
+
+# Co ile sekund sprawdzać kolejkę gdy jest pusta
+PRZERWA_SPRAWDZANIA = 1.0
+
+# Co ile sekund bezczynny pracownik przywraca zadania martwych pracowników
+PRZERWA_PRZYWRACANIA = 30.0
+
+# Co ile sekund wysyłać sygnał życia (musi być dużo krótszy niż LIMIT_CISZY_PRACOWNIKA)
+PRZERWA_SYGNALU = 5.0
+
+def _wczytaj_plik(sciezka, nazwa):
+    """
+    Uchwyt pliku zadania (nazwa jak plik przesłany w Streamlit, zawartość zostaje na dysku)
+    """
+    return PlikNaDysku(nazwa, sciezka, os.path.getsize(sciezka), None)
+
+def wykonaj_zadanie(zadanie):
+    """
+    Przetwórz jedno zadanie: opisy z Vision API, embeddingi i zapis do bazy
+    """
+    # Importy przetwarzania dopiero tutaj - pula procesów tworzona w pracowniku, nie w interfejsie
+    from przetwarzanie_zdjec import przetworz_zdjecia
+    from baza_danych import zapisz_embeddingi
+
+    id_zadania = zadanie["id"]
+    klucz_api = zadanie["klucz_api"] or os.getenv("OPENAI_API_KEY")
+
+    # Przy wznowieniu porzuconego zadania pomijamy pliki już zapisane
+    pliki = [p for p in zadanie["pliki"] if p["stan"] != "zapisane"]
+    print(f"[pracownik] Zadanie {id_zadania}: {len(pliki)} plików")
+
+    opisane = []
+
+    def postep(idx, stan, blad=None):
+        # idx - pozycja na liście przekazanej do przetworz_zdjecia
+        kolejka_zadan.ustaw_stan_pliku(id_zadania, pliki[idx]["idx"], stan, blad)
+        if stan == "opisane":
+            opisane.append(pliki[idx]["idx"])
+
+    lista_plikow = [_wczytaj_plik(p["sciezka"], p["nazwa"]) for p in pliki]
+    mapowanie_nazw = {i: p["nazwa"] for i, p in enumerate(pliki)}
+
+    # Tryb kaskady - lista modeli od najtańszego zamiast jednego modelu
+    model = config.pobierz_modele_kaskady() if zadanie["model_id"] == config.MODEL_KASKADA else zadanie["model"]
+
+    statystyki = {}
+    opisy = przetworz_zdjecia(lista_plikow, model, klucz_api, mapowanie_nazw, postep=postep, statystyki=statystyki)
+    wynik_zapisu = zapisz_embeddingi(opisy, klucz_api)
+
+    # Błędy zapisu dotyczą pojedynczych opisów (kolejność opisy = kolejność opisane),
+    # a przy błędzie zapisu całej partii - wszystkich
+    bledy = wynik_zapisu.pop("bledy", {})
+    identyfikatory = wynik_zapisu.pop("identyfikatory", [])
+    for pozycja, idx in enumerate(opisane):
+        if pozycja in bledy:
+            kolejka_zadan.ustaw_stan_pliku(id_zadania, idx, "blad", f"błąd zapisu do bazy: {bledy[pozycja]}")
+        else:
+            # ID punktu przy pliku - obserwacja folderu usuwa po nim zdjęcie usunięte z folderu
+            kolejka_zadan.ustaw_stan_pliku(id_zadania, idx, "zapisane", id_punktu=identyfikatory[pozycja])
+
+    wynik_zapisu["liczba_plikow"] = len(zadanie["pliki"])
+    wynik_zapisu["opisy"] = statystyki  # zapytania i czas każdego modelu (podsumowanie w interfejsie)
+    return wynik_zapisu
+
+def _sygnal_zycia(stan, zatrzymaj):
+    """
+    Wątek wysyłający sygnał życia także w trakcie długiego zadania
+    """
+    while not zatrzymaj.wait(PRZERWA_SYGNALU):
+        kolejka_zadan.zglos_pracownika(stan.get("zadanie"))
+
+def uruchom(jednorazowo=False):
+    """
+    Główna pętla pracownika: przejmuj zadania z kolejki i wykonuj je po kolei
+    """
+    kolejka_zadan.przywroc_porzucone_zadania()
+
+    stan = {"zadanie": None}
+    zatrzymaj = threading.Event()
+    kolejka_zadan.zglos_pracownika()
+    threading.Thread(target=_sygnal_zycia, args=(stan, zatrzymaj), daemon=True).start()
+    print(f"[pracownik] Uruchomiono (PID {os.getpid()})")
+
+    ostatnie_przywracanie = time.monotonic()
+    try:
+        while True:
+            zadanie = kolejka_zadan.przejmij_zadanie()
+            if zadanie is None:
+                if jednorazowo:
+                    break
+                # Inny pracownik mógł zginąć w trakcie zadania - bez tego zadanie czekałoby
+                # w stanie "w_toku" do uruchomienia kolejnego pracownika
+                if time.monotonic() - ostatnie_przywracanie >= PRZERWA_PRZYWRACANIA:
+                    kolejka_zadan.przywroc_porzucone_zadania()
+                    ostatnie_przywracanie = time.monotonic()
+                time.sleep(PRZERWA_SPRAWDZANIA)
+                continue
+
+            stan["zadanie"] = zadanie["id"]
+            profil = None
+            if zadanie["profiluj"] or profilowanie.wlaczone("zadania"):
+                profil = profilowanie.rozpocznij(
+                    f"zadanie_{zadanie['id'][:8]}",
+                    pamiec=zadanie["profiluj"] == 2 or profilowanie.PROFILOWANIE_PAMIECI
+                )
+            try:
+                try:
+                    wynik = wykonaj_zadanie(zadanie)
+                finally:
+                    if profil is not None:
+                        sciezka_profilu = profil.zakoncz(f"{len(zadanie['pliki'])} plików, model {zadanie['model']}")
+                if profil is not None:
+                    wynik["profil"] = sciezka_profilu
+                kolejka_zadan.zakoncz_zadanie(zadanie["id"], wynik)
+                print(f"[pracownik] ✅ Zadanie {zadanie['id']} zakończone: {wynik}")
+            except Exception as e:
+                kolejka_zadan.zakoncz_zadanie(zadanie["id"], blad=str(e))
+                print(f"[pracownik] ❌ Zadanie {zadanie['id']} nieudane: {e}")
+            stan["zadanie"] = None
+            kolejka_zadan.zglos_pracownika()
+    except KeyboardInterrupt:
+        print("[pracownik] Zatrzymano")
+    finally:
+        zatrzymaj.set()
+        kolejka_zadan.wyrejestruj_pracownika()
+
+def uruchom_w_tle():
+    """
+    Uruchom pracownika jako osobny proces, jeśli żaden nie działa
+    (wywoływane przy dodawaniu zadania i przy odpytywaniu stanu niezakończonego zadania -
+    nowy pracownik przywraca zadanie pracownika, który zginął w trakcie)
+
+    Zwraca: True jeśli uruchomiono nowy proces
+    """
+    if kolejka_zadan.czy_pracownik_dziala():
+        return False
+
+    proces = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        cwd=os.getcwd(),  # te same ścieżki względne (baza, zdjęcia) co interfejs
+        start_new_session=True  # proces przeżywa ponowne uruchomienie skryptu Streamlit
+    )
+    # Zgłoś od razu - kolejne odświeżenie interfejsu nie uruchomi drugiego pracownika
+    kolejka_zadan.zglos_pracownika(pid=proces.pid)
+    print("[pracownik] Uruchomiono pracownika w tle")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pracownik kolejki przetwarzania zdjęć")
+    parser.add_argument("--jednorazowo", action="store_true", help="przetwórz kolejkę i zakończ")
+    argumenty = parser.parse_args()
+
+    uruchom(argumenty.jednorazowo)
@@ -0,0 +1,122 @@
+# Zawartość pliku: src/profilowanie.py
+#
+# Profilowanie na żądanie: jedno wykonanie skryptu Streamlit albo jedno zadanie kolejki.
+# Gdy wykonanie strony albo przetwarzanie paczki zdjęć działa wolno na produkcji,
+# profil da się zebrać bez zmiany kodu:
+# - zmienna środowiskowa PROFILOWANIE: "rerun" (każde wykonanie skryptu), "zadania"
+#   (każde zadanie pracownika) albo "wszystko"
+# - KLUCZ_PROFILOWANIA w .env włącza panel administratora: adres z ?profil=<klucz>
+#   profiluje wykonania skryptu tej sesji i pokazuje na pasku bocznym przełącznik
+#   (profilowanie wykonań i zadań dodanych z tej sesji, opcjonalnie także pamięci)
+#
+# Profil to deterministyczny cProfile (wątek wykonania skryptu / główny wątek pracownika),
+# opcjonalnie tracemalloc (alokacje pamięci wszystkich wątków). Każdy profil zapisuje
+# w FOLDER_PROFILI dwa pliki ze znacznikiem czasu:
+# - <czas>_<nazwa>.prof - pełne dane (np. snakeviz, python -m pstats)
+# - <czas>_<nazwa>.txt  - podsumowanie: najdroższe funkcje (łącznie i własny czas), alokacje
+#
+# Wyłączone profilowanie nic nie kosztuje: moduły profilerów są importowane dopiero
+# przy pierwszym profilu, a wywołujący sprawdzają tylko flagę.
+
+import os  # folder profili i zmienne środowiskowe
+import time  # czas trwania profilowanego wykonania
+from datetime import datetime  # znacznik czasu w nazwach plików
+
+# Co profilować na stałe: "" (nic), "rerun", "zadania", "wszystko"
+PROFILOWANIE = os.getenv("PROFILOWANIE", "").strip().lower()
+
+# Klucz panelu administratora (pusty = profilowanie tylko przez zmienną PROFILOWANIE)
+KLUCZ_PROFILOWANIA = os.getenv("KLUCZ_PROFILOWANIA", "")
+
+# Profilowanie pamięci (tracemalloc) przy profilach włączonych zmienną środowiskową
+PROFILOWANIE_PAMIECI = os.getenv("PROFILOWANIE_PAMIECI", "0") == "1"
+
+# Folder na pliki profili
+FOLDER_PROFILI = os.getenv("FOLDER_PROFILI", "profile")
+
+# Ile pozycji w podsumowaniu
+LICZBA_POZYCJI = int(os.getenv("PROFIL_LICZBA_POZYCJI", "30"))
+
+def wlaczone(rodzaj):
+    """
+    Czy profilowanie danego rodzaju ("rerun" albo "zadania") jest włączone zmienną środowiskową
+    """
+    return PROFILOWANIE in (rodzaj, "wszystko", "1")
+
+class Profil:
+    """
+    Trwający profil - rozpocznij(), a potem zakoncz() w tym samym wątku
+    """
+
+    def __init__(self, nazwa, pamiec=False):
+        import cProfile
+
+        self.nazwa = nazwa
+        self.pamiec = pamiec
+        self.sciezka = None  # plik .txt z podsumowaniem (po zakończeniu)
+        self._profiler = cProfile.Profile()
+        self._start = None
+        self._wlaczyl_tracemalloc = False
+
+    def rozpocznij(self):
+        if self.pamiec:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._wlaczyl_tracemalloc = True
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def zakoncz(self, uwaga=None):
+        """
+        Zatrzymaj profil i zapisz pliki .prof i .txt
+
+        Parametr:
+        - uwaga: dopisek w podsumowaniu (np. "przerwane przez st.rerun")
+
+        Zwraca: ścieżka pliku z podsumowaniem
+        """
+        self._profiler.disable()
+        sekundy = time.perf_counter() - self._start
+
+        # Importy dopiero po zatrzymaniu - nie trafiają do profilu
+        import io
+        import pstats
+
+        os.makedirs(FOLDER_PROFILI, exist_ok=True)
+        rdzen = os.path.join(FOLDER_PROFILI, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{self.nazwa}")
+        self._profiler.dump_stats(rdzen + ".prof")
+
+        tekst = io.StringIO()
+        tekst.write(f"Profil: {self.nazwa}\nCzas: {sekundy:.3f} s\n")
+        if uwaga:
+            tekst.write(f"Uwaga: {uwaga}\n")
+        statystyki = pstats.Stats(self._profiler, stream=tekst).strip_dirs()
+        tekst.write(f"\n=== Najdroższe funkcje łącznie (top {LICZBA_POZYCJI}) ===\n")
+        statystyki.sort_stats("cumulative").print_stats(LICZBA_POZYCJI)
+        tekst.write(f"\n=== Najdroższe funkcje - własny czas (top {LICZBA_POZYCJI}) ===\n")
+        statystyki.sort_stats("tottime").print_stats(LICZBA_POZYCJI)
+
+        if self.pamiec:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                migawka = tracemalloc.take_snapshot()
+                obecna, szczyt = tracemalloc.get_traced_memory()
+                tekst.write(f"\n=== Pamięć: obecnie {obecna / 1e6:.1f} MB, szczyt {szczyt / 1e6:.1f} MB ===\n")
+                for pozycja in migawka.statistics("lineno")[:LICZBA_POZYCJI]:
+                    tekst.write(f"{pozycja}\n")
+                if self._wlaczyl_tracemalloc:
+                    tracemalloc.stop()
+
+        self.sciezka = rdzen + ".txt"
+        with open(self.sciezka, "w", encoding="utf-8") as f:
+            f.write(tekst.getvalue())
+        print(f"[profilowanie] Zapisano profil {self.nazwa} ({sekundy:.2f} s): {self.sciezka}")
+        return self.sciezka
+
+def rozpocznij(nazwa, pamiec=False):
+    """
+    Rozpocznij profil (cProfile, opcjonalnie tracemalloc) - zwraca Profil do zakończenia
+    """
+    return Profil(nazwa, pamiec).rozpocznij()
@@ -1,146 +1,591 @@
 # Zawartość pliku: /znajdywacz-zdjec/znajdywacz-zdjec/src/przetwarzanie_zdjec.py
 
 import os  # moduł do pracy ze ścieżkami i operacjami na plikach
-import base64  # do kodowania zdjęć na base64 (format który API rozumie)
-from openai import OpenAI  # klient OpenAI do analizy zdjęć
-from dotenv import load_dotenv  # załadowanie zmiennych .env
+import re  # podział opisu na słowa (kontrola jakości w kaskadzie)
+import json  # odpowiedź Vision API w formacie JSON (opis + tagi)
+import time  # czas odpowiedzi każdego modelu (statystyki kaskady)
+from concurrent.futures import ThreadPoolExecutor, as_completed  # wątki dla zapytań do Vision API
+import config  # przy imporcie wczytuje .env (raz na proces)
+from przygotowanie_zdjec import zlec_przygotowanie  # dekodowanie/zmniejszanie zdjęć w puli procesów
+import magazyn_plikow  # zapis plików pod ścieżką z hasha (atomowo, bez duplikatów)
 
-# Załaduj zmienne środowiskowe z pliku .env
-load_dotenv()
+# Foldery zdjęć i miniatur (magazyn adresowany zawartością - patrz magazyn_plikow.py)
+FOLDER_ZDJEC = magazyn_plikow.FOLDER_ZDJEC
+FOLDER_MINIATUR = magazyn_plikow.FOLDER_MINIATUR
 
-# Ścieżka do folderu gdzie będą zapisywane przetworzone zdjęcia
-FOLDER_ZDJEC = "zdjecia_przetworzone"
+# Ile zapytań do Vision API może być w toku jednocześnie (zapytania sieciowe, nie obciążają CPU)
+LICZBA_WATKOW_VISION = int(os.getenv("LICZBA_WATKOW_VISION", "8"))
 
-# Utwórz folder jeśli nie istnieje
-if not os.path.exists(FOLDER_ZDJEC):
-    os.makedirs(FOLDER_ZDJEC)  # makedirs = utwórz folder (i wszystkie nadrzędne jeśli potrzeba)
-    print(f"[przetwarzanie_zdjec] Utworzono folder '{FOLDER_ZDJEC}'")
+# Instrukcja dla modelu Vision - opis i tagi w jednym zapytaniu (odpowiedź w JSON)
+PROMPT_OPISU = (
+    "Opisz to zdjęcie szczegółowo. Opisz co widzisz, kolory, obiekty, osoby, tło, nastrój. "
+    "Odpowiedź powinna być konkretna i informacyjna.\n"
+    "Zwróć wyłącznie obiekt JSON: {\"opis\": \"<opis>\", \"obiekty\": [\"<obiekt>\", ...], "
+    "\"scena\": \"<rodzaj sceny>\", \"kolory\": [\"<kolor>\", ...], \"liczba_osob\": <liczba>, "
+    "\"pewnosc\": <od 0 do 1 - na ile jesteś pewny opisu>}. "
+    "Tagi po polsku, małymi literami, w mianowniku liczby pojedynczej (np. \"pies\", \"plaża\", \"czerwony\")."
+)
 
-def przetworz_zdjecia(lista_plikow, model, klucz_api, mapowanie_nazw=None):
+# Pakowanie: ile zdjęć wysyłać w jednym zapytaniu do Vision API (1 = każde zdjęcie osobno).
+# Instrukcja i narzut zapytania są płacone raz na paczkę, a nie raz na zdjęcie.
+ZDJEC_NA_ZAPYTANIE = max(1, int(os.getenv("ZDJEC_NA_ZAPYTANIE", "1")))
+
+# Instrukcja dla paczki zdjęć - jeden obiekt JSON na zdjęcie, rozpoznawany po indeksie
+PROMPT_PACZKI = (
+    "Dostajesz {liczba} zdjęć, każde poprzedzone etykietą \"Zdjęcie <indeks>\" (indeksy od 0 do {ostatni}). "
+    "Opisz szczegółowo każde zdjęcie osobno: co widać, kolory, obiekty, osoby, tło, nastrój. "
+    "Nie mieszaj treści różnych zdjęć.\n"
+    "Zwróć wyłącznie obiekt JSON: {{\"zdjecia\": [{{\"indeks\": <indeks>, \"opis\": \"<opis>\", "
+    "\"obiekty\": [\"<obiekt>\", ...], \"scena\": \"<rodzaj sceny>\", \"kolory\": [\"<kolor>\", ...], "
+    "\"liczba_osob\": <liczba>, \"pewnosc\": <od 0 do 1>}}, ...]}} - dokładnie jeden element na każde zdjęcie. "
+    "Tagi po polsku, małymi literami, w mianowniku liczby pojedynczej (np. \"pies\", \"plaża\", \"czerwony\")."
+)
+
+# Schemat odpowiedzi dla paczki (structured outputs - model nie może zwrócić innej struktury)
+SCHEMAT_PACZKI = {
+    "name": "opisy_zdjec",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "zdjecia": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "indeks": {"type": "integer"},
+                        "opis": {"type": "string"},
+                        "obiekty": {"type": "array", "items": {"type": "string"}},
+                        "scena": {"type": "string"},
+                        "kolory": {"type": "array", "items": {"type": "string"}},
+                        "liczba_osob": {"type": "integer"},
+                        "pewnosc": {"type": "number"}
+                    },
+                    "required": ["indeks", "opis", "obiekty", "scena", "kolory", "liczba_osob", "pewnosc"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["zdjecia"],
+        "additionalProperties": False
+    }
+}
+
+# Powód próby zdjęcia, którego opisu zabrakło w odpowiedzi dla paczki (ponowione osobno)
+PONOWIENIE = "ponowienie pojedynczo"
+
+# Modele obsługujące structured outputs (pozostałe dostają tryb JSON i schemat opisany w instrukcji)
+MODELE_ZE_SCHEMATEM = ("gpt-4o-mini", "gpt-4o")
+
+# Ile tagów z listy zapisywać (obiekty, kolory)
+MAKS_TAGOW = {"obiekty": 15, "kolory": 6}
+
+# Kontrola jakości opisu w trybie kaskady - opis, który jej nie przejdzie,
+# trafia do kolejnego (droższego) modelu
+MIN_SLOW_OPISU = 20  # krótsze opisy są zbyt ogólne do wyszukiwania
+MIN_ROZNORODNOSC_SLOW = 0.45  # unikalne słowa / wszystkie słowa (powtarzający się opis)
+MIN_PEWNOSC = 0.6  # pewność zgłoszona przez model w polu "pewnosc"
+ZWROTY_OGOLNIKOWE = (
+    "nie mogę", "nie jestem w stanie", "nie da się", "trudno określić", "trudno powiedzieć",
+    "nie jest jasne", "niewyraźn", "rozmyt", "przepraszam"
+)
+
+def _tag(wartosc):
+    """
+    Ujednolić jeden tag: tekst, małe litery, bez zbędnych spacji
+    """
+    return " ".join(str(wartosc).lower().split()) if wartosc is not None else ""
+
+def rozbierz_odpowiedz(tekst):
+    """
+    Rozdziel odpowiedź Vision API na opis i tagi
+    
+    Odpowiedź, która nie jest poprawnym JSON-em (np. starszy model), jest w całości
+    traktowana jako opis - zdjęcie zostaje zapisane, tylko bez tagów.
+    
+    Zwraca: tupla (opis, tagi, pewnosc) - tagi to słownik z polami "obiekty", "scena",
+    "kolory", "liczba_osob" (tylko te, które model podał), pewnosc to liczba 0-1
+    albo None, gdy model jej nie podał
+    """
+    try:
+        dane = json.loads(tekst)
+    except (TypeError, ValueError):
+        return tekst, {}, None
+    if not isinstance(dane, dict) or not dane.get("opis"):
+        return tekst, {}, None
+    return _rozbierz_dane(dane)
+
+def _rozbierz_dane(dane):
+    """
+    Opis, tagi i pewność z jednego obiektu JSON (pojedyncze zdjęcie albo element paczki)
+    """
+    tagi = {}
+    for pole, maks in MAKS_TAGOW.items():
+        lista = dane.get(pole)
+        if isinstance(lista, str):
+            lista = [lista]
+        if isinstance(lista, list):
+            # Bez duplikatów, w kolejności od modelu
+            wartosci = list(dict.fromkeys(t for t in map(_tag, lista) if t))[:maks]
+            if wartosci:
+                tagi[pole] = wartosci
+    
+    scena = _tag(dane.get("scena"))
+    if scena:
+        tagi["scena"] = scena
+    
+    try:
+        liczba_osob = int(dane.get("liczba_osob"))
+        if liczba_osob >= 0:
+            tagi["liczba_osob"] = liczba_osob
+    except (TypeError, ValueError):
+        pass
+    
+    try:
+        pewnosc = min(max(float(dane.get("pewnosc")), 0.0), 1.0)
+    except (TypeError, ValueError):
+        pewnosc = None
+    
+    return str(dane["opis"]), tagi, pewnosc
+
+def ocen_opis(opis, tagi, pewnosc):
+    """
+    Kontrola jakości opisu (tania, bez zapytań do API) - używana w trybie kaskady
+    
+    Zwraca: None gdy opis jest dobry, w przeciwnym razie powód eskalacji (tekst)
+    """
+    slowa = re.findall(r"\w+", opis.lower())
+    if len(slowa) < MIN_SLOW_OPISU:
+        return f"krótki opis ({len(slowa)} słów)"
+    
+    tekst = opis.lower()
+    zwrot = next((z for z in ZWROTY_OGOLNIKOWE if z in tekst), None)
+    if zwrot:
+        return f"ogólnikowy opis (\"{zwrot}\")"
+    
+    roznorodnosc = len(set(slowa)) / len(slowa)
+    if roznorodnosc < MIN_ROZNORODNOSC_SLOW:
+        return f"powtarzający się opis (różnorodność słów {roznorodnosc:.2f})"
+    
+    if pewnosc is not None and pewnosc < MIN_PEWNOSC:
+        return f"niska pewność modelu ({pewnosc:.2f})"
+    
+    # Odpowiedź nie była poprawnym JSON-em - zdjęcie nie miałoby tagów
+    if not tagi:
+        return "brak tagów"
+    
+    return None
+
+def pobierz_sciezke_miniatury(sciezka_zdjecia):
+    """
+    Zwróć ścieżkę miniatury dla zapisanego zdjęcia
+    Np. "zdjecia_przetworzone/ab/cd/<hash>.png" -> "zdjecia_przetworzone/miniatury/ab/cd/<hash>.jpg"
+    """
+    return magazyn_plikow.sciezka_miniatury(sciezka_zdjecia)
+
+def _opisz_zdjecie(klient, model, zdjecie_base64):
+    """
+    Wyślij jedno (już zmniejszone) zdjęcie do Vision API i zwróć opis z tagami
+    Funkcja jest wywoływana w wątkach - czeka głównie na odpowiedź sieciową
+    
+    Zwraca: tupla (opis, tagi, pewnosc, tokeny) - patrz rozbierz_odpowiedz;
+    tokeny to łączna liczba tokenów zapytania (wejście + wyjście)
+    """
+    # WAŻNE: Używamy client.chat.completions.create() z modelami vision
+    odpowiedz = klient.chat.completions.create(
+        model=model,  # którego modelu użyć (gpt-4o-mini, gpt-4o, itp.)
+        messages=[
+            {
+                "role": "user",  # to jest wiadomość od użytkownika
+                "content": [
+                    # Instrukcja tekstowa dla modelu
+                    {"type": "text", "text": PROMPT_OPISU},
+                    # Zdjęcie w formacie base64 (po przygotowaniu zawsze JPEG)
+                    {
+                        "type": "image_url",  # typ: URL do zdjęcia
+                        "image_url": {"url": f"data:image/jpeg;base64,{zdjecie_base64}"}
+                    }
+                ]
+            }
+        ],
+        response_format={"type": "json_object"}  # odpowiedź zawsze jako poprawny JSON
+    )
+
+    # choices[0] = pierwsza odpowiedź, message.content = tekst odpowiedzi (JSON z opisem i tagami)
+    return (*rozbierz_odpowiedz(odpowiedz.choices[0].message.content), _tokeny(odpowiedz))
+
+def _tokeny(odpowiedz):
+    """
+    Łączna liczba tokenów zapytania (0, gdy API nie podało zużycia)
+    """
+    return getattr(getattr(odpowiedz, "usage", None), "total_tokens", None) or 0
+
+def _opisz_paczke(klient, model, lista_base64):
+    """
+    Wyślij kilka zdjęć w jednym zapytaniu do Vision API i rozdziel odpowiedź na zdjęcia
+    
+    Każde zdjęcie jest poprzedzone etykietą z indeksem, a odpowiedź ma jeden element
+    na indeks. Odpowiedź jest sprawdzana: element z indeksem spoza paczki, powtórzony
+    albo bez opisu jest odrzucany - takie zdjęcie dostaje None (do ponowienia osobno).
+    
+    Zwraca: tupla (lista (opis, tagi, pewnosc) albo None dla każdego zdjęcia, tokeny całej paczki)
+    """
+    tresc = [{"type": "text", "text": PROMPT_PACZKI.format(liczba=len(lista_base64), ostatni=len(lista_base64) - 1)}]
+    for indeks, zdjecie_base64 in enumerate(lista_base64):
+        tresc.append({"type": "text", "text": f"Zdjęcie {indeks}"})
+        tresc.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{zdjecie_base64}"}})
+    
+    odpowiedz = klient.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": tresc}],
+        response_format=(
+            {"type": "json_schema", "json_schema": SCHEMAT_PACZKI} if model.startswith(MODELE_ZE_SCHEMATEM)
+            else {"type": "json_object"}
+        )
+    )
+    tokeny = _tokeny(odpowiedz)
+    
+    wyniki = [None] * len(lista_base64)
+    try:
+        elementy = json.loads(odpowiedz.choices[0].message.content)["zdjecia"]
+    except (TypeError, ValueError, KeyError):
+        print(f"[przetwarzanie_zdjec] ⚠️ Nieprawidłowa odpowiedź dla paczki {len(lista_base64)} zdjęć")
+        return wyniki, tokeny
+    
+    powtorzone = set()
+    for element in elementy if isinstance(elementy, list) else []:
+        if not isinstance(element, dict):
+            continue
+        indeks = element.get("indeks")
+        # bool to podklasa int - true/false z JSON nie może wskazać zdjęcia 1/0
+        if not isinstance(indeks, int) or isinstance(indeks, bool) or not 0 <= indeks < len(wyniki) \
+                or not element.get("opis"):
+            continue
+        if wyniki[indeks] is not None:
+            # Dwa opisy jednego zdjęcia - nie wiadomo, który jest właściwy
+            powtorzone.add(indeks)
+            continue
+        wyniki[indeks] = _rozbierz_dane(element)
+    for indeks in powtorzone:
+        wyniki[indeks] = None
+    return wyniki, tokeny
+
+def _opisz_kaskada(klient, modele, zdjecie_base64):
+    """
+    Opisz zdjęcie kolejnymi modelami kaskady, aż opis przejdzie kontrolę jakości
+    
+    Pierwszy model jest najtańszy i najszybszy - droższy dostaje zdjęcie tylko wtedy,
+    gdy opis jest zbyt krótki, ogólnikowy lub model zgłosił niską pewność.
+    Błąd zapytania też oznacza przejście do kolejnego modelu. Przy jednym modelu
+    to zwykłe pojedyncze zapytanie.
+    
+    Zwraca: tupla (opis, tagi, proby) - proby to lista (model, sekundy, powod_eskalacji, tokeny)
+    """
+    proby = []
+    najlepszy = None  # ostatni otrzymany opis (gdy droższy model zawiedzie)
+    for poziom, model in enumerate(modele):
+        ostatni = poziom == len(modele) - 1
+        start = time.perf_counter()
+        try:
+            opis, tagi, pewnosc, tokeny = _opisz_zdjecie(klient, model, zdjecie_base64)
+        except Exception as e:
+            proby.append((model, time.perf_counter() - start, f"błąd: {e}", 0))
+            if ostatni and najlepszy is None:
+                raise
+            continue
+        
+        # Ostatni model nie ma do kogo eskalować - jego opis jest ostateczny
+        powod = None if ostatni else ocen_opis(opis, tagi, pewnosc)
+        proby.append((model, time.perf_counter() - start, powod, tokeny))
+        najlepszy = (opis, tagi)
+        if powod is None:
+            break
+        print(f"[przetwarzanie_zdjec] ⤴️ Eskalacja {model} -> {modele[poziom + 1]}: {powod}")
+    
+    return najlepszy[0], najlepszy[1], proby
+
+def _opisz_paczke_kaskada(klient, modele, lista_base64):
+    """
+    Opisz paczkę zdjęć: pierwszy model kaskady dostaje całą paczkę w jednym zapytaniu,
+    a zdjęcia bez poprawnego opisu w odpowiedzi są ponawiane pojedynczo
+    
+    Opisy, które nie przejdą kontroli jakości, eskalują pojedynczo do kolejnych
+    modeli kaskady (jak w _opisz_kaskada). Czas i tokeny paczki są dzielone
+    po równo między jej zdjęcia.
+    
+    Zwraca: lista (opis, tagi, proby) albo wyjątek - po jednym elemencie na zdjęcie
+    """
+    model = modele[0]
+    start = time.perf_counter()
+    try:
+        opisy, tokeny = _opisz_paczke(klient, model, lista_base64)
+    except Exception as e:
+        print(f"[przetwarzanie_zdjec] ⚠️ Błąd paczki {len(lista_base64)} zdjęć ({e}) - ponawiam pojedynczo")
+        opisy, tokeny = [None] * len(lista_base64), 0
+    sekundy_zdjecia = (time.perf_counter() - start) / len(lista_base64)
+    tokeny_zdjecia = tokeny / len(lista_base64)
+    
+    wyniki = []
+    for zdjecie_base64, opis_z_paczki in zip(lista_base64, opisy):
+        try:
+            if opis_z_paczki is None:
+                # Brak poprawnego opisu w paczce - zdjęcie osobno, całą kaskadą
+                opis, tagi, proby = _opisz_kaskada(klient, modele, zdjecie_base64)
+                wyniki.append((opis, tagi, [(model, sekundy_zdjecia, PONOWIENIE, tokeny_zdjecia)] + proby))
+                continue
+            opis, tagi, pewnosc = opis_z_paczki
+            powod = ocen_opis(opis, tagi, pewnosc) if len(modele) > 1 else None
+            proba = (model, sekundy_zdjecia, powod, tokeny_zdjecia)
+            if powod is None:
+                wyniki.append((opis, tagi, [proba]))
+                continue
+            print(f"[przetwarzanie_zdjec] ⤴️ Eskalacja {model} -> {modele[1]}: {powod}")
+            try:
+                opis, tagi, proby = _opisz_kaskada(klient, modele[1:], zdjecie_base64)
+            except Exception as e:
+                # Droższy model zawiódł - zostaje opis z paczki
+                proby = [(modele[1], 0.0, f"błąd: {e}", 0)]
+            wyniki.append((opis, tagi, [proba] + proby))
+        except Exception as e:
+            wyniki.append(e)
+    return wyniki
+
+def _zlicz_proby(statystyki_modeli, proby):
+    """
+    Dopisz próby jednego zdjęcia do statystyk modeli (zapytania, zakończone, czas, tokeny)
+    """
+    for numer, (model, sekundy, powod, tokeny) in enumerate(proby):
+        wpis = statystyki_modeli.setdefault(
+            model, {"zapytania": 0, "zakonczone": 0, "eskalacje": 0, "ponowienia": 0, "sekundy": 0.0, "tokeny": 0}
+        )
+        wpis["zapytania"] += 1
+        wpis["sekundy"] += sekundy
+        wpis["tokeny"] += tokeny
+        if numer == len(proby) - 1:
+            wpis["zakonczone"] += 1
+        elif powod == PONOWIENIE:
+            wpis["ponowienia"] += 1
+        elif powod is not None:
+            wpis["eskalacje"] += 1
+
+def przetworz_zdjecia(lista_plikow, model, klucz_api, mapowanie_nazw=None, postep=None, statystyki=None,
+                      zdjec_na_zapytanie=None):
     """
     Przetwórz zdjęcia - wygeneruj opisy za pomocą Vision API OpenAI
     
     Parametry:
     - lista_plikow: lista plików przesłanych przez użytkownika (z Streamlit)
-    - model: nazwa modelu OpenAI do użycia (np. "gpt-4o-mini", "gpt-4o")
+    - model: nazwa modelu OpenAI do użycia (np. "gpt-4o-mini", "gpt-4o") albo lista modeli
+      kaskady od najtańszego (np. ["gpt-4o-mini", "gpt-4o"] - patrz _opisz_kaskada)
     - klucz_api: klucz API OpenAI
     - mapowanie_nazw: słownik mapujący indeksy na nowe nazwy (dla duplikatów)
+    - postep: opcjonalna funkcja postep(idx, stan, blad=None) wywoływana po każdym zdjęciu
+      (stan "opisane" albo "blad") - używana przez pracownika kolejki zadań
+    - statystyki: opcjonalny słownik uzupełniany statystykami opisów:
+      "modele" - {model: {"zapytania", "zakonczone", "eskalacje", "ponowienia", "sekundy", "tokeny"}}
+      (zapytania, czas i tokeny liczone na zdjęcie - w paczce dzielone po równo),
+      "zdjecia" - liczba opisanych zdjęć, "sekundy_zdjec" - łączny czas ich opisu
+      (wszystkie poziomy kaskady), "paczki" - liczba zapytań z paczką zdjęć
+    - zdjec_na_zapytanie: ile zdjęć wysyłać w jednym zapytaniu (domyślnie ZDJEC_NA_ZAPYTANIE,
+      1 = każde zdjęcie osobno, patrz _opisz_paczke_kaskada)
     
-    Zwraca: lista słowników z kluczami "opis" i "sciezka"
+    Zdjęcia są przygotowywane (dekodowanie, zmniejszanie, hash) w puli procesów,
+    a zapytania do Vision API wysyłane równolegle w wątkach, gdy tylko dane
+    zdjęcie (albo cała paczka zdjęć) jest gotowe.
+    
+    Zwraca: lista słowników z kluczami "opis", "sciezka", "nazwa" i "metadane"
+    (hash, wymiary, pola EXIF i tagi - zapisywane w payloadzie Qdrant)
     """
     
     # Jeśli mapowanie_nazw nie zostało przekazane - utwórz pusty słownik
     if mapowanie_nazw is None:
         mapowanie_nazw = {}
+    if statystyki is None:
+        statystyki = {}
+    statystyki.setdefault("modele", {})
+    statystyki.setdefault("zdjecia", 0)
+    statystyki.setdefault("sekundy_zdjec", 0.0)
+    statystyki.setdefault("paczki", 0)
+    
+    # Jeden model = kaskada z jednym poziomem
+    modele = [model] if isinstance(model, str) else list(model)
+    if zdjec_na_zapytanie is None:
+        zdjec_na_zapytanie = ZDJEC_NA_ZAPYTANIE
     
     # Jeśli klucz nie istnieje - wyrzuć błąd (aplikacja się zatrzyma)
     if not klucz_api:
         raise ValueError("Brak klucza OpenAI.")
     
     # Utwórz klienta OpenAI - zaraz będziemy go używać do wysyłania zdjęć
+    # (import dopiero tutaj - interfejs importuje ten moduł tylko dla ścieżek miniatur)
+    from openai import OpenAI
     klient = OpenAI(api_key=klucz_api)
     
     # Lista na wyniki (opis + ścieżka dla każdego zdjęcia)
     wyniki = []
     
-    # Pętla po każdym przesłanym pliku
-    for idx, plik in enumerate(lista_plikow):
-        print(f"[przetwarzanie_zdjec] Przetwarzanie zdjęcia {idx + 1}/{len(lista_plikow)}: {plik.name}")
+    # Pliki zapisane na dysku (PlikNaDysku) przekazujemy jako ścieżki - procesy robocze
+    # mapują je do pamięci; pozostałe pliki (np. z uploadera) odczytujemy jako bajty
+    zawartosci = [getattr(plik, "sciezka", None) or plik.read() for plik in lista_plikow]
+    
+    # KROK 1: Zleć przygotowanie zdjęć w puli procesów (dekodowanie, zmniejszanie, hash, base64)
+    przygotowania = zlec_przygotowanie(zawartosci)
+    indeksy = {przyszle: idx for idx, przyszle in enumerate(przygotowania)}  # Future -> indeks pliku
+    
+    # Wątki dla zapytań do Vision API - zapytania sieciowe nakładają się na pracę procesów
+    with ThreadPoolExecutor(max_workers=LICZBA_WATKOW_VISION) as watki:
+        zlecone_opisy = {}  # indeks pliku -> (przygotowane zdjęcie, Future z opisem, pozycja w paczce albo None)
+        paczka = []  # przygotowane zdjęcia czekające na zapełnienie paczki (indeksy plików)
         
-        try:
-            # Pobierz oryginalną nazwę pliku (bez żadnych zmian!)
-            oryginalna_nazwa = plik.name
-            
-            # Sprawdź czy istnieje mapowanie dla tego indeksu (dla duplikatów)
-            # Jeśli istnieje - użyj nową nazwę, jeśli nie - użyj oryginalną
-            nazwa_do_zapisu = mapowanie_nazw.get(idx, oryginalna_nazwa)
-            
-            # Odczytaj zawartość pliku (cały plik jako bajty)
-            zawartosc_pliku = plik.read()
-            
-            # Zamień zdjęcie (bajty) na kod base64 (tekst który API rozumie)
-            # base64 to standard kodowania - zamieniamy dane binarne na tekst
-            zdjecie_base64 = base64.b64encode(zawartosc_pliku).decode('utf-8')
-            
-            # Pobierz rozszerzenie pliku (np. ".jpg" z "foto.jpg")
-            # os.path.splitext() dzieli nazwę na (nazwa, rozszerzenie)
-            _, rozszerzenie = os.path.splitext(oryginalna_nazwa)
-            
-            # Mapa zamieniająca rozszerzenia na MIME types
-            # MIME type mówi API jaki format ma plik
-            mime_type_map = {
-                ".jpg": "image/jpeg",  # JPEG to format zdjęcia
-                ".jpeg": "image/jpeg",  # JPEG to format zdjęcia
-                ".png": "image/png",  # PNG to format zdjęcia
-                ".gif": "image/gif",  # GIF to format animacji
-                ".webp": "image/webp"  # WebP to nowoczesny format
-            }
+        def wyslij_paczke():
+            # Paczka jednego zdjęcia to zwykłe pojedyncze zapytanie
+            if len(paczka) == 1:
+                idx = paczka[0]
+                zlecone_opisy[idx] = (
+                    zlecone_opisy[idx][0],
+                    watki.submit(_opisz_kaskada, klient, modele, zlecone_opisy[idx][0]["zdjecie_base64"]),
+                    None
+                )
+            elif paczka:
+                przyszly_opis = watki.submit(
+                    _opisz_paczke_kaskada, klient, modele, [zlecone_opisy[i][0]["zdjecie_base64"] for i in paczka]
+                )
+                for pozycja, idx in enumerate(paczka):
+                    zlecone_opisy[idx] = (zlecone_opisy[idx][0], przyszly_opis, pozycja)
+                statystyki["paczki"] += 1
+                print(f"[przetwarzanie_zdjec] Wysyłanie paczki {len(paczka)} zdjęć")
+            paczka.clear()
+        
+        # KROK 2: Gdy tylko zdjęcie (albo pełna paczka) jest przygotowane - od razu wyślij do Vision API
+        for przyszle in as_completed(przygotowania):
+            idx = indeksy[przyszle]
+            try:
+                przygotowane = przyszle.result()
+            except Exception as e:
+                # Plik uszkodzony lub to nie jest zdjęcie - pomiń go
+                print(f"[przetwarzanie_zdjec] ❌ Błąd przy przygotowaniu {lista_plikow[idx].name}: {e}")
+                if postep:
+                    postep(idx, "blad", str(e))
+                continue
             
-            # Pobierz MIME type dla tego rozszerzenia (domyślnie jpeg)
-            mime_type = mime_type_map.get(rozszerzenie.lower(), "image/jpeg")
+            print(f"[przetwarzanie_zdjec] Wysyłanie zdjęcia {idx + 1}/{len(lista_plikow)}: {lista_plikow[idx].name}")
+            zlecone_opisy[idx] = (przygotowane, None, None)
+            paczka.append(idx)
+            if len(paczka) >= zdjec_na_zapytanie:
+                wyslij_paczke()
+        wyslij_paczke()  # niepełna ostatnia paczka
+        
+        # KROK 3: Zbierz opisy i zapisz pliki (w kolejności przesłania)
+        for idx in sorted(zlecone_opisy):
+            plik = lista_plikow[idx]
+            przygotowane, przyszly_opis, pozycja = zlecone_opisy[idx]
             
-            # Wyślij zdjęcie do OpenAI Vision API z prośbą o opis
-            # WAŻNE: Używamy client.chat.completions.create() z modelami vision
-            odpowiedz = klient.chat.completions.create(
-                model=model,  # którego modelu użyć (gpt-4o-mini, gpt-4o, itp.)
-                messages=[
-                    {
-                        "role": "user",  # to jest wiadomość od użytkownika
-                        "content": [
-                            # Instrukcja tekstowa dla modelu
-                            {
-                                "type": "text",  # typ: tekst
-                                "text": "Opisz to zdjęcie szczegółowo. Opisz co widzisz, kolory, obiekty, osoby, tło, nastrój. Odpowiedź powinna być konkretna i informacyjna."  # co ma zrobić
-                            },
-                            # Zdjęcie w formacie base64
-                            {
-                                "type": "image_url",  # typ: URL do zdjęcia
-                                "image_url": {
-                                    "url": f"data:{mime_type};base64,{zdjecie_base64}"  # zdjęcie zakodowane w base64
-                                }
-                            }
-                        ]
+            try:
+                # Poczekaj na opis i tagi z Vision API (z paczki - element na pozycji tego zdjęcia)
+                wynik_opisu = przyszly_opis.result()
+                if pozycja is not None:
+                    wynik_opisu = wynik_opisu[pozycja]
+                    if isinstance(wynik_opisu, Exception):
+                        raise wynik_opisu
+                opis, tagi, proby = wynik_opisu
+                _zlicz_proby(statystyki["modele"], proby)
+                statystyki["zdjecia"] += 1
+                statystyki["sekundy_zdjec"] += sum(proba[1] for proba in proby)
+                
+                # Sprawdź czy istnieje mapowanie dla tego indeksu (dla duplikatów)
+                # Jeśli istnieje - użyj nową nazwę, jeśli nie - użyj oryginalną
+                # Nazwa jest tylko metadaną - plik na dysku nazywa się jak jego hash
+                nazwa_do_zapisu = mapowanie_nazw.get(idx, plik.name)
+                rozszerzenie = os.path.splitext(nazwa_do_zapisu)[1].lower() or ".jpg"
+                
+                # Zapisz oryginalne zdjęcie (identyczna zawartość = ten sam plik, bez kopii)
+                sciezka_docelowa = magazyn_plikow.zapisz_obiekt(zawartosci[idx], rozszerzenie, przygotowane["hash"])
+                
+                # Zapisz miniaturę (przygotowaną już w procesie roboczym) w tym samym układzie folderów
+                magazyn_plikow.zapisz_obiekt(
+                    przygotowane["miniatura"], ".jpg", przygotowane["hash"], magazyn_plikow.FOLDER_MINIATUR
+                )
+                
+                # Wypisz komunikat że zdjęcie zostało zapisane
+                print(f"[przetwarzanie_zdjec] ✅ Zdjęcie zapisane: {sciezka_docelowa}")
+                
+                # Dodaj wynik do listy (opis AI + ścieżka do pliku + metadane do payloadu)
+                wyniki.append({
+                    "opis": opis,  # wygenerowany opis AI
+                    "sciezka": sciezka_docelowa,  # ścieżka do zapisanego zdjęcia
+                    "nazwa": nazwa_do_zapisu,  # nazwa zdjęcia widoczna w aplikacji
+                    "metadane": {
+                        "hash": przygotowane["hash"],  # sha256 zawartości pliku
+                        "szerokosc": przygotowane["szerokosc"],  # szerokość oryginału
+                        "wysokosc": przygotowane["wysokosc"],  # wysokość oryginału
+                        "dhash": przygotowane["dhash"],  # hash percepcyjny
+                        **przygotowane["exif"],  # data wykonania, aparat, orientacja, GPS
+                        **tagi  # obiekty, scena, kolory, liczba osób (indeksowane pola keyword)
                     }
-                ]
-            )
-            
-            # Pobierz wygenerowany opis z odpowiedzi
-            # choices[0] = pierwsza odpowiedź
-            # message.content = tekst odpowiedzi
-            opis = odpowiedz.choices[0].message.content
-            
-            # Utwórz ścieżkę do zapisania zdjęcia
-            # Użyj nazwę ze zmapowanego słownika (która może zawierać _1 dla duplikatów)
-            sciezka_docelowa = os.path.join(FOLDER_ZDJEC, nazwa_do_zapisu)
-            
-            # Jeśli plik już istnieje na dysku - dodaj numer aby uniknąć nadpisania
-            licznik = 2  # licznik do numeru (zaczynamy od 2, bo _1 mogło być już dodane)
-            nazwa_bazowa, rozszerzenie_plik = os.path.splitext(nazwa_do_zapisu)  # podziel nazwę
-            
-            # Pętla: dopóki plik istnieje - dodawaj numer
-            while os.path.exists(sciezka_docelowa):
-                # Utwórz nową ścieżkę z numerem (np. "foto_2.jpg", "foto_3.jpg")
-                sciezka_docelowa = os.path.join(FOLDER_ZDJEC, f"{nazwa_bazowa}_{licznik}{rozszerzenie_plik}")
-                licznik += 1  # zwiększ licznik
-            
-            # Zapisz zdjęcie do pliku na dysku
-            with open(sciezka_docelowa, 'wb') as f:
-                # 'wb' = write binary (otworz plik do zapisu w trybie binarnym)
-                f.write(zawartosc_pliku)  # zapisz zawartość do pliku
-            
-            # Wypisz komunikat że zdjęcie zostało zapisane
-            print(f"[przetwarzanie_zdjec] ✅ Zdjęcie zapisane: {sciezka_docelowa}")
-            
-            # Dodaj wynik do listy (opis AI + ścieżka do pliku)
-            wyniki.append({
-                "opis": opis,  # wygenerowany opis AI
-                "sciezka": sciezka_docelowa  # ścieżka do zapisanego zdjęcia
-            })
-            
-        except Exception as e:
-            # Jeśli coś poszło nie tak przy przetwarzaniu tego zdjęcia
-            print(f"[przetwarzanie_zdjec] ❌ Błąd przy przetwarzaniu {plik.name}: {e}")
-            continue  # przejdź do następnego zdjęcia (pomiń ten błąd)
+                })
+                if postep:
+                    postep(idx, "opisane")
+                
+            except Exception as e:
+                # Jeśli coś poszło nie tak przy przetwarzaniu tego zdjęcia
+                print(f"[przetwarzanie_zdjec] ❌ Błąd przy przetwarzaniu {plik.name}: {e}")
+                if postep:
+                    postep(idx, "blad", str(e))
+                continue  # przejdź do następnego zdjęcia (pomiń ten błąd)
     
     # Zwróć listę wyników (wszystkie opisy + ścieżki)
-    return wyniki
\ No newline at end of file
+    return wyniki
+
+def zmierz_pakowanie(sciezki, model, klucz_api, rozmiary_paczek=(1, 4, 8)):
+    """
+    Porównaj opisywanie pojedynczych zdjęć z paczkami: czas i tokeny na zdjęcie
+    (te same zdjęcia, zapytania jedno po drugim, bez zapisu do bazy)
+    
+    Zwraca: słownik {rozmiar paczki: {"sekundy_zdjecia", "tokeny_zdjecia", "bez_opisu"}}
+    """
+    from openai import OpenAI
+    klient = OpenAI(api_key=klucz_api)
+    zdjecia = [przyszle.result()["zdjecie_base64"] for przyszle in zlec_przygotowanie(sciezki)]
+    
+    pomiary = {}
+    for rozmiar in rozmiary_paczek:
+        sekundy, tokeny, bez_opisu = 0.0, 0, 0
+        for poczatek in range(0, len(zdjecia), rozmiar):
+            partia = zdjecia[poczatek:poczatek + rozmiar]
+            start = time.perf_counter()
+            if rozmiar == 1:
+                tokeny += _opisz_zdjecie(klient, model, partia[0])[3]
+            else:
+                opisy, tokeny_paczki = _opisz_paczke(klient, model, partia)
+                tokeny += tokeny_paczki
+                bez_opisu += opisy.count(None)
+            sekundy += time.perf_counter() - start
+        pomiary[rozmiar] = {
+            "sekundy_zdjecia": sekundy / len(zdjecia), "tokeny_zdjecia": tokeny / len(zdjecia), "bez_opisu": bez_opisu
+        }
+    
+    bazowy = pomiary.get(1)
+    for rozmiar, pomiar in pomiary.items():
+        porownanie = ""
+        if bazowy and rozmiar != 1:
+            porownanie = (f" | względem pojedynczych: czas {pomiar['sekundy_zdjecia'] / bazowy['sekundy_zdjecia'] - 1:+.0%}, "
+                          f"tokeny {pomiar['tokeny_zdjecia'] / bazowy['tokeny_zdjecia'] - 1:+.0%}")
+        print(f"[przetwarzanie_zdjec] Paczka {rozmiar}: {pomiar['sekundy_zdjecia']:.2f} s/zdjęcie, "
+              f"{pomiar['tokeny_zdjecia']:.0f} tokenów/zdjęcie, do ponowienia {pomiar['bez_opisu']}{porownanie}")
+    return pomiary
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pomiar pakowania zdjęć w zapytaniach do Vision API")
+    parser.add_argument("--pomiar", required=True, help="folder ze zdjęciami (jpg/png) do pomiaru")
+    parser.add_argument("--paczki", type=int, nargs="+", default=[1, 4, 8], help="rozmiary paczek (1 = pojedynczo)")
+    parser.add_argument("--model", default=config.pobierz_rzeczywista_nazwe_modelu(config.MODEL_DOMYSLNY), help="model Vision")
+    parser.add_argument("--limit", type=int, default=24, help="najwyżej tyle zdjęć z folderu")
+    argumenty = parser.parse_args()
+
+    sciezki = sorted(
+        os.path.join(argumenty.pomiar, nazwa) for nazwa in os.listdir(argumenty.pomiar)
+        if nazwa.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:argumenty.limit]
+    zmierz_pakowanie(sciezki, argumenty.model, os.getenv("OPENAI_API_KEY"), argumenty.paczki)
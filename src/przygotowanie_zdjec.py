@@ -0,0 +1,200 @@
+# Zawartość pliku: src/przygotowanie_zdjec.py
+#
+# Przygotowanie zdjęć przed wysłaniem do Vision API.
+# Cała praca obciążająca procesor (dekodowanie, orientacja EXIF, zmniejszanie,
+# hash, base64, miniatura) wykonuje się w osobnych procesach, dzięki czemu
+# nie blokuje wątku skryptu Streamlit i skaluje się na wszystkie rdzenie.
+
+import os  # liczba rdzeni procesora
+import io  # bufory w pamięci (bajty <-> obiekt pliku)
+import mmap  # odczyt pliku z dysku bez kopiowania do pamięci procesu
+import base64  # kodowanie zdjęcia do base64 (format który API rozumie)
+import hashlib  # hash zawartości pliku (sha256)
+import multiprocessing  # kontekst "spawn" dla puli procesów
+from concurrent.futures import ProcessPoolExecutor  # pula procesów roboczych
+from contextlib import contextmanager  # otwieranie źródła zdjęcia (bajty albo plik)
+
+# Pillow, EXIF i dHash są importowane dopiero w funkcjach wykonywanych w procesach
+# roboczych - proces interfejsu tylko zleca pracę i nie musi ładować Pillow
+
+# ===== KONFIGURACJA =====
+# Najdłuższy bok zdjęcia wysyłanego do Vision API (większe zdjęcia są zmniejszane)
+MAKS_BOK_ZDJECIA = 1024
+
+# Najdłuższy bok miniatury wyświetlanej w zakładce zarządzania
+MAKS_BOK_MINIATURY = 256
+
+# Jakość kompresji JPEG dla zdjęcia dla API i miniatury
+JAKOSC_JPEG = 85
+
+# Liczba procesów roboczych (domyślnie tyle ile rdzeni procesora)
+LICZBA_PROCESOW = int(os.getenv("LICZBA_PROCESOW", "0")) or (os.cpu_count() or 1)
+
+# Rozmiar do którego dekoder JPEG zmniejsza zdjęcie przy liczeniu samego odcisku
+BOK_ODCISKU = 64
+
+# Tagi EXIF z orientacją obróconą o 90/270 stopni (szerokość i wysokość zamieniają się)
+ORIENTACJE_OBROCONE = (5, 6, 7, 8)
+
+# Pula procesów tworzona dopiero przy pierwszym użyciu (jedna na cały serwer)
+_pula_procesow = None
+
+# ===== FUNKCJE WYKONYWANE W PROCESACH ROBOCZYCH =====
+
+def _zakoduj_jpeg(obraz):
+    """
+    Zapisz obraz Pillow jako bajty JPEG
+    """
+    bufor = io.BytesIO()  # bufor w pamięci zamiast pliku na dysku
+    obraz.save(bufor, format="JPEG", quality=JAKOSC_JPEG, optimize=True)
+    return bufor.getvalue()
+
+@contextmanager
+def _otworz_zrodlo(zrodlo):
+    """
+    Udostępnij zdjęcie jako obiekt pliku dla Pillow i bufor do hasha
+
+    Ścieżka jest mapowana do pamięci (mmap) - do procesu roboczego trafia tylko
+    ścieżka, a strony pliku są czytane z dysku dopiero gdy są potrzebne.
+
+    Parametr:
+    - zrodlo: bajty pliku albo ścieżka do pliku na dysku
+    """
+    if isinstance(zrodlo, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(zrodlo), zrodlo
+        return
+
+    with open(zrodlo, "rb") as f:
+        # Pustego pliku nie da się zmapować - Pillow i tak zgłosi błąd formatu
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO(b""), b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa, mapa
+
+def przygotuj_zdjecie(zawartosc_pliku):
+    """
+    Przygotuj jedno zdjęcie do wysłania do Vision API
+    Funkcja działa w procesie roboczym - dostaje surowe bajty (albo ścieżkę) i zwraca gotowy wynik
+
+    Parametr:
+    - zawartosc_pliku: bajty przesłanego pliku (JPG, PNG, ...) albo ścieżka do pliku
+
+    Zwraca: słownik z kluczami:
+    - "hash": sha256 zawartości pliku (hex)
+    - "szerokosc", "wysokosc": wymiary oryginału (po uwzględnieniu orientacji EXIF)
+    - "zdjecie_base64": zmniejszone zdjęcie JPEG zakodowane w base64
+    - "miniatura": bajty JPEG miniatury
+    - "exif": słownik metadanych EXIF (patrz metadane_exif.odczytaj_exif)
+    - "dhash": hash percepcyjny (tekst szesnastkowy)
+    """
+    from PIL import Image, ImageOps  # Pillow - dekodowanie i zmniejszanie zdjęć
+    from metadane_exif import odczytaj_exif  # data wykonania, aparat, GPS z EXIF
+    from hasze_percepcyjne import dhash  # hash percepcyjny do wykrywania podobnych zdjęć
+
+    with _otworz_zrodlo(zawartosc_pliku) as (plik, bufor), Image.open(plik) as obraz:
+        # Hash liczymy z oryginalnych bajtów (identyczne pliki = identyczny hash)
+        hash_zawartosci = hashlib.sha256(bufor).hexdigest()
+
+        # Wymiary oryginału - zapamiętaj przed zmniejszeniem
+        szerokosc, wysokosc = obraz.size
+
+        # Metadane EXIF - odczytaj przed obróceniem (exif_transpose usuwa orientację)
+        exif = odczytaj_exif(obraz)
+
+        # Jeśli orientacja EXIF obraca zdjęcie o 90 stopni - zamień wymiary
+        if exif.get("orientacja") in ORIENTACJE_OBROCONE:
+            szerokosc, wysokosc = wysokosc, szerokosc
+
+        # Tryb draft: dekoder JPEG od razu skaluje obraz (1/2, 1/4, 1/8)
+        # dzięki czemu duże zdjęcia dekodujemy dużo taniej (dla PNG nic nie robi)
+        obraz.draft("RGB", (MAKS_BOK_ZDJECIA, MAKS_BOK_ZDJECIA))
+
+        # Obróć zdjęcie zgodnie z orientacją EXIF i zamień na RGB (JPEG nie ma kanału alfa)
+        obraz = ImageOps.exif_transpose(obraz).convert("RGB")
+
+    # Hash percepcyjny z obróconego obrazu (obrócona kopia zdjęcia = ten sam hash)
+    hash_percepcyjny = dhash(obraz)
+
+    # Zmniejsz zdjęcie dla API (thumbnail zachowuje proporcje i nie powiększa)
+    obraz.thumbnail((MAKS_BOK_ZDJECIA, MAKS_BOK_ZDJECIA))
+    zdjecie_jpeg = _zakoduj_jpeg(obraz)
+
+    # Miniatura z już zmniejszonego obrazu (dużo taniej niż z oryginału)
+    obraz.thumbnail((MAKS_BOK_MINIATURY, MAKS_BOK_MINIATURY))
+    miniatura = _zakoduj_jpeg(obraz)
+
+    return {
+        "hash": hash_zawartosci,  # sha256 oryginalnych bajtów
+        "szerokosc": szerokosc,  # szerokość oryginału
+        "wysokosc": wysokosc,  # wysokość oryginału
+        "zdjecie_base64": base64.b64encode(zdjecie_jpeg).decode("utf-8"),  # zdjęcie dla API
+        "miniatura": miniatura,  # bajty JPEG miniatury
+        "exif": exif,  # data wykonania, aparat, orientacja, GPS
+        "dhash": hash_percepcyjny  # hash percepcyjny (wykrywanie podobnych zdjęć)
+    }
+
+def przygotuj_odcisk(zawartosc_pliku):
+    """
+    Oblicz sam odcisk zdjęcia (sha256 + dHash) - dużo taniej niż pełne przygotowanie
+    Używane do wykrywania duplikatów przed wysłaniem czegokolwiek do Vision API
+
+    Parametr:
+    - zawartosc_pliku: bajty pliku albo ścieżka do pliku
+
+    Zwraca: słownik z kluczami "hash" i "dhash"
+    """
+    from PIL import Image, ImageOps  # Pillow - dekodowanie i zmniejszanie zdjęć
+    from hasze_percepcyjne import dhash  # hash percepcyjny do wykrywania podobnych zdjęć
+
+    with _otworz_zrodlo(zawartosc_pliku) as (plik, bufor), Image.open(plik) as obraz:
+        # Dekoder JPEG od razu zmniejsza zdjęcie (dHash i tak potrzebuje 9x8 pikseli)
+        obraz.draft("L", (BOK_ODCISKU, BOK_ODCISKU))
+        obraz = ImageOps.exif_transpose(obraz)
+
+        return {
+            "hash": hashlib.sha256(bufor).hexdigest(),
+            "dhash": dhash(obraz)
+        }
+
+# ===== PULA PROCESÓW =====
+
+def pobierz_pule_procesow():
+    """
+    Pobierz (lub utwórz przy pierwszym użyciu) wspólną pulę procesów roboczych
+
+    Używamy kontekstu "spawn" - fork z wielowątkowego serwera Streamlit
+    mógłby zakleszczyć proces potomny.
+    """
+    global _pula_procesow
+
+    if _pula_procesow is None:
+        _pula_procesow = ProcessPoolExecutor(
+            max_workers=LICZBA_PROCESOW,  # tyle procesów ile rdzeni
+            mp_context=multiprocessing.get_context("spawn")  # bezpieczny start procesów
+        )
+        print(f"[przygotowanie_zdjec] Uruchomiono pulę {LICZBA_PROCESOW} procesów")
+
+    return _pula_procesow
+
+def zlec_przygotowanie(lista_zawartosci):
+    """
+    Zleć przygotowanie wielu zdjęć równolegle w puli procesów
+
+    Parametr:
+    - lista_zawartosci: lista bajtów przesłanych plików albo ścieżek do plików na dysku
+
+    Zwraca: lista obiektów Future (w tej samej kolejności co lista_zawartosci)
+    """
+    pula = pobierz_pule_procesow()
+    return [pula.submit(przygotuj_zdjecie, zawartosc) for zawartosc in lista_zawartosci]
+
+def zlec_odciski(lista_zawartosci):
+    """
+    Zleć obliczenie odcisków (sha256 + dHash) wielu zdjęć w puli procesów
+    (bajty albo ścieżki - ścieżka nie kopiuje zawartości pliku do procesu roboczego)
+
+    Zwraca: lista obiektów Future (w tej samej kolejności co lista_zawartosci)
+    """
+    pula = pobierz_pule_procesow()
+    return [pula.submit(przygotuj_odcisk, zawartosc) for zawartosc in lista_zawartosci]
@@ -0,0 +1,61 @@
+# Zawartość pliku: src/roznorodnosc.py
+#
+# Zróżnicowanie wyników wyszukiwania metodą MMR (Maximal Marginal Relevance).
+# Qdrant zwraca zdjęcia najbardziej podobne do zapytania - przy zdjęciach
+# seryjnych jednej sceny wszystkie miejsca w wynikach zajmuje ta sama scena.
+# MMR wybiera wyniki po kolei, nagradzając podobieństwo do zapytania
+# i karząc podobieństwo do wyników już wybranych:
+#
+#   wynik(d) = (1 - roznorodnosc) * sim(zapytanie, d) - roznorodnosc * max sim(d, wybrane)
+#
+# Wszystkie podobieństwa między kandydatami są liczone jednym mnożeniem macierzy,
+# a każdy krok wyboru to kilka operacji na wektorze długości K (bez pętli po kandydatach),
+# więc dla K=100 cały ranking zajmuje ułamek milisekundy.
+
+def mmr(podobienstwa_do_zapytania, wektory, liczba_wynikow, roznorodnosc=0.5):
+    """
+    Wybierz zróżnicowane wyniki spośród kandydatów (MMR)
+
+    Parametry:
+    - podobienstwa_do_zapytania: K podobieństw kandydatów do zapytania (score z Qdrant)
+    - wektory: macierz K x rozmiar wektorów kandydatów
+    - liczba_wynikow: ile wyników wybrać (N <= K)
+    - roznorodnosc: 0 = kolejność jak z Qdrant, 1 = tylko unikanie podobnych (zwykle 0.3-0.7)
+
+    Zwraca: lista indeksów kandydatów w kolejności wyboru
+    """
+    import numpy as np
+
+    trafnosc = np.asarray(podobienstwa_do_zapytania, dtype=np.float32)
+    liczba_kandydatow = len(trafnosc)
+    liczba_wynikow = min(liczba_wynikow, liczba_kandydatow)
+    if liczba_wynikow <= 0:
+        return []
+    if roznorodnosc <= 0:
+        return [int(i) for i in np.argsort(-trafnosc, kind="stable")[:liczba_wynikow]]
+
+    # Normalizacja na wszelki wypadek (starsze kolekcje, wektory z innego źródła)
+    macierz = np.asarray(wektory, dtype=np.float32)
+    dlugosci = np.linalg.norm(macierz, axis=1, keepdims=True)
+    dlugosci[dlugosci == 0] = 1.0
+    macierz = macierz / dlugosci
+
+    # Podobieństwa każdy-z-każdym (K x K) jednym mnożeniem macierzy
+    podobienstwa = macierz @ macierz.T
+
+    waga_trafnosci = (1.0 - roznorodnosc) * trafnosc
+    # Największe podobieństwo każdego kandydata do już wybranych (na start brak wybranych)
+    maks_do_wybranych = np.full(liczba_kandydatow, -np.inf, dtype=np.float32)
+    dostepne = np.ones(liczba_kandydatow, dtype=bool)
+
+    # Pierwszy wynik - najbardziej trafny (kara za podobieństwo jeszcze nie istnieje)
+    wybrany = int(np.argmax(trafnosc))
+    wybrane = [wybrany]
+    for _ in range(liczba_wynikow - 1):
+        dostepne[wybrany] = False
+        np.maximum(maks_do_wybranych, podobienstwa[wybrany], out=maks_do_wybranych)
+        oceny = np.where(dostepne, waga_trafnosci - roznorodnosc * maks_do_wybranych, -np.inf)
+        wybrany = int(np.argmax(oceny))
+        wybrane.append(wybrany)
+
+    return wybrane
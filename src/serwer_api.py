@@ -0,0 +1,359 @@
+# Zawartość pliku: src/serwer_api.py
+#
+# Programowy interfejs HTTP obok interfejsu Streamlit.
+# Skrypt Streamlit wykonuje się od nowa przy każdej interakcji - programy korzystające
+# z wyszukiwarki musiałyby "klikać" interfejs i płacić za całe ponowne uruchomienie.
+# Ten serwer (Starlette + uvicorn, instalowane razem ze Streamlit) wystawia te same
+# funkcje baza_danych i kolejki zadań jako lekkie endpointy JSON:
+#
+#   GET  /search?q=kot&limit=10&token=...        wyszukiwanie (stronicowane tokenem)
+#   POST /search/batch  {"zapytania": [...]}      wiele zapytań: jeden embedding, jedno zapytanie do Qdrant
+#   GET  /photos?limit=50&offset=0                katalog zdjęć (z lokalnego magazynu SQLite)
+#   GET  /photos/{id}                             pełny rekord zdjęcia (opis, EXIF, tagi)
+#   GET  /photos/{id}/thumbnail                   miniatura (strumieniowo z dysku)
+#   POST /ingest  (multipart: pliki, model)       dodanie zdjęć do kolejki - odpowiedź od razu (202)
+#   GET  /ingest/{id}                             stan zadania
+#
+# Klient Qdrant, klienci OpenAI i pamięć embeddingów zapytań są wspólne dla wszystkich
+# zapytań procesu (tworzone raz, przy starcie). Funkcje baza_danych są synchroniczne,
+# więc wykonują się w puli wątków (LICZBA_WATKOW_API), a pętla zdarzeń obsługuje w tym
+# czasie kolejne połączenia. Więcej rdzeni = więcej procesów (--procesy).
+#
+# Opcjonalny klucz dostępu: KLUCZ_API_SERWERA w .env - zapytania muszą mieć nagłówek
+# "Authorization: Bearer <klucz>". Klucz OpenAI serwer bierze z OPENAI_API_KEY.
+#
+# Użycie:
+#   python src/serwer_api.py                          # http://127.0.0.1:8000
+#   python src/serwer_api.py --host 0.0.0.0 --port 8080 --procesy 4
+
+import os  # ścieżki i zmienne środowiskowe
+import hmac  # porównanie klucza dostępu w stałym czasie
+import tempfile  # przesłane pliki przed dodaniem do kolejki
+import argparse  # argumenty wiersza poleceń
+from contextlib import asynccontextmanager  # start i zatrzymanie aplikacji
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, FileResponse
+from starlette.routing import Route
+
+import baza_danych  # wyszukiwanie i katalog zdjęć
+import kolejka_zadan  # zadania przetwarzania przesłanych zdjęć
+
+# Opcjonalny klucz dostępu do API (pusty = bez autoryzacji, np. tylko localhost)
+KLUCZ_API_SERWERA = os.getenv("KLUCZ_API_SERWERA", "")
+
+# Liczba wątków wykonujących funkcje baza_danych (wyszukiwania czekają głównie na sieć)
+LICZBA_WATKOW_API = int(os.getenv("LICZBA_WATKOW_API", "64"))
+
+# Górne limity parametrów zapytań
+MAKS_WYNIKOW = 100
+MAKS_ZAPYTAN_W_PARTII = 256
+MAKS_ZDJEC_NA_STRONE = 500
+
+# Rozszerzenia przyjmowane przez /ingest (jak w polu przesyłania w interfejsie)
+ROZSZERZENIA = (".jpg", ".jpeg", ".png")
+
+# Rozmiar kawałka przy zapisie przesłanych plików
+ROZMIAR_KAWALKA = 1024 * 1024
+
+class BladZapytania(Exception):
+    """
+    Nieprawidłowe parametry zapytania (odpowiedź 400)
+    """
+
+# ===== POMOCNICZE =====
+
+def _liczba(wartosc, domyslna, maks=None, nazwa="parametr"):
+    """
+    Parametr liczbowy z zapytania (z ograniczeniem do maks)
+    """
+    if wartosc is None or wartosc == "":
+        return domyslna
+    try:
+        liczba = int(wartosc)
+    except (TypeError, ValueError):
+        raise BladZapytania(f"'{nazwa}' musi być liczbą całkowitą")
+    if liczba < 0:
+        raise BladZapytania(f"'{nazwa}' nie może być ujemny")
+    return min(liczba, maks) if maks else liczba
+
+def _id_punktu(tekst):
+    """
+    ID punktu ze ścieżki URL (liczba albo UUID - jak w Qdrant)
+    """
+    return int(tekst) if tekst.isdigit() else tekst
+
+def _filtry(parametry):
+    """
+    Filtry metadanych z parametrów zapytania (te same co w zakładce wyszukiwania)
+
+    - data_od, data_do: daty "RRRR-MM-DD" (albo pełny czas ISO)
+    - aparat: fragment nazwy aparatu
+    - tag: "pole:wartość", może się powtarzać (np. tag=scena:plaża&tag=obiekty:pies)
+    - tagi: tylko w ciele JSON - słownik {"pole": ["wartość", ...]}
+    - prog: minimalne podobieństwo wyniku (0-1)
+    """
+    filtry = {}
+    if parametry.get("data_od"):
+        data = parametry["data_od"]
+        filtry["data_od"] = data if "T" in data else f"{data}T00:00:00"
+    if parametry.get("data_do"):
+        data = parametry["data_do"]
+        filtry["data_do"] = data if "T" in data else f"{data}T23:59:59"
+    if parametry.get("aparat"):
+        filtry["aparat"] = parametry["aparat"]
+    if parametry.get("prog") not in (None, ""):
+        try:
+            filtry["prog_podobienstwa"] = float(parametry["prog"])
+        except (TypeError, ValueError):
+            raise BladZapytania("'prog' musi być liczbą")
+
+    tagi = {}
+    if hasattr(parametry, "getlist"):
+        # Parametry adresu: tylko powtarzalny "tag" ("tagi" jako słownik istnieje tylko w JSON)
+        wpisy = parametry.getlist("tag")
+    else:
+        # Ciało JSON: "tagi" = {"pole": ["wartość", ...]}, "tag" = napis albo lista napisów
+        tagi_json = parametry.get("tagi")
+        if tagi_json is None:
+            tagi_json = {}
+        if not isinstance(tagi_json, dict) or not all(
+            isinstance(wartosci, list) and all(isinstance(w, (str, int)) and not isinstance(w, bool) for w in wartosci)
+            for wartosci in tagi_json.values()
+        ):
+            raise BladZapytania("'tagi' ma postać {\"pole\": [\"wartość\", ...]}")
+        tagi = {str(pole): [str(w) for w in wartosci] for pole, wartosci in tagi_json.items()}
+        wpisy = parametry.get("tag") or []
+        if isinstance(wpisy, str):
+            wpisy = [wpisy]
+        if not isinstance(wpisy, list) or not all(isinstance(w, str) for w in wpisy):
+            raise BladZapytania("'tag' ma postać pole:wartość")
+    for wpis in wpisy:
+        pole, separator, wartosc = wpis.partition(":")
+        if not separator:
+            raise BladZapytania("'tag' ma postać pole:wartość")
+        tagi.setdefault(pole, []).append(wartosc)
+    if tagi:
+        filtry["tagi"] = tagi
+    return filtry
+
+def _wynik_json(wynik):
+    """
+    WynikWyszukiwania jako słownik JSON (z adresem miniatury)
+    """
+    return {
+        "id": wynik.id,
+        "podobienstwo": wynik.podobienstwo,
+        "nazwa": wynik.nazwa_zdjecia,
+        "opis": wynik.opis,
+        "miniatura": f"/photos/{wynik.id}/thumbnail",
+        **dict(wynik.dodatkowe)
+    }
+
+def _zdjecie_json(zdjecie):
+    """
+    Zdjęcie z katalogu jako słownik JSON (bez ścieżek na dysku serwera)
+    """
+    wynik = {k: v for k, v in zdjecie.items() if k not in ("sciezka", "id_punktu")}
+    wynik["id"] = zdjecie.get("id", zdjecie.get("id_punktu"))
+    wynik["miniatura"] = f"/photos/{wynik['id']}/thumbnail"
+    return wynik
+
+def endpoint(funkcja):
+    """
+    Wspólna obsługa endpointów: klucz dostępu i zamiana BladZapytania na odpowiedź 400
+    """
+    async def obsluga(zapytanie):
+        if KLUCZ_API_SERWERA:
+            naglowek = zapytanie.headers.get("authorization", "")
+            if not hmac.compare_digest(naglowek, f"Bearer {KLUCZ_API_SERWERA}"):
+                return JSONResponse({"blad": "nieprawidłowy klucz dostępu"}, status_code=401)
+        try:
+            return await funkcja(zapytanie)
+        except BladZapytania as e:
+            return JSONResponse({"blad": str(e)}, status_code=400)
+    return obsluga
+
+# ===== WYSZUKIWANIE =====
+
+@endpoint
+async def szukaj(zapytanie):
+    parametry = zapytanie.query_params
+    opis = parametry.get("q", "").strip()
+    if not opis:
+        raise BladZapytania("brak parametru 'q'")
+
+    rozmiar = _liczba(parametry.get("limit"), baza_danych.LICZBA_WYNIKOW, MAKS_WYNIKOW, "limit")
+    filtry = _filtry(parametry)
+    if parametry.get("roznorodnosc") not in (None, ""):
+        try:
+            filtry["roznorodnosc_wynikow"] = float(parametry["roznorodnosc"])
+        except ValueError:
+            raise BladZapytania("'roznorodnosc' musi być liczbą")
+
+    wyniki, token = await run_in_threadpool(
+        baza_danych.wyszukaj_strone, opis, parametry.get("token"), rozmiar, **filtry
+    )
+    return JSONResponse({"wyniki": [_wynik_json(w) for w in wyniki], "token": token})
+
+@endpoint
+async def szukaj_wiele(zapytanie):
+    try:
+        dane = await zapytanie.json()
+    except ValueError:
+        raise BladZapytania("treść zapytania musi być JSON")
+    if not isinstance(dane, dict):
+        raise BladZapytania("treść zapytania musi być obiektem JSON")
+
+    opisy = dane.get("zapytania")
+    if not isinstance(opisy, list) or not opisy or not all(isinstance(o, str) and o.strip() for o in opisy):
+        raise BladZapytania("'zapytania' musi być niepustą listą tekstów")
+    if len(opisy) > MAKS_ZAPYTAN_W_PARTII:
+        raise BladZapytania(f"najwyżej {MAKS_ZAPYTAN_W_PARTII} zapytań w jednej partii")
+
+    rozmiar = _liczba(dane.get("limit"), baza_danych.LICZBA_WYNIKOW, MAKS_WYNIKOW, "limit")
+    wyniki = await run_in_threadpool(
+        baza_danych.wyszukaj_wiele, [o.strip() for o in opisy], rozmiar, **_filtry(dane)
+    )
+    return JSONResponse({"wyniki": [[_wynik_json(w) for w in lista] for lista in wyniki]})
+
+# ===== KATALOG =====
+
+@endpoint
+async def lista_zdjec(zapytanie):
+    parametry = zapytanie.query_params
+    rozmiar = _liczba(parametry.get("limit"), 50, MAKS_ZDJEC_NA_STRONE, "limit")
+    offset = _liczba(parametry.get("offset"), 0, nazwa="offset")
+
+    zdjecia = await run_in_threadpool(baza_danych.pobierz_wszystkie_zdjecia, rozmiar, offset)
+    return JSONResponse({
+        "zdjecia": [_zdjecie_json(z) for z in zdjecia],
+        "nastepny_offset": offset + rozmiar if len(zdjecia) == rozmiar else None
+    })
+
+@endpoint
+async def zdjecie(zapytanie):
+    rekord = await run_in_threadpool(baza_danych.pobierz_zdjecie, _id_punktu(zapytanie.path_params["id_punktu"]))
+    if rekord is None:
+        return JSONResponse({"blad": "nie ma takiego zdjęcia"}, status_code=404)
+    return JSONResponse(_zdjecie_json(rekord))
+
+@endpoint
+async def miniatura(zapytanie):
+    from magazyn_plikow import sciezka_miniatury
+
+    rekord = await run_in_threadpool(baza_danych.pobierz_zdjecie, _id_punktu(zapytanie.path_params["id_punktu"]))
+    if rekord is None or not rekord["sciezka"]:
+        return JSONResponse({"blad": "nie ma takiego zdjęcia"}, status_code=404)
+
+    # Miniatura (albo oryginał, gdy miniatura jeszcze nie powstała), wysyłana kawałkami
+    sciezka = sciezka_miniatury(rekord["sciezka"])
+    if not os.path.exists(sciezka):
+        sciezka = rekord["sciezka"]
+        if not os.path.exists(sciezka):
+            return JSONResponse({"blad": "brak pliku zdjęcia"}, status_code=404)
+    # Pliki adresowane zawartością nie zmieniają się - przeglądarka może je trzymać długo
+    return FileResponse(sciezka, headers={"Cache-Control": "public, max-age=86400"})
+
+# ===== DODAWANIE ZDJĘĆ =====
+
+@endpoint
+async def dodaj_zdjecia(zapytanie):
+    import config
+    from pracownik import uruchom_w_tle
+
+    formularz = await zapytanie.form()
+    model_id = formularz.get("model") or config.MODEL_DOMYSLNY
+    if model_id not in config.MODELE and model_id != config.MODEL_KASKADA:
+        raise BladZapytania(f"nieznany model '{model_id}'")
+    pliki = [p for p in formularz.getlist("pliki") if hasattr(p, "filename")]
+    if not pliki:
+        raise BladZapytania("brak plików (pole 'pliki')")
+
+    # Zdjęcia o nazwach już obecnych w katalogu są pomijane (jak domyślna decyzja w interfejsie)
+    do_kolejki, pominiete = [], []
+    try:
+        for plik in pliki:
+            nazwa = os.path.basename(plik.filename or "")
+            if not nazwa.lower().endswith(ROZSZERZENIA) or await run_in_threadpool(baza_danych.sprawdz_czy_zdjecie_istnieje, nazwa):
+                pominiete.append(nazwa)
+                continue
+            # Plik trafia na dysk kawałkami - kolejka przeniesie go do folderu zadania
+            deskryptor, sciezka = tempfile.mkstemp(suffix=os.path.splitext(nazwa)[1])
+            do_kolejki.append((nazwa, sciezka))
+            with os.fdopen(deskryptor, "wb") as f:
+                while kawalek := await plik.read(ROZMIAR_KAWALKA):
+                    f.write(kawalek)
+    except BaseException:
+        for _, sciezka in do_kolejki:
+            os.remove(sciezka)
+        raise
+    finally:
+        await formularz.close()
+
+    if not do_kolejki:
+        return JSONResponse({"zadanie": None, "pominiete": pominiete})
+
+    id_zadania = await run_in_threadpool(
+        kolejka_zadan.dodaj_zadanie, do_kolejki, config.pobierz_rzeczywista_nazwe_modelu(model_id), model_id
+    )
+    await run_in_threadpool(uruchom_w_tle)
+    return JSONResponse(
+        {"zadanie": id_zadania, "stan": f"/ingest/{id_zadania}", "pominiete": pominiete}, status_code=202
+    )
+
+@endpoint
+async def stan_zadania(zapytanie):
+    zadanie = await run_in_threadpool(kolejka_zadan.pobierz_zadanie, zapytanie.path_params["id_zadania"])
+    if zadanie is None:
+        return JSONResponse({"blad": "nie ma takiego zadania"}, status_code=404)
+    if zadanie["stan"] in ("oczekuje", "w_toku"):
+        # Pracownik zginął w trakcie - nowy przywróci jego zadanie
+        from pracownik import uruchom_w_tle
+        await run_in_threadpool(uruchom_w_tle)
+    return JSONResponse(zadanie)
+
+# ===== APLIKACJA =====
+
+@asynccontextmanager
+async def cykl_zycia(aplikacja):
+    """
+    Start: większa pula wątków i klient Qdrant utworzony przed pierwszym zapytaniem
+    """
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = LICZBA_WATKOW_API
+    await run_in_threadpool(baza_danych.inicjalizuj_kolekcje)
+    print(f"[serwer_api] Gotowy (wątki: {LICZBA_WATKOW_API}, klucz dostępu: {'tak' if KLUCZ_API_SERWERA else 'nie'})")
+    yield
+
+aplikacja = Starlette(
+    routes=[
+        Route("/search", szukaj, methods=["GET"]),
+        Route("/search/batch", szukaj_wiele, methods=["POST"]),
+        Route("/photos", lista_zdjec, methods=["GET"]),
+        Route("/photos/{id_punktu}", zdjecie, methods=["GET"]),
+        Route("/photos/{id_punktu}/thumbnail", miniatura, methods=["GET"]),
+        Route("/ingest", dodaj_zdjecia, methods=["POST"]),
+        Route("/ingest/{id_zadania}", stan_zadania, methods=["GET"]),
+    ],
+    lifespan=cykl_zycia,
+)
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serwer HTTP wyszukiwarki zdjęć (API obok interfejsu Streamlit)")
+    parser.add_argument("--host", default="127.0.0.1", help="adres nasłuchu")
+    parser.add_argument("--port", type=int, default=8000, help="port")
+    parser.add_argument("--procesy", type=int, default=1, help="liczba procesów serwera")
+    argumenty = parser.parse_args()
+
+    # Import przez nazwę modułu - każdy proces serwera tworzy własnych klientów
+    uvicorn.run(
+        "serwer_api:aplikacja", host=argumenty.host, port=argumenty.port, workers=argumenty.procesy,
+        app_dir=os.path.dirname(os.path.abspath(__file__)), log_level="warning"
+    )
@@ -0,0 +1,103 @@
+# Zawartość pliku: src/sprawdz_czas_importu.py
+#
+# Kontrola czasu importu modułów aplikacji (zimny start Streamlit i poleceń CLI).
+# Moduły są importowane w świeżym interpreterze z "-X importtime", a skrypt
+# sprawdza dwie rzeczy:
+# - łączny czas importu mieści się w budżecie (mediana z kilku uruchomień)
+# - ciężkie SDK (qdrant_client, openai, requests, Pillow, numpy) nie są ładowane
+#   przy samym imporcie - mają być importowane dopiero przy pierwszym użyciu
+#
+# Użycie:
+#   python src/sprawdz_czas_importu.py
+#   python src/sprawdz_czas_importu.py --budzet 100 --powtorzenia 7
+#
+# Kod wyjścia 1 oznacza przekroczenie budżetu albo zbyt wczesny import SDK.
+
+import os  # ścieżka folderu src
+import sys  # interpreter Pythona i kod wyjścia
+import argparse  # argumenty wiersza poleceń
+import statistics  # mediana czasów
+import subprocess  # import w świeżym interpreterze
+
+# Moduły ładowane przy starcie aplikacji i poleceń CLI
+# (kopia_indeksu pominięty - to narzędzie CLI, które potrzebuje numpy w każdej funkcji)
+MODULY_APLIKACJI = [
+    "config", "utils", "baza_danych", "roznorodnosc", "przetwarzanie_zdjec", "przygotowanie_zdjec",
+    "magazyn_metadanych", "magazyn_plikow", "pliki_sesji", "kolejka_zadan", "pracownik", "migracja",
+    "wyszukiwanie_w_tle", "obserwacja_folderu", "profilowanie"
+]
+
+# Biblioteki, które nie mogą być ładowane przy samym imporcie modułów aplikacji
+ZAKAZANE_PRZY_IMPORCIE = ["qdrant_client", "openai", "requests", "PIL", "numpy"]
+
+# Budżet łącznego czasu importu w milisekundach
+BUDZET_MS = float(os.getenv("BUDZET_IMPORTU_MS", "150"))
+
+FOLDER_SRC = os.path.dirname(os.path.abspath(__file__))
+
+def zmierz_import(moduly):
+    """
+    Zaimportuj moduły w świeżym interpreterze z -X importtime
+
+    Zwraca: tupla (łączny czas w ms, {moduł: czas skumulowany w ms} dla wszystkich załadowanych modułów)
+    """
+    wynik = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(moduly)],
+        cwd=FOLDER_SRC, capture_output=True, text=True
+    )
+    if wynik.returncode != 0:
+        raise RuntimeError(f"Import nie powiódł się:\n{wynik.stderr[-2000:]}")
+
+    czasy = {}
+    lacznie = 0.0
+    for wiersz in wynik.stderr.splitlines():
+        # Format: "import time: <własny us> | <skumulowany us> | <wcięcie><moduł>"
+        if not wiersz.startswith("import time:") or "self [us]" in wiersz:
+            continue
+        _, skumulowany, nazwa_z_wcieciem = wiersz.split("|")
+        nazwa = nazwa_z_wcieciem.strip()
+        czasy[nazwa] = int(skumulowany) / 1000
+
+        # Do sumy tylko moduły zaimportowane bezpośrednio (bez wcięcia) - zagnieżdżone są już wliczone
+        if nazwa in moduly and not nazwa_z_wcieciem.startswith("  "):
+            lacznie += czasy[nazwa]
+
+    return lacznie, czasy
+
+def sprawdz(budzet_ms=BUDZET_MS, powtorzenia=5):
+    """
+    Uruchom pomiar kilka razy i porównaj medianę z budżetem
+
+    Zwraca: True jeśli wszystko w normie
+    """
+    pomiary = [zmierz_import(MODULY_APLIKACJI) for _ in range(powtorzenia)]
+    mediana = statistics.median(lacznie for lacznie, _ in pomiary)
+    _, czasy = pomiary[-1]
+
+    print(f"[sprawdz_czas_importu] Import {len(MODULY_APLIKACJI)} modułów: {mediana:.1f} ms (budżet {budzet_ms:.0f} ms)")
+    print("[sprawdz_czas_importu] Najwolniejsze moduły:")
+    for nazwa, czas in sorted(czasy.items(), key=lambda c: -c[1])[:10]:
+        print(f"[sprawdz_czas_importu]   {czas:8.1f} ms  {nazwa}")
+
+    w_normie = True
+    zaladowane = {nazwa.split(".")[0] for nazwa in czasy}
+    for biblioteka in ZAKAZANE_PRZY_IMPORCIE:
+        if biblioteka in zaladowane:
+            print(f"[sprawdz_czas_importu] ❌ '{biblioteka}' jest ładowany przy imporcie - przenieś import do funkcji")
+            w_normie = False
+
+    if mediana > budzet_ms:
+        print("[sprawdz_czas_importu] ❌ Przekroczony budżet czasu importu")
+        w_normie = False
+
+    if w_normie:
+        print("[sprawdz_czas_importu] ✅ OK")
+    return w_normie
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kontrola czasu importu modułów aplikacji")
+    parser.add_argument("--budzet", type=float, default=BUDZET_MS, help="budżet czasu importu [ms]")
+    parser.add_argument("--powtorzenia", type=int, default=5, help="liczba pomiarów (liczona jest mediana)")
+    argumenty = parser.parse_args()
+
+    sys.exit(0 if sprawdz(argumenty.budzet, argumenty.powtorzenia) else 1)
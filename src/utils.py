@@ -1,5 +1,5 @@
-import requests  # import do wykonywania żądań HTTP (pobranie kursu walut)
 import os  # import do dostępu do zmiennych środowiskowych
+from functools import lru_cache  # zapamiętanie kursu walut (jedno zapytanie HTTP na proces)
 
 # SŁOWNIK CEN: uzupełnij te wartości zgodnie z aktualną dokumentacją OpenAI (wartości w USD)
 ceny_modeli = {  # słownik z przykładowymi cenami (zmień na prawdziwe)
@@ -33,8 +33,10 @@ mapa_modeli = {  # mapa alias -> id modelu/opis
     }
 }
 
+@lru_cache(maxsize=1)  # kurs pobierany raz - kolejne szacowania kosztu nie czekają na sieć
 def pobierz_kurs_usd_na_pln():  # funkcja pobierająca kurs USD->PLN
     try:  # spróbuj pobrać kurs z publicznego API
+        import requests  # import dopiero tutaj - biblioteka HTTP potrzebna tylko do kursu walut
         resp = requests.get("https://api.exchangerate.host/latest", params={"base": "USD", "symbols": "PLN"}, timeout=5)  # żądanie do API
         resp.raise_for_status()  # rzuć wyjątek przy błędnym statusie HTTP
         dane = resp.json()  # parsuj odpowiedź jako JSON
@@ -82,6 +84,31 @@ def oszacuj_koszt(liczba_zdjec, model, srednia_liczba_tokenow_na_zdjecie=150, sr
         "uwaga": "⚠️ Wyliczenie nie uwzględnia kosztu przetworzenia obrazu przez OpenAI. Rzeczywisty koszt może być wyższy — cena przetworzenia obrazu zależy od liczby pikseli i nie ma jednoznacznego cennika."  # ostrzeżenie dla użytkownika
     }
 
+def oszacuj_koszt_kaskady(zapytania_modeli, liczba_zdjec, srednia_liczba_tokenow_na_zdjecie=150, srednia_liczba_tokenow_na_embedding=50):  # koszt zadania opisanego kilkoma modelami (tryb kaskady)
+    koszt_generacji_tokeny_usd = 0.0  # suma kosztów opisów wszystkich modeli kaskady (bez zaokrągleń po drodze)
+    for model, zapytania in zapytania_modeli.items():  # każdy model płaci tylko za swoje zapytania
+        if model not in ceny_modeli:  # walidacja jak w oszacuj_koszt
+            raise ValueError("Nieznany model. Uzupełnij cennik w utils.py (ceny_modeli).")  # rzuć błąd jeśli brak modelu
+        cena_za_1k_tokenow_usd = float(ceny_modeli[model].get("cena_za_1k_tokenow_usd", 0.0))  # cena za 1000 tokenów generacji (USD)
+        koszt_generacji_tokeny_usd += (srednia_liczba_tokenow_na_zdjecie / 1000.0) * zapytania * cena_za_1k_tokenow_usd  # koszt opisów tego modelu w USD
+    cena_embedding_za_1k_tokenow_usd = float(ceny_modeli["model_prosty"].get("cena_embedding_za_1k_tokenow_usd", 0.0))  # embedding raz na zdjęcie (cena wspólna dla modeli)
+    koszt_embedding_usd = (srednia_liczba_tokenow_na_embedding / 1000.0) * liczba_zdjec * cena_embedding_za_1k_tokenow_usd  # koszt embeddingów w USD
+
+    # przelicz na PLN i zaokrąglij dopiero sumy (jak w oszacuj_koszt)
+    kurs = pobierz_kurs_usd_na_pln()  # pobierz kurs USD->PLN (zapamiętany po pierwszym użyciu)
+    koszt_generacji_pln = round(koszt_generacji_tokeny_usd * kurs, 2)  # koszt opisów (wszystkie modele) w PLN
+    koszt_embedding_pln = round(koszt_embedding_usd * kurs, 2)  # koszt embeddingów w PLN
+    laczny_koszt_pln = round((koszt_generacji_tokeny_usd + koszt_embedding_usd) * kurs, 2)  # łączny koszt w PLN
+    return {  # wynik w tym samym układzie co oszacuj_koszt
+        "koszt_calkowity_pln": laczny_koszt_pln,  # całkowity koszt w PLN
+        "szczegoly": {  # szczegółowe rozbicie kosztów
+            "koszt_generacji_tokeny_pln": koszt_generacji_pln,  # koszt opisów (wszystkie modele)
+            "koszt_embedding_pln": koszt_embedding_pln,  # koszt embeddingów
+            "kurs_usd_pln": kurs  # użyty kurs USD->PLN
+        },
+        "uwaga": "⚠️ Wyliczenie nie uwzględnia kosztu przetworzenia obrazu przez OpenAI. Kaskada płaci za droższy model tylko przy zdjęciach, których opis nie przeszedł kontroli jakości."  # ostrzeżenie dla użytkownika
+    }
+
 def waliduj_klucz_api(klucz):  # prosta walidacja długości klucza (można rozszerzyć)
     if not klucz or len(klucz) < 30:  # sprawdź minimalną długość klucza
         raise ValueError("Nieprawidłowy klucz API. Sprawdź wpisany klucz.")  # rzuć błąd jeśli niepoprawny
@@ -0,0 +1,166 @@
+# Zawartość pliku: src/wyszukiwanie_w_tle.py
+#
+# Wyszukiwanie w tle z anulowaniem nieaktualnych zapytań.
+# Skrypt Streamlit wykonywał wyszukiwanie (embedding + Qdrant) bezpośrednio w swoim
+# wątku - nowe zapytanie użytkownika czekało, aż skończy się poprzednie, nawet jeśli
+# jego wynik nie był już nikomu potrzebny. Teraz:
+# - każdy etap (odczekanie, embedding, Qdrant) działa we wspólnej puli wątków
+# - skrypt czeka na etap małymi krokami i między krokami odświeża komunikat postępu;
+#   każde wywołanie st.* to miejsce, w którym Streamlit przerywa skrypt, gdy
+#   użytkownik zmieni zapytanie - nowe wykonanie zaczyna się od razu
+# - przerwane lub zastąpione zadanie jest anulowane: etapy jeszcze nierozpoczęte
+#   w ogóle się nie wykonują, a wynik trwającego etapu jest odrzucany
+#   (trwającego zapytania HTTP nie da się przerwać w wątku - kończy je limit
+#   czasu klienta, a gotowy embedding i tak trafia do pamięci podręcznej)
+# - krótkie odczekanie przed startem: szybko poprawione zapytanie nie wysyła
+#   w ogóle zapytań dla wersji pośrednich
+# - każdy etap ma własny limit czasu (przekroczenie = komunikat zamiast czekania)
+
+import os  # zmienne środowiskowe
+import time  # limity czasu etapów
+import threading  # znacznik anulowania i blokada tworzenia puli
+from concurrent.futures import ThreadPoolExecutor, wait  # pula wątków etapów wyszukiwania
+
+# Odczekanie przed startem wyszukiwania [s] - zmiana zapytania w tym czasie nic nie kosztuje
+OPOZNIENIE_WYSZUKIWANIA = float(os.getenv("OPOZNIENIE_WYSZUKIWANIA", "0.2"))
+
+# Limity czasu etapów [s]
+LIMIT_CZASU_EMBEDDINGU = float(os.getenv("LIMIT_CZASU_EMBEDDINGU", "10"))
+LIMIT_CZASU_QDRANT = float(os.getenv("LIMIT_CZASU_QDRANT", "5"))
+
+# Co ile sekund skrypt sprawdza stan etapu (i daje Streamlit okazję do przerwania)
+KROK_CZEKANIA = 0.1
+
+# Liczba wątków wspólnej puli (wszystkie sesje)
+LICZBA_WATKOW = int(os.getenv("LICZBA_WATKOW_WYSZUKIWANIA", "8"))
+
+_pula = None
+_blokada_puli = threading.Lock()
+
+class Anulowano(Exception):
+    """
+    Zadanie zastąpione nowszym zapytaniem (wynik nie jest już potrzebny)
+    """
+
+class PrzekroczonoLimit(Exception):
+    """
+    Etap wyszukiwania nie zmieścił się w swoim limicie czasu
+    """
+
+    def __init__(self, etap, limit):
+        super().__init__(f"Etap '{etap}' przekroczył limit {limit:g} s")
+        self.etap = etap
+
+def _pobierz_pule():
+    """
+    Wspólna pula wątków wyszukiwania (tworzona przy pierwszym użyciu)
+    """
+    global _pula
+    with _blokada_puli:
+        if _pula is None:
+            _pula = ThreadPoolExecutor(max_workers=LICZBA_WATKOW, thread_name_prefix="wyszukiwanie")
+    return _pula
+
+class ZadanieWyszukiwania:
+    """
+    Jedno wyszukiwanie złożone z etapów - anulowane, gdy pojawi się nowsze
+
+    Użycie w skrypcie (wyjście z bloku z wyjątkiem, np. przerwaniem skryptu
+    przez Streamlit, anuluje zadanie):
+
+        with wyszukiwarka.nowe_zadanie() as zadanie:
+            zadanie.odczekaj(OPOZNIENIE_WYSZUKIWANIA, postep)
+            wektor = zadanie.etap("embedding", LIMIT_CZASU_EMBEDDINGU, funkcja, ..., postep=postep)
+    """
+
+    def __init__(self):
+        self._anulowane = threading.Event()
+        self._przyszle = None  # Future trwającego etapu
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, wyjatek, slad):
+        if typ is not None:
+            self.anuluj()
+        return False
+
+    @property
+    def anulowane(self):
+        return self._anulowane.is_set()
+
+    def anuluj(self):
+        """
+        Anuluj zadanie: etap jeszcze nierozpoczęty nie wykona się, wynik trwającego zostanie odrzucony
+        """
+        self._anulowane.set()
+        if self._przyszle is not None:
+            self._przyszle.cancel()
+
+    def _czekaj(self, przyszle, limit, postep):
+        """
+        Czekaj małymi krokami na etap (albo sam upływ czasu, gdy przyszle=None)
+
+        Zwraca: True gdy etap się skończył (albo minął czas odczekania)
+        """
+        koniec = time.monotonic() + limit
+        while True:
+            if self.anulowane:
+                raise Anulowano()
+            pozostalo = koniec - time.monotonic()
+            if pozostalo <= 0:
+                return przyszle is None
+            if przyszle is None:
+                self._anulowane.wait(min(KROK_CZEKANIA, pozostalo))
+            elif wait([przyszle], timeout=min(KROK_CZEKANIA, pozostalo)).done:
+                return True
+            if postep:
+                postep()
+
+    def odczekaj(self, sekundy, postep=None):
+        """
+        Odczekaj przed startem wyszukiwania (nowsze zapytanie w tym czasie anuluje zadanie bez kosztów)
+        """
+        self._czekaj(None, sekundy, postep)
+
+    def etap(self, nazwa, limit, funkcja, *args, postep=None, **kwargs):
+        """
+        Wykonaj jeden etap w puli wątków i poczekaj na wynik najwyżej `limit` sekund
+
+        Parametry:
+        - nazwa: nazwa etapu (komunikat przy przekroczeniu limitu)
+        - limit: limit czasu etapu [s]
+        - funkcja, args, kwargs: praca etapu
+        - postep: funkcja wywoływana co KROK_CZEKANIA (np. odświeżenie komunikatu w Streamlit)
+
+        Zwraca: wynik funkcji
+        Wyjątki: Anulowano (zadanie zastąpione), PrzekroczonoLimit (etap trwa za długo)
+        """
+        if self.anulowane:
+            raise Anulowano()
+        self._przyszle = _pobierz_pule().submit(funkcja, *args, **kwargs)
+        try:
+            if not self._czekaj(self._przyszle, limit, postep):
+                raise PrzekroczonoLimit(nazwa, limit)
+            return self._przyszle.result()
+        finally:
+            self._przyszle = None
+
+class Wyszukiwarka:
+    """
+    Wyszukiwarka jednej sesji (trzymana w st.session_state) - co najwyżej jedno aktualne zadanie
+    """
+
+    def __init__(self):
+        self._biezace = None
+        self._blokada = threading.Lock()
+
+    def nowe_zadanie(self):
+        """
+        Utwórz zadanie dla nowego zapytania, anulując poprzednie (jeśli jeszcze trwa)
+        """
+        with self._blokada:
+            if self._biezace is not None:
+                self._biezace.anuluj()
+            self._biezace = ZadanieWyszukiwania()
+            return self._biezace